@@ -0,0 +1,132 @@
+# analytics.py
+"""
+Analítica de la mezcla de servicios, adicionales y peluqueras.
+
+Turnos cobrados en un rango (por end_time, igual que la caja), agrupados en
+SQL por categoría, tamaño, servicio (categoría x tamaño), peluquera y
+adicional: cantidad, facturación, ticket promedio, horas de trabajo,
+facturación por hora y, para los adicionales, tasa de adjunción.
+
+Cada sección es un generador que consulta recién al iterarse, así el
+reporte se puede mandar con stream_template mientras se calcula. Lee de la
+réplica de lectura si hay una configurada.
+
+Las filas se agrupan por id (dos servicios o peluqueras con el mismo nombre
+son filas distintas); el nombre sólo se usa para mostrar.
+
+La facturación de los adicionales se estima a su precio de lista actual:
+appointment_items no guarda el precio cobrado. Los adicionales no tienen
+horas propias (se hacen dentro del turno del servicio), así que no tienen
+facturación por hora; el reporte lo aclara en su sección.
+"""
+from sqlalchemy import func
+
+from extensions import db
+from models import Appointment, Item, Professional, Service, ServiceCategory, ServiceSize, appointment_items
+from replica import read_replica
+
+
+# Agrupaciones de turnos: título, columna por la que se agrupa, columnas de la
+# etiqueta y etiqueta para NULL
+GROUPS = {
+    'service': ('Servicio', Service.id, (ServiceCategory.name, ServiceSize.name), 'Sin servicio'),
+    'category': ('Categoría', ServiceCategory.id, (ServiceCategory.name,), 'Sin servicio'),
+    'size': ('Tamaño', ServiceSize.id, (ServiceSize.name,), 'Sin servicio'),
+    'professional': ('Peluquera', Professional.id, (Professional.name,), 'Sin asignar'),
+}
+
+ADD_ONS_NOTE = ('Sin facturación por hora: los adicionales se hacen dentro del turno del servicio '
+                'y no tienen horas propias.')
+
+
+def _completed(start, end):
+    """Turnos cobrados con end_time en [start, end) (usa ix_appointment_status_end)."""
+    return [
+        Appointment.status == 'Cobrado',
+        Appointment.end_time >= start,
+        Appointment.end_time < end,
+        Appointment.is_deleted == False,
+    ]
+
+
+def _hours():
+    # Segundos exactos (julianday arrastra error de redondeo al sumar años de turnos)
+    seconds = func.strftime('%s', Appointment.end_time) - func.strftime('%s', Appointment.start_time)
+    return func.coalesce(func.sum(seconds) / 3600.0, 0)
+
+
+def _ratio(value, total):
+    return value / total if total else 0.0
+
+
+def totals(start, end):
+    """Totales del rango: base de los porcentajes y tasas de adjunción."""
+    with read_replica():
+        count, revenue, hours = db.session.query(
+            func.count(Appointment.id),
+            func.coalesce(func.sum(Appointment.final_price), 0),
+            _hours(),
+        ).filter(*_completed(start, end)).one()
+    return {
+        'appointments': count,
+        'revenue': revenue,
+        'hours': hours,
+        'average_ticket': _ratio(revenue, count),
+        'revenue_per_hour': _ratio(revenue, hours),
+    }
+
+
+def grouped(start, end, group, summary):
+    """Filas de una agrupación de GROUPS, de mayor a menor facturación."""
+    _, key, labels, empty_label = GROUPS[group]
+    revenue = func.coalesce(func.sum(Appointment.final_price), 0)
+    query = db.session.query(*labels, func.count(Appointment.id), revenue, _hours()).select_from(Appointment)
+    if group == 'professional':
+        query = query.outerjoin(Professional, Professional.id == Appointment.professional_id)
+    else:
+        query = query.outerjoin(Service, Service.id == Appointment.service_id) \
+            .outerjoin(ServiceCategory, ServiceCategory.id == Service.category_id) \
+            .outerjoin(ServiceSize, ServiceSize.id == Service.size_id)
+    query = query.filter(*_completed(start, end)).group_by(key, *labels).order_by(revenue.desc())
+
+    with read_replica():
+        for row in query:
+            names = [name for name in row[:len(labels)] if name]
+            count, total, hours = row[len(labels):]
+            yield {
+                'label': ' - '.join(names) or empty_label,
+                'appointments': count,
+                'revenue': total,
+                'share': _ratio(total, summary['revenue']),
+                'average_ticket': _ratio(total, count),
+                'hours': hours,
+                'revenue_per_hour': _ratio(total, hours),
+            }
+
+
+def add_ons(start, end, summary):
+    """Adicionales: en cuántos turnos cobrados aparecen y el ticket de esos turnos."""
+    count = func.count(Appointment.id)
+    query = db.session.query(Item.name, count, func.sum(Item.price), func.avg(Appointment.final_price)) \
+        .select_from(Appointment) \
+        .join(appointment_items, appointment_items.c.appointment_id == Appointment.id) \
+        .join(Item, Item.id == appointment_items.c.item_id) \
+        .filter(*_completed(start, end)) \
+        .group_by(Item.id, Item.name).order_by(count.desc())
+
+    with read_replica():
+        for name, appointments, revenue, average_ticket in query:
+            yield {
+                'label': name,
+                'appointments': appointments,
+                'attach_rate': _ratio(appointments, summary['appointments']),
+                'revenue': revenue,
+                'average_ticket': average_ticket or 0,
+            }
+
+
+def sections(start, end, summary):
+    """Secciones del reporte en orden; las filas se consultan al iterarlas."""
+    for group, (title, _, _, _) in GROUPS.items():
+        yield {'kind': 'group', 'title': f'Por {title.lower()}', 'rows': grouped(start, end, group, summary)}
+    yield {'kind': 'add_ons', 'title': 'Adicionales', 'note': ADD_ONS_NOTE, 'rows': add_ons(start, end, summary)}
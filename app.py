@@ -2,18 +2,34 @@
 
 from flask import Flask
 from extensions import db, login_manager, migrate # Importa migrate también
+from cache import PrefixSearchCache, UserCache
+from fragments import FragmentCache, forget_catalog_version
+from json_provider import FastJSONProvider
+from branches import init_branch_databases, select_branch
+from replica import init_read_replica, remember_write
+from metrics import init_metrics
+from compression import init_compression
+from slow_queries import init_slow_query_log
+from tracing import init_tracing
+from jinja_cache import init_template_cache, warm_templates
+from static_assets import init_assets
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def create_app():
+def create_app(config=None):
 
     # Inicializar la aplicación
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///peluqueria-db')
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'clave-dev-por-defecto')
+
+    # Configuración extra (tests, pruebas de carga) antes de inicializar extensiones
+    if config:
+        app.config.update(config)
     
 
     # Filtro para formatear dinero
@@ -25,10 +41,33 @@ def create_app():
     # Inicializar extensiones
     db.init_app(app)
     login_manager.init_app(app)
-    migrate.init_app(app, db)  # Inicializar Flask-Migrate
+    migrate.init_app(app, db, render_as_batch=True)  # Inicializar Flask-Migrate (batch para SQLite)
     login_manager.login_view = "main.login"
     login_manager.login_message = "Debes iniciar sesión para ver esta página."
 
+    # Métricas (/metrics): primero, así miden también los demás hooks
+    init_metrics(app)
+    # gzip/brotli de HTML y JSON desde COMPRESS_MIN_SIZE bytes
+    init_compression(app)
+    init_slow_query_log(app)
+    init_tracing(app)
+
+    # Bytecode de templates compartido entre workers (instance/jinja_cache)
+    init_template_cache(app)
+    # Tailwind y FullCalendar propios, con hash (assets/dist, ver static_assets.py)
+    init_assets(app)
+
+    # Caché de búsquedas del autocompletado (por worker, SEARCH_CACHE_TTL segundos; 0 = sin caché)
+    app.extensions['search_cache'] = PrefixSearchCache(app.config.get('SEARCH_CACHE_SIZE', 256),
+                                                       app.config.get('SEARCH_CACHE_TTL', 10))
+    # Usuario logueado por USER_CACHE_TTL segundos (0 = consultar siempre)
+    app.extensions['user_cache'] = UserCache(app.config.get('USER_CACHE_TTL', 30))
+    # Fragmentos HTML/JSON del catálogo, por versión del catálogo
+    app.extensions['fragment_cache'] = FragmentCache()
+    app.before_request(forget_catalog_version)
+    app.before_request(select_branch)
+    app.after_request(remember_write)
+
     # Importar y registrar rutas y modelos
     with app.app_context():
 
@@ -37,11 +76,28 @@ def create_app():
         from models import User, Professional, ServiceCategory, ServiceSize, Service, Item
         from utils import guardarBackUpTurnos # Importa las funciones de utilidad
         
+        from backup import backup_cli # Comandos de snapshots de la base
+        from importer import import_csv_command # Importación masiva desde CSV
+        from branches import branches_cli # Sucursales
+        from replica import replica_cli # Réplica de lectura
+        from history_export import export_cli # Exportación columnar del historial
+        from jinja_cache import templates_cli # Precompilación de templates
+        from static_assets import assets_cli # Build de assets estáticos
+
         # Registrar el blueprint de rutas
         app.register_blueprint(main)
+        app.cli.add_command(backup_cli)
+        app.cli.add_command(import_csv_command)
+        app.cli.add_command(branches_cli)
+        app.cli.add_command(replica_cli)
+        app.cli.add_command(export_cli)
+        app.cli.add_command(templates_cli)
+        app.cli.add_command(assets_cli)
         
         # Inicializar DB y crear datos iniciales
         db.create_all()
+        init_branch_databases(app)
+        init_read_replica(app)
         # 1. Crear Usuario Admin (Operador del sistema)
         if not User.query.filter_by(username='admin').first():
             admin_user = User(username='admin', role='admin')
@@ -86,7 +142,11 @@ def create_app():
             
             db.session.commit()
             print(">> Datos maestros creados.")
-            
+
+    # Compilar todos los templates ahora y no en los primeros requests
+    if app.config.get('TEMPLATE_WARMUP', True):
+        warm_templates(app)
+
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,6 @@
+// assets/tailwind.config.js - sólo se generan las clases que usan los templates
+module.exports = {
+  content: ['./templates/**/*.html', './*.py'],
+  theme: { extend: {} },
+  plugins: [],
+};
@@ -0,0 +1,292 @@
+# backup.py
+"""
+Snapshots consistentes de la base SQLite.
+
+Usa la API de backup online de SQLite (sqlite3.Connection.backup) copiando
+de a `pages` páginas, así entre paso y paso los demás workers pueden seguir
+escribiendo. Cada snapshot se comprime con gzip y se rota por niveles
+(hourly / daily / weekly).
+
+Con sucursales (BRANCHES) los turnos, clientes y la caja viven en la base de
+cada sucursal: `snapshot` copia la principal y todas las sucursales, cada
+una en su carpeta (BACKUP_DIR/branches/<sucursal>/...). Comandos:
+
+    flask --app app:create_app backup snapshot
+    flask --app app:create_app backup list
+    flask --app app:create_app backup verify [<archivo>]     (sin archivo: el último de cada base)
+    flask --app app:create_app backup restore <archivo> [--branch <sucursal>] --yes
+"""
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+from metrics import timed_job
+
+
+TIERS = ('hourly', 'daily', 'weekly')
+DEFAULT_RETENTION = {'hourly': 24, 'daily': 7, 'weekly': 4}
+TIER_INTERVALS = {'hourly': timedelta(hours=1), 'daily': timedelta(days=1), 'weekly': timedelta(weeks=1)}
+# Con microsegundos: dos snapshots en el mismo segundo no se pisan
+FILENAME_FORMAT = 'peluqueria-%Y%m%d-%H%M%S-%f.db.gz'
+LEGACY_FILENAME_FORMAT = 'peluqueria-%Y%m%d-%H%M%S.db.gz'
+
+
+class BackupError(Exception):
+    pass
+
+
+def backup_dir(branch=None):
+    base = current_app.config.get('BACKUP_DIR') or os.path.join(current_app.instance_path, 'backups')
+    return os.path.join(base, 'branches', branch) if branch else base
+
+
+def databases():
+    """Bases a respaldar: la principal (None) y cada sucursal."""
+    return [None, *current_app.extensions.get('branch_engines', {})]
+
+
+def _engine(branch=None):
+    if branch is None:
+        engine = db.engine
+    else:
+        engine = current_app.extensions.get('branch_engines', {}).get(branch)
+        if engine is None:
+            raise BackupError(f'Sucursal desconocida: {branch}')
+    if engine.dialect.name != 'sqlite':
+        raise BackupError('Los snapshots sólo están soportados para SQLite.')
+    return engine
+
+
+def _copy_database(engine, dest_path, pages, sleep):
+    """Copia la base a dest_path con la API de backup, de a `pages` páginas."""
+    raw = engine.raw_connection()
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            raw.driver_connection.backup(dest, pages=pages, sleep=sleep)
+        finally:
+            dest.close()
+    finally:
+        raw.close()
+
+
+def _snapshot_time(path):
+    name = os.path.basename(path)
+    try:
+        return datetime.strptime(name, FILENAME_FORMAT)
+    except ValueError:
+        return datetime.strptime(name, LEGACY_FILENAME_FORMAT)  # Snapshots anteriores, sin microsegundos
+
+
+def list_snapshots(tier, branch=None):
+    """Snapshots de un nivel, del más nuevo al más viejo."""
+    folder = os.path.join(backup_dir(branch), tier)
+    if not os.path.isdir(folder):
+        return []
+    names = [n for n in os.listdir(folder) if n.startswith('peluqueria-') and n.endswith('.db.gz')]
+    return [os.path.join(folder, n) for n in sorted(names, reverse=True)]
+
+
+def _record_metrics(result, branch=None):
+    """Agrega una línea JSON con los tiempos del snapshot (backups/snapshots.jsonl)."""
+    with open(os.path.join(backup_dir(branch), 'snapshots.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+
+
+@timed_job('backup_snapshot')
+def create_snapshot(now=None, pages=256, sleep=0.005, branch=None):
+    """
+    Crea un snapshot comprimido (de la base principal o de una sucursal) en el
+    nivel hourly y lo promueve a daily/weekly cuando corresponde. Devuelve un
+    dict con rutas, tamaños y tiempos.
+    """
+    engine = _engine(branch)
+    now = now or datetime.now()
+    filename = now.strftime(FILENAME_FORMAT)
+    os.makedirs(os.path.join(backup_dir(branch), 'hourly'), exist_ok=True)
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, 'snapshot.db')
+        _copy_database(engine, raw_path, pages, sleep)
+        copied = time.perf_counter()
+
+        hourly_path = os.path.join(backup_dir(branch), 'hourly', filename)
+        with open(raw_path, 'rb') as src, gzip.open(hourly_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        raw_size = os.path.getsize(raw_path)
+    compressed = time.perf_counter()
+
+    # Promover a los niveles más largos si el último es más viejo que su intervalo
+    promoted = []
+    for tier in ('daily', 'weekly'):
+        existing = list_snapshots(tier, branch)
+        if existing and now - _snapshot_time(existing[0]) < TIER_INTERVALS[tier]:
+            continue
+        os.makedirs(os.path.join(backup_dir(branch), tier), exist_ok=True)
+        target = os.path.join(backup_dir(branch), tier, filename)
+        try:
+            os.link(hourly_path, target)
+        except OSError:
+            shutil.copy2(hourly_path, target)
+        promoted.append(tier)
+
+    removed = rotate_snapshots(branch)
+    result = {
+        'branch': branch,
+        'file': hourly_path,
+        'created_at': now.isoformat(),
+        'promoted': promoted,
+        'removed': removed,
+        'raw_bytes': raw_size,
+        'compressed_bytes': os.path.getsize(hourly_path),
+        'copy_seconds': round(copied - started, 4),
+        'compress_seconds': round(compressed - copied, 4),
+        'total_seconds': round(time.perf_counter() - started, 4),
+    }
+    _record_metrics(result, branch)
+    return result
+
+
+def snapshot_all(now=None):
+    """Un snapshot de la base principal y de cada sucursal, con la misma hora."""
+    now = now or datetime.now()
+    return [create_snapshot(now=now, branch=branch) for branch in databases()]
+
+
+def rotate_snapshots(branch=None):
+    """Borra los snapshots que exceden la retención de cada nivel."""
+    retention = {**DEFAULT_RETENTION, **current_app.config.get('BACKUP_RETENTION', {})}
+    removed = []
+    for tier in TIERS:
+        for path in list_snapshots(tier, branch)[retention[tier]:]:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def _decompress(path, dest_path):
+    with gzip.open(path, 'rb') as src, open(dest_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def verify_snapshot(path):
+    """Descomprime el snapshot y corre PRAGMA integrity_check. Devuelve filas por tabla."""
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, 'verify.db')
+        _decompress(path, raw_path)
+        conn = sqlite3.connect(raw_path)
+        try:
+            status = conn.execute('PRAGMA integrity_check').fetchone()[0]
+            if status != 'ok':
+                raise BackupError(f'Snapshot dañado: {status}')
+            tables = [r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+        finally:
+            conn.close()
+
+
+def restore_snapshot(path, pages=256, branch=None):
+    """Verifica el snapshot y lo vuelca sobre la base principal o la de una sucursal."""
+    engine = _engine(branch)
+    counts = verify_snapshot(path)
+    # Las bases de sucursal no tienen usuarios: así no se pisa una con la otra
+    if branch is not None and 'user' in counts:
+        raise BackupError('El snapshot es de la base principal, no de una sucursal.')
+    if branch is None and 'user' not in counts:
+        raise BackupError('El snapshot es de una sucursal: indicar --branch.')
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, 'restore.db')
+        _decompress(path, raw_path)
+        source = sqlite3.connect(raw_path)
+        db.session.remove()
+        raw = engine.raw_connection()
+        try:
+            source.backup(raw.driver_connection, pages=pages)
+        finally:
+            raw.close()
+            source.close()
+    engine.dispose()
+    return {'tables': counts, 'total_seconds': round(time.perf_counter() - started, 4)}
+
+
+#-------- Comandos CLI --------#
+
+backup_cli = AppGroup('backup', help='Snapshots de la base SQLite.')
+
+
+def _label(branch):
+    return f'sucursal {branch}' if branch else 'principal'
+
+
+@backup_cli.command('snapshot')
+def snapshot_command():
+    """Crea un snapshot de cada base (principal y sucursales) y aplica la rotación."""
+    for result in snapshot_all():
+        click.echo(f"Snapshot {_label(result['branch'])}: {result['file']} "
+                   f"({result['compressed_bytes']:,} bytes comprimido, "
+                   f"copia {result['copy_seconds']}s, compresión {result['compress_seconds']}s)")
+        if result['promoted']:
+            click.echo(f"  Promovido a: {', '.join(result['promoted'])}")
+        for path in result['removed']:
+            click.echo(f"  Rotado: {path}")
+
+
+@backup_cli.command('list')
+def list_command():
+    """Lista los snapshots disponibles por base y nivel."""
+    for branch in databases():
+        click.echo(f'== {_label(branch)} ==')
+        for tier in TIERS:
+            click.echo(f'[{tier}]')
+            for path in list_snapshots(tier, branch):
+                click.echo(f'  {path} ({os.path.getsize(path):,} bytes)')
+
+
+@backup_cli.command('verify')
+@click.argument('path', required=False, type=click.Path(exists=True, dir_okay=False))
+def verify_command(path):
+    """Verifica un snapshot (sin archivo: el último de cada base)."""
+    if path:
+        paths = [path]
+    else:
+        paths = [snapshots[0] for snapshots in (list_snapshots('hourly', b) for b in databases()) if snapshots]
+        missing = [_label(b) for b in databases() if not list_snapshots('hourly', b)]
+        if missing:
+            raise click.ClickException(f"Sin snapshots: {', '.join(missing)}")
+    for snapshot in paths:
+        try:
+            counts = verify_snapshot(snapshot)
+        except (BackupError, sqlite3.DatabaseError, OSError) as e:
+            raise click.ClickException(f'{snapshot}: {e}')
+        click.echo(f'Snapshot OK: {snapshot}')
+        for table, count in counts.items():
+            click.echo(f'  {table}: {count}')
+
+
+@backup_cli.command('restore')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--branch', default=None, help='Sucursal a restaurar (sin opción: la base principal).')
+@click.option('--yes', is_flag=True, help='Confirma que se reemplaza la base actual.')
+def restore_command(path, branch, yes):
+    """Restaura un snapshot sobre la base principal o una sucursal (previa verificación)."""
+    if not yes:
+        raise click.ClickException('La restauración reemplaza la base actual: repetir con --yes.')
+    try:
+        result = restore_snapshot(path, branch=branch)
+    except (BackupError, sqlite3.DatabaseError, OSError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Base restaurada en {result['total_seconds']}s")
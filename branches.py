@@ -0,0 +1,169 @@
+# branches.py
+"""
+Sucursales: una base SQLite por sucursal para turnos, clientes y caja.
+
+Con BRANCHES = {'centro': 'sqlite:///centro.db', 'norte': 'sqlite:///norte.db'}
+cada sucursal tiene su propio archivo y engine, así la carga
+y los bloqueos de una no frenan a la otra. La base principal
+(SQLALCHEMY_DATABASE_URI) guarda lo compartido: usuarios, profesionales y el
+catálogo. Cada conexión de sucursal la adjunta en sólo lectura (ATTACH ...
+AS catalog), así los JOIN de turnos con servicios siguen funcionando.
+
+La sucursal activa se toma del usuario logueado (User.branch) en cada
+request; RoutingSession (extensions.py) usa g.branch para elegir la base.
+Sin BRANCHES la app funciona como siempre, con una sola base.
+
+    flask --app app:create_app branches list
+    flask --app app:create_app branches assign <usuario> <sucursal>
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+from pathlib import Path
+
+import click
+from flask import current_app, g
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.engine import make_url
+
+from extensions import db, BRANCH_TABLES
+from models import Appointment, Payment, User
+
+
+def branch_names():
+    return list(current_app.config.get('BRANCHES', {}))
+
+
+def default_branch():
+    return current_app.config.get('BRANCH_DEFAULT') or next(iter(branch_names()), None)
+
+
+def _branch_engine(app, url, catalog_uri):
+    url = make_url(url)
+    # Igual que Flask-SQLAlchemy: rutas SQLite relativas van a la carpeta instance
+    if url.drivername.startswith('sqlite') and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+
+    # uri=True para que el ATTACH acepte 'file:...?mode=ro'
+    engine = create_engine(url, connect_args={'uri': True})
+
+    @event.listens_for(engine, 'connect')
+    def attach_catalog(dbapi_connection, connection_record):
+        dbapi_connection.execute('ATTACH DATABASE ? AS catalog', (catalog_uri,))
+
+    return engine
+
+
+def init_branch_databases(app):
+    """
+    Crea un engine por sucursal (app.extensions['branch_engines']), con el
+    catálogo compartido adjunto, y las tablas de sucursal que falten. El
+    archivo de la sucursal sólo debe tener tablas de sucursal: una tabla de
+    catálogo ahí taparía la compartida. Llamar después de db.create_all().
+    """
+    branches = app.config.get('BRANCHES', {})
+    app.extensions['branch_engines'] = {}
+    if not branches:
+        return
+
+    catalog_uri = Path(db.engine.url.database).resolve().as_uri() + '?mode=ro'
+    tables = [t for t in db.metadata.sorted_tables if t.name in BRANCH_TABLES]
+    for name, url in branches.items():
+        engine = _branch_engine(app, url, catalog_uri)
+        db.metadata.create_all(engine, tables=tables)
+        app.extensions['branch_engines'][name] = engine
+
+
+def select_branch():
+    """before_request: la sucursal del usuario logueado pasa a ser la activa."""
+    if branch_names() and current_user.is_authenticated:
+        g.branch = current_user.branch or default_branch()
+
+
+@contextmanager
+def use_branch(name):
+    """Activa una sucursal dentro del contexto actual (CLI, reportes)."""
+    previous = g.get('branch')
+    g.branch = name
+    try:
+        yield
+    finally:
+        g.branch = previous
+
+
+#-------- Reporte consolidado --------#
+
+def _branch_summary(app, name, start, end):
+    """Totales de caja de una sucursal, en su propio contexto y sesión (corre en un hilo)."""
+    with app.app_context():
+        g.branch = name
+        try:
+            payments = db.session.query(
+                func.count(Payment.id),
+                func.coalesce(func.sum(Payment.amount), 0),
+                func.coalesce(func.sum(Payment.amount).filter(Payment.payment_type == 'Seña'), 0),
+            ).filter(Payment.date >= start, Payment.date < end).one()
+
+            appointments = db.session.query(
+                func.count(Appointment.id),
+                func.coalesce(func.sum(Appointment.commission_amount), 0),
+            ).filter(
+                Appointment.status == 'Cobrado',
+                Appointment.end_time >= start,
+                Appointment.end_time < end,
+            ).one()
+        finally:
+            db.session.remove()
+
+    return {
+        'branch': name,
+        'payments': payments[0],
+        'total_cash': payments[1],
+        'total_senas': payments[2],
+        'completed': appointments[0],
+        'commissions': appointments[1],
+    }
+
+
+def consolidated_summary(start, end):
+    """Consulta todas las sucursales en paralelo (cada una en su archivo) y suma."""
+    app = current_app._get_current_object()
+    names = branch_names()
+    with ThreadPoolExecutor(max_workers=max(len(names), 1)) as pool:
+        rows = list(pool.map(lambda name: _branch_summary(app, name, start, end), names))
+
+    totals = {key: sum(row[key] for row in rows)
+              for key in ('payments', 'total_cash', 'total_senas', 'completed', 'commissions')}
+    return rows, totals
+
+
+#-------- Comandos CLI --------#
+
+branches_cli = AppGroup('branches', help='Sucursales y asignación de usuarios.')
+
+
+@branches_cli.command('list')
+def list_command():
+    """Lista las sucursales configuradas y sus usuarios."""
+    for name in branch_names():
+        users = [u.username for u in User.query.filter_by(branch=name).order_by(User.username)]
+        marker = ' (por defecto)' if name == default_branch() else ''
+        click.echo(f"{name}{marker}: {current_app.extensions['branch_engines'][name].url} - {', '.join(users) or 'sin usuarios'}")
+
+
+@branches_cli.command('assign')
+@click.argument('username')
+@click.argument('branch')
+def assign_command(username, branch):
+    """Asigna un usuario a una sucursal."""
+    if branch not in branch_names():
+        raise click.ClickException(f"Sucursal desconocida: {branch}. Configuradas: {', '.join(branch_names())}")
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'No existe el usuario {username}.')
+    user.branch = branch
+    db.session.commit()
+    click.echo(f'{username} -> {branch}')
@@ -0,0 +1,163 @@
+# cache.py
+"""
+Cachés por worker: búsquedas del autocompletado y usuario de la sesión.
+
+Búsquedas: cada tecla dispara una búsqueda nueva ("R", "Ro", "Roc", ...). Como las
+búsquedas son por "contiene", el resultado de "Rocky" es un subconjunto del
+de "Rock": si ese resultado previo estaba completo (no fue cortado por el
+LIMIT) se filtra en memoria en vez de volver a la base. Las escrituras de
+este worker invalidan la caché al instante; las de otros workers (o de
+otros procesos, como import-csv) se ven al vencer SEARCH_CACHE_TTL.
+
+Usuario de la sesión: Flask-Login lo carga en cada request (cada tecla del
+autocompletado, cada refetch del calendario). UserCache guarda el User
+desacoplado de la sesión por USER_CACHE_TTL segundos; los cambios hechos en
+este worker lo invalidan al instante y los de otros workers, al vencer el TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User
+
+
+class PrefixSearchCache:
+    """LRU acotado de resultados de búsqueda, con reutilización por prefijo."""
+
+    def __init__(self, max_entries=256, ttl=10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (namespace, query) -> (rows, complete, vence)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query):
+        """Minúsculas y espacios colapsados: 'Rocky  ' y 'rocky' son la misma clave."""
+        return ' '.join(query.lower().split())
+
+    def get(self, namespace, query, matches=None):
+        """
+        Devuelve las filas cacheadas para `query` o None.
+
+        Si no hay entrada exacta y se pasa `matches(row, query)`, busca el
+        prefijo más largo con resultado completo y lo filtra en memoria.
+        """
+        key = self.normalize(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live((namespace, key), now)
+            if entry is not None:
+                self._entries.move_to_end((namespace, key))
+                return entry[0]
+
+            if matches is None:
+                return None
+
+            for length in range(len(key) - 1, -1, -1):
+                prefix_entry = self._live((namespace, key[:length]), now)
+                if prefix_entry is None or not prefix_entry[1]:
+                    continue
+                rows = [row for row in prefix_entry[0] if matches(row, key)]
+                # Vence junto con el prefijo del que salió
+                self._store((namespace, key), rows, True, prefix_entry[2])
+                return rows
+        return None
+
+    def put(self, namespace, query, rows, complete):
+        """Guarda un resultado; `complete` indica que no fue truncado por el LIMIT."""
+        if not self.ttl:
+            return
+        with self._lock:
+            self._store((namespace, self.normalize(query)), rows, complete, time.monotonic() + self.ttl)
+
+    def invalidate(self, namespace=None):
+        """Descarta todo (o sólo un namespace) tras escribir dueños o perros."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[key]
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key, rows, complete, expires):
+        self._entries[key] = (rows, complete, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def get_search_cache():
+    """Caché de búsquedas de la app actual (una por worker)."""
+    return current_app.extensions['search_cache']
+
+
+def search_namespace(name):
+    """Namespace de la caché para la sucursal activa: cada sucursal tiene sus clientes."""
+    branch = g.get('branch')
+    return f'{branch}:{name}' if branch else name
+
+
+def invalidate_search_cache():
+    """Invalida las búsquedas de perros y dueños después de una escritura."""
+    get_search_cache().invalidate()
+
+
+class UserCache:
+    """Usuarios logueados por id, con vencimiento (uno por worker)."""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._entries = {}  # user_id -> (User desacoplado, vence)
+        self._lock = threading.Lock()
+
+    def load(self, user_id):
+        """User de la sesión actual, sin consultar la base si está cacheado."""
+        if not self.ttl:
+            return db.session.get(User, user_id)
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            # Sesión aparte: al cerrarse el User queda desacoplado con sus columnas cargadas
+            with Session(db.engine) as session:
+                user = session.get(User, user_id)
+            if user is None:
+                return None
+            entry = (user, time.monotonic() + self.ttl)
+            with self._lock:
+                self._entries[user_id] = entry
+
+        # Copia dentro de la sesión del request sin ir a la base
+        return db.session.merge(entry[0], load=False)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def get_user_cache():
+    """Caché de usuarios de la app actual (una por worker)."""
+    return current_app.extensions['user_cache']
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    if has_app_context() and 'user_cache' in current_app.extensions:
+        get_user_cache().invalidate(target.id)
@@ -0,0 +1,107 @@
+# compression.py
+"""
+Compresión de respuestas HTML, JSON y texto (gzip; brotli si está instalado).
+
+/appointments, /api/dogs y los historiales devuelven JSON y HTML muy
+repetitivos: comprimidos pesan una fracción, lo que se nota en las tablets
+con el Wi-Fi del local.
+
+- Sólo respuestas 200 de tipos de texto desde COMPRESS_MIN_SIZE bytes (1 KB).
+- No toca respuestas ya comprimidas (Content-Encoding, ej. /assets/),
+  archivos (send_file) ni streaming (stream_template: se mandaría entero al
+  final), ni las que piden Cache-Control: no-transform.
+- Si la respuesta trae ETag, pasa a débil (W/"..."): el cuerpo cambia de
+  bytes pero no de contenido, y If-None-Match compara en forma débil, así
+  que make_conditional sigue respondiendo 304.
+- El mismo cuerpo servido una y otra vez (el JSON del calendario, el
+  catálogo) no se vuelve a comprimir: un LRU por worker guarda los
+  comprimidos por hash del cuerpo (COMPRESS_CACHE_SIZE entradas).
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli sólo gzip
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+    'application/json', 'application/javascript', 'image/svg+xml',
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5    # Dinámico: el 11 de los assets es demasiado lento por request
+MAX_CACHED_BODY = 1024 * 1024
+
+
+class CompressionCache:
+    """LRU de cuerpos ya comprimidos: (encoding, hash del cuerpo) -> bytes."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compress(self, encoding, data):
+        if self.max_entries <= 0 or len(data) > MAX_CACHED_BODY:
+            return _compress(encoding, data)
+        key = (encoding, hashlib.blake2b(data, digest_size=16).digest())
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+        compressed = _compress(encoding, data)
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+def _compress(encoding, data):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.cache_control.no_transform):
+        return response
+    data = response.get_data()
+    if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    # Con o sin compresión, los caches intermedios tienen que separar por encoding
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(current_app.extensions['compression_cache'].compress(encoding, data))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.extensions['compression_cache'] = CompressionCache(app.config.get('COMPRESS_CACHE_SIZE', 128))
+    app.after_request(compress_response)
@@ -0,0 +1,111 @@
+# day_close.py
+"""
+Cierre del día.
+
+En vez de abrir la caja de cada turno terminado, close_day cierra el día en
+una sola transacción:
+
+1. Un UPDATE para los turnos del día pagos por completo que todavía no
+   estaban cobrados: estado 'Cobrado' y comisión según el porcentaje actual de la peluquera (mismo
+   cálculo que utils.recalcular_estado_pago).
+2. Arqueo de caja: pagos y señas del día agrupados por medio de pago, y
+   comisiones por peluquera, con GROUP BY en la base.
+3. Guarda todo en DayClose (una fila por día): volver a ver el cierre es
+   leer esa fila.
+
+Los turnos son del día en que terminan (end_time), igual que en /sales.
+Cerrar de nuevo el mismo día (un pago tardío) rehace los cálculos y
+reemplaza la fila; los turnos que ya estaban cobrados no se tocan.
+La ruta sólo cierra hoy, o un día anterior si se confirma.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from extensions import db
+from models import Appointment, DayClose, Payment, Professional
+from utils import recalcular_estadisticas_perro
+
+
+def _day_range(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def _of_day(start, end):
+    # Por end_time, igual que las comisiones de /sales: un turno que cruza la
+    # medianoche es del día en que terminó (ix_appointment_status_end)
+    return [
+        Appointment.is_deleted == False,
+        Appointment.end_time >= start,
+        Appointment.end_time < end,
+    ]
+
+
+def close_appointments(start, end):
+    """Marca cobrados, con su comisión, los turnos del día pagos por completo. Devuelve cuántos cambió."""
+    commission_pct = select(Professional.commission_percentage).where(
+        Professional.id == Appointment.professional_id
+    ).scalar_subquery()
+
+    stmt = update(Appointment).where(
+        *_of_day(start, end),
+        Appointment.status != 'Cobrado',
+        Appointment.amount_paid > 0,
+        Appointment.amount_paid >= Appointment.final_price,
+    ).values(
+        status='Cobrado',
+        commission_amount=Appointment.final_price * func.coalesce(commission_pct, 0) / 100,
+        version_id=Appointment.version_id + 1,
+    ).returning(Appointment.dog_id)
+    dog_ids = db.session.execute(stmt, execution_options={'synchronize_session': 'fetch'}).scalars().all()
+    recalcular_estadisticas_perro(*dog_ids)
+    return len(dog_ids)
+
+
+def cash_drawer(start, end):
+    """Pagos del día por medio de pago y tipo (Pago / Seña)."""
+    rows = db.session.execute(
+        select(Payment.payment_method, Payment.payment_type, func.count(Payment.id), func.sum(Payment.amount))
+        .where(Payment.date >= start, Payment.date < end)
+        .group_by(Payment.payment_method, Payment.payment_type)
+        .order_by(Payment.payment_method, Payment.payment_type)
+    )
+    return [{'method': method, 'type': kind, 'count': count, 'total': total}
+            for method, kind, count, total in rows]
+
+
+def commissions_by_professional(start, end):
+    total = func.sum(Appointment.commission_amount)
+    rows = db.session.execute(
+        select(func.coalesce(Professional.name, 'Sin asignar'), func.count(Appointment.id), total)
+        .select_from(Appointment)
+        .outerjoin(Professional, Professional.id == Appointment.professional_id)
+        .where(*_of_day(start, end), Appointment.status == 'Cobrado')
+        .group_by(Professional.id, Professional.name)
+        .order_by(total.desc())
+    )
+    return [{'professional': name, 'appointments': count, 'commission': commission or 0}
+            for name, count, commission in rows]
+
+
+def close_day(day, closed_by=None):
+    """Cierra `day` (date) y devuelve su DayClose, ya commiteado."""
+    start, end = _day_range(day)
+    closed = close_appointments(start, end)
+    drawer = cash_drawer(start, end)
+    commissions = commissions_by_professional(start, end)
+
+    record = DayClose.query.filter_by(date=day).first() or DayClose(date=day)
+    record.closed_at = datetime.now()
+    record.closed_by = closed_by
+    record.appointments_closed = closed
+    record.total_payments = sum(row['total'] for row in drawer if row['type'] == 'Pago')
+    record.total_deposits = sum(row['total'] for row in drawer if row['type'] == 'Seña')
+    record.total_cash = sum(row['total'] for row in drawer)
+    record.total_commissions = sum(row['commission'] for row in commissions)
+    record.drawer = drawer
+    record.commissions = commissions
+    db.session.add(record)
+    db.session.commit()
+    return record
@@ -1,7 +1,43 @@
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import LoginManager
 from flask_migrate import Migrate
+from sqlalchemy import inspect
+from sqlalchemy.sql.util import find_tables
 
-db = SQLAlchemy()
+
+# Tablas propias de cada sucursal; usuarios, profesionales y catálogo son compartidos
+BRANCH_TABLES = frozenset({
+    'owner', 'dog', 'dog_stats', 'medical_note', 'appointment', 'appointment_items', 'payment', 'day_close',
+})
+
+
+class RoutingSession(Session):
+    """
+    Sesión que manda las consultas sobre tablas de sucursal a la base de la
+    sucursal activa (g.branch, ver branches.py) y los SELECT de las rutas
+    marcadas a la réplica de lectura (g.read_replica, ver replica.py). Sin
+    ninguna de las dos se comporta igual que la sesión de Flask-SQLAlchemy.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if g.get('branch') and _touches_branch_tables(mapper, clause):
+                return current_app.extensions['branch_engines'][g.branch]
+            # El flush no trae clause: las escrituras nunca van a la réplica
+            if g.get('read_replica') and getattr(clause, 'is_select', False):
+                return current_app.extensions['read_replica'].engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _touches_branch_tables(mapper, clause):
+    tables = list(inspect(mapper).tables) if mapper is not None else []
+    if clause is not None:
+        tables += find_tables(clause, include_crud=True)
+    return any(getattr(table, 'name', None) in BRANCH_TABLES for table in tables)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, SelectField, IntegerField, TextAreaField, DateTimeLocalField, SelectMultipleField, RadioField, HiddenField
-from wtforms.validators import DataRequired, Length, NumberRange, Optional
+from wtforms import StringField, PasswordField, SubmitField, SelectField, IntegerField, TextAreaField, DateTimeLocalField, SelectMultipleField, RadioField, HiddenField, DecimalField, BooleanField, DateField
+from wtforms.validators import DataRequired, InputRequired, Length, NumberRange, Optional
 
 #Formulario de Login
 
@@ -76,3 +76,19 @@ class ItemForm(FlaskForm):
     price = IntegerField('Precio', validators=[DataRequired(), NumberRange(min=0)])
     is_active = SelectField('Estado', choices=[(1, 'Activo'), (0, 'Inactivo')], coerce=int)
     submit = SubmitField('Guardar Adicional')
+
+class RepricingForm(FlaskForm):
+    percent = DecimalField('Aumento (%)', places=2, validators=[InputRequired(), NumberRange(min=-90, max=500)])
+    round_to = IntegerField('Redondear a múltiplos de ($)', default=100, validators=[Optional(), NumberRange(min=1)])
+    include_services = BooleanField('Servicios', default=True)
+    category_ids = SelectMultipleField('Categorías (todas si no se elige ninguna)', coerce=int, validators=[Optional()])
+    size_ids = SelectMultipleField('Tamaños (todos si no se elige ninguno)', coerce=int, validators=[Optional()])
+    include_items = BooleanField('Adicionales', default=True)
+    item_ids = SelectMultipleField('Adicionales (todos si no se elige ninguno)', coerce=int, validators=[Optional()])
+    preview = SubmitField('Vista Previa')
+    submit = SubmitField('Aplicar Precios')
+
+class DayCloseForm(FlaskForm):
+    date = DateField('Día', validators=[DataRequired()])
+    confirm_past = BooleanField('Cerrar un día anterior')
+    submit = SubmitField('Cerrar Día')
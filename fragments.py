@@ -0,0 +1,140 @@
+# fragments.py
+"""
+Caché de fragmentos del catálogo (servicios y adicionales).
+
+La grilla de servicios, los checkboxes de adicionales y los JSON de precios
+sólo cambian cuando se edita el catálogo. Se renderizan una vez por versión
+del catálogo (tabla catalog_version, la incrementan las rutas de servicios,
+items, categorías y tamaños) y las páginas sólo pegan el HTML ya armado.
+Los selects y checkboxes con selección (editar turno, caja) se cachean como
+datos y se renderizan por request con `render_selectable`.
+"""
+import json
+import threading
+
+from flask import current_app, g, render_template
+from markupsafe import Markup
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import CatalogVersion, Service, ServiceCategory, Item
+
+
+class FragmentCache:
+    """Fragmentos renderizados de la versión actual del catálogo (uno por worker)."""
+
+    def __init__(self):
+        self._version = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, name, builder):
+        with self._lock:
+            if version != self._version:
+                # Cambió el catálogo: todo lo anterior queda viejo
+                self._version = version
+                self._entries = {}
+            if name in self._entries:
+                return self._entries[name]
+
+        value = builder()
+        with self._lock:
+            if version == self._version:
+                self._entries[name] = value
+        return value
+
+
+def current_catalog_version():
+    """Versión del catálogo, leída una sola vez por request."""
+    if 'catalog_version' not in g:
+        g.catalog_version = db.session.query(CatalogVersion.version).filter_by(id=1).scalar() or 0
+    return g.catalog_version
+
+
+def forget_catalog_version():
+    """before_request: cada request vuelve a leer la versión del catálogo."""
+    g.pop('catalog_version', None)
+
+
+def bump_catalog_version():
+    """Invalida los fragmentos de todos los workers. Llamar antes del commit."""
+    # Una sola fila (id=1), creada o incrementada en la misma sentencia
+    upsert = insert(CatalogVersion).values(id=1, version=1)
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=[CatalogVersion.id], set_={'version': CatalogVersion.version + 1}))
+    g.pop('catalog_version', None)
+
+
+def catalog_fragment(name):
+    """Devuelve el fragmento `name` para la versión actual del catálogo."""
+    cache = current_app.extensions['fragment_cache']
+    return cache.get(current_catalog_version(), name, _BUILDERS[name])
+
+
+def render_selectable(template, selected, **context):
+    """Renderiza un partial del catálogo marcando los ids de `selected` (no se cachea)."""
+    return Markup(render_template(template, selected=set(selected or ()), **context))
+
+
+#-------- Constructores (sólo corren cuando cambia el catálogo) --------#
+
+def _active_services():
+    return Service.query.options(
+        joinedload(Service.category), joinedload(Service.size)
+    ).filter_by(is_active=True).all()
+
+
+def _active_items():
+    return Item.query.filter_by(is_active=True).all()
+
+
+def _service_choices():
+    return [(s.id, f"{s.name} - ${s.base_price:,.0f}") for s in _active_services()]
+
+
+def _item_choices():
+    return [(i.id, f"{i.name} (+${i.price:,.0f})") for i in _active_items()]
+
+
+def _service_grid():
+    services = _active_services()
+    categories = ServiceCategory.query.filter_by(is_active=True).order_by(ServiceCategory.display_order).all()
+    services_by_category = {}
+    for category in categories:
+        category_services = [s for s in services if s.category_id == category.id]
+        if category_services:
+            services_by_category[category] = category_services
+    return Markup(render_template('partials/service_grid.html', services_by_category=services_by_category))
+
+
+def _item_checkboxes():
+    return render_selectable('partials/item_checkboxes.html', (), item_choices=catalog_fragment('item_choices'))
+
+
+def _service_rows():
+    return [(s.id, s.name, s.duration_minutes, s.base_price) for s in _active_services()]
+
+
+def _item_rows():
+    return [(i.id, i.name, i.price) for i in _active_items()]
+
+
+def _services_json():
+    return json.dumps({s.id: s.base_price for s in _active_services()})
+
+
+def _items_json():
+    return json.dumps({i.id: i.price for i in _active_items()})
+
+
+_BUILDERS = {
+    'service_choices': _service_choices,
+    'item_choices': _item_choices,
+    'service_grid': _service_grid,
+    'item_checkboxes': _item_checkboxes,
+    'service_rows': _service_rows,
+    'item_rows': _item_rows,
+    'services_json': _services_json,
+    'items_json': _items_json,
+}
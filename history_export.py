@@ -0,0 +1,202 @@
+# history_export.py
+"""
+Exportación columnar del historial de ventas (turnos, pagos y adicionales).
+
+Con pyarrow instalado escribe un Parquet por tabla (comprimido con zstd):
+quien lo analiza lee sólo las columnas que necesita. Sin pyarrow escribe
+CSV comprimidos con gzip, partidos cada `rows_per_file` filas. En los dos
+casos manifest.json guarda las columnas con su tipo, los archivos y la
+cantidad de filas, para cargarlos tipados (ej. pandas usecols/dtype).
+
+Lee en lotes con yield_per (sin cargar todo el historial en memoria) y de
+la réplica de lectura si hay una. Con sucursales exporta una carpeta por
+sucursal.
+
+    flask --app app:create_app export history --out exports/2025-06 --format auto
+"""
+import csv
+import gzip
+import json
+import os
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+from branches import branch_names, use_branch
+from extensions import db
+from models import Appointment, Item, Payment, appointment_items
+from metrics import timed_job
+from replica import read_replica
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Opcional: sin pyarrow se exporta CSV comprimido
+    pa = None
+
+
+BATCH_SIZE = 5000
+ROWS_PER_FILE = 200_000
+
+APPOINTMENT_COLUMNS = [
+    ('id', 'int64'), ('dog_id', 'int64'), ('service_id', 'int64'), ('professional_id', 'int64'),
+    ('start_time', 'timestamp'), ('end_time', 'timestamp'), ('status', 'string'), ('is_deleted', 'bool'),
+    ('total_amount', 'float64'), ('discount_type', 'string'), ('discount_value', 'float64'),
+    ('final_price', 'float64'), ('commission_amount', 'float64'), ('amount_paid', 'float64'),
+]
+PAYMENT_COLUMNS = [
+    ('id', 'int64'), ('appointment_id', 'int64'), ('amount', 'float64'), ('date', 'timestamp'),
+    ('payment_method', 'string'), ('payment_type', 'string'), ('notes', 'string'),
+]
+APPOINTMENT_ITEM_COLUMNS = [('appointment_id', 'int64'), ('item_id', 'int64'), ('item_name', 'string')]
+
+
+def _model_select(model, columns):
+    return select(*[getattr(model, name) for name, _ in columns]).order_by(model.id)
+
+
+def tables():
+    """Nombre -> (SELECT, columnas con tipo)."""
+    return {
+        'appointments': (_model_select(Appointment, APPOINTMENT_COLUMNS), APPOINTMENT_COLUMNS),
+        'payments': (_model_select(Payment, PAYMENT_COLUMNS), PAYMENT_COLUMNS),
+        'appointment_items': (
+            select(appointment_items.c.appointment_id, appointment_items.c.item_id, Item.name)
+            .join(Item, Item.id == appointment_items.c.item_id)
+            .order_by(appointment_items.c.appointment_id, appointment_items.c.item_id),
+            APPOINTMENT_ITEM_COLUMNS,
+        ),
+    }
+
+
+def _batches(statement, batch_size):
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+
+#-------- Formatos --------#
+
+def _write_parquet(path, statement, columns, batch_size):
+    types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(),
+             'bool': pa.bool_(), 'timestamp': pa.timestamp('us')}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in _batches(statement, batch_size):
+            values = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema
+            ))
+            rows += len(batch)
+    return [os.path.basename(path)], rows
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def _write_csv_parts(base_path, statement, columns, batch_size, rows_per_file):
+    files, rows, f, writer = [], 0, None, None
+
+    def next_part():
+        path = f'{base_path}-{len(files):05d}.csv.gz'
+        part = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        part_writer = csv.writer(part)
+        part_writer.writerow([name for name, _ in columns])
+        files.append(os.path.basename(path))
+        return part, part_writer
+
+    try:
+        for batch in _batches(statement, batch_size):
+            for row in batch:
+                if f is None or rows % rows_per_file == 0:
+                    if f is not None:
+                        f.close()
+                    f, writer = next_part()
+                writer.writerow([_csv_value(v) for v in row])
+                rows += 1
+        if f is None:
+            f, writer = next_part()  # Tabla vacía: igual queda el encabezado
+    finally:
+        if f is not None:
+            f.close()
+    return files, rows
+
+
+#-------- Exportación --------#
+
+def resolve_format(fmt):
+    if fmt == 'auto':
+        return 'parquet' if pa is not None else 'csv'
+    if fmt == 'parquet' and pa is None:
+        raise click.ClickException('Para exportar Parquet hay que instalar pyarrow.')
+    return fmt
+
+
+def _export_tables(out_dir, fmt, batch_size, rows_per_file):
+    os.makedirs(out_dir, exist_ok=True)
+    exported = {}
+    for name, (statement, columns) in tables().items():
+        if fmt == 'parquet':
+            files, rows = _write_parquet(os.path.join(out_dir, f'{name}.parquet'), statement, columns, batch_size)
+        else:
+            files, rows = _write_csv_parts(os.path.join(out_dir, name), statement, columns,
+                                           batch_size, rows_per_file)
+        exported[name] = {
+            'columns': [{'name': column, 'type': kind} for column, kind in columns],
+            'files': files,
+            'rows': rows,
+        }
+    return exported
+
+
+@timed_job('export_history')
+def export_history(out_dir, fmt='auto', batch_size=BATCH_SIZE, rows_per_file=ROWS_PER_FILE):
+    """Exporta el historial a out_dir y devuelve el manifiesto (también en manifest.json)."""
+    fmt = resolve_format(fmt)
+    manifest = {'format': fmt, 'exported_at': datetime.now().isoformat(timespec='seconds')}
+
+    with read_replica():
+        if branch_names():
+            manifest['branches'] = {}
+            for branch in branch_names():
+                with use_branch(branch):
+                    manifest['branches'][branch] = _export_tables(
+                        os.path.join(out_dir, branch), fmt, batch_size, rows_per_file)
+        else:
+            manifest['tables'] = _export_tables(out_dir, fmt, batch_size, rows_per_file)
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+#-------- Comandos CLI --------#
+
+export_cli = AppGroup('export', help='Exportaciones para análisis.')
+
+
+@export_cli.command('history')
+@click.option('--out', 'out_dir', type=click.Path(file_okay=False),
+              help='Carpeta de salida (por defecto instance/exports/<fecha>).')
+@click.option('--format', 'fmt', type=click.Choice(['auto', 'parquet', 'csv']), default='auto', show_default=True)
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True, help='Filas por lote (yield_per).')
+def history_command(out_dir, fmt, batch_size):
+    """Exporta turnos, pagos y adicionales en formato columnar."""
+    out_dir = out_dir or os.path.join(current_app.instance_path, 'exports',
+                                      datetime.now().strftime('%Y%m%d-%H%M%S'))
+    manifest = export_history(out_dir, fmt, batch_size)
+    for scope, exported in (manifest.get('branches') or {'': manifest['tables']}).items():
+        for name, info in exported.items():
+            click.echo(f"{scope + '/' if scope else ''}{name}: {info['rows']:,} filas en {len(info['files'])} archivo(s)")
+    click.echo(f"Exportado en {manifest['format']} a {out_dir}")
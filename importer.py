@@ -0,0 +1,254 @@
+# importer.py
+"""
+Importación masiva de dueños, perros y turnos históricos desde CSV.
+
+Lee el archivo en bloques (chunks), deduplica dueños por teléfono normalizado, perros
+por (dueño, nombre) y turnos por (perro, inicio) con índices en memoria, e
+inserta cada bloque con INSERT multi-fila (executemany) en una sola
+transacción por bloque. Volver a importar el mismo archivo no duplica nada.
+
+Los turnos 'Cobrado' se importan con un pago por el precio (medio
+'Importado', fecha del turno) para que saldo y caja cierren; cualquier otro
+estado queda 'Pendiente', porque el archivo no trae cuánto se pagó.
+
+Acepta la planilla de alta (owner_name, owner_phone, owner_address,
+dog_name, start, end, description, status, price) o el backup
+export/turnosBackup.csv (ID, Perro, Inicio, Fin, Descripcion).
+
+    flask --app app:create_app import-csv planilla.csv --chunk-size 2000
+
+Con sucursales (BRANCHES) dueños, perros y turnos van a la base de una
+sucursal: hay que indicarla con --branch.
+"""
+import csv
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from sqlalchemy import insert, select
+
+from branches import branch_names, use_branch
+from cache import invalidate_search_cache
+from extensions import db
+from models import Appointment, Dog, Owner, Payment, normalize_phone
+from utils import recalcular_estadisticas_perro
+
+
+# Encabezados aceptados -> campo interno
+COLUMN_ALIASES = {
+    'owner_name': 'owner_name', 'dueño': 'owner_name', 'dueno': 'owner_name',
+    'owner_phone': 'owner_phone', 'telefono': 'owner_phone', 'teléfono': 'owner_phone',
+    'owner_address': 'owner_address', 'direccion': 'owner_address', 'dirección': 'owner_address',
+    'dog_name': 'dog_name', 'perro': 'dog_name',
+    'start': 'start', 'inicio': 'start',
+    'end': 'end', 'fin': 'end',
+    'description': 'description', 'descripcion': 'description', 'descripción': 'description',
+    'status': 'status', 'estado': 'status',
+    'price': 'price', 'precio': 'price',
+}
+
+DATE_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M', '%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+# Dueño al que van los perros de archivos sin datos de dueño (backup de turnos)
+PLACEHOLDER_OWNER = 'Sin datos (importado)'
+
+# Medio de pago de los turnos que llegan ya cobrados
+IMPORTED_PAYMENT_METHOD = 'Importado'
+
+
+def parse_datetime(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f'Fecha inválida: {value!r}')
+
+
+def _owner_key(name, phone_normalized):
+    """Clave de deduplicación: teléfono normalizado si hay, si no el nombre."""
+    if phone_normalized:
+        return ('phone', phone_normalized)
+    if name:
+        return ('name', name.lower())
+    return ('name', PLACEHOLDER_OWNER.lower())
+
+
+class Importer:
+    """Mantiene los índices en memoria entre bloques."""
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.owners = {}  # clave -> owner_id
+        self.dogs = {}    # (owner_id, nombre en minúsculas) -> dog_id
+        self.appointments = set()  # (dog_id, inicio)
+        self.stats = {'rows': 0, 'owners': 0, 'dogs': 0, 'appointments': 0, 'payments': 0,
+                      'duplicates': 0, 'skipped': 0, 'errors': []}
+
+    def load_indexes(self):
+        """Precarga dueños, perros y turnos existentes (una consulta por tabla)."""
+        for owner_id, name, phone in db.session.execute(select(Owner.id, Owner.name, Owner.phone_normalized)):
+            self.owners.setdefault(_owner_key(name, phone), owner_id)
+        for dog_id, owner_id, name in db.session.execute(
+            select(Dog.id, Dog.owner_id, Dog.name).where(Dog.is_deleted == False)
+        ):
+            self.dogs.setdefault((owner_id, name.lower()), dog_id)
+        # También los borrados: un turno que se borró a mano no vuelve a aparecer
+        self.appointments.update(db.session.execute(select(Appointment.dog_id, Appointment.start_time)))
+
+    def run(self, rows, progress=None):
+        started = time.perf_counter()
+        self.load_indexes()
+        rows = iter(rows)
+        line = 1
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk, first_line=line + 1)
+            line += len(chunk)
+            if progress:
+                progress(self.stats, time.perf_counter() - started)
+
+        invalidate_search_cache()
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed else 0.0
+        return self.stats
+
+    def import_chunk(self, chunk, first_line):
+        parsed = []
+        for offset, raw in enumerate(chunk):
+            self.stats['rows'] += 1
+            row = {COLUMN_ALIASES[k.strip().lower()]: (v or '').strip()
+                   for k, v in raw.items() if k and k.strip().lower() in COLUMN_ALIASES}
+            try:
+                row['start'] = parse_datetime(row.get('start'))
+                row['end'] = parse_datetime(row.get('end'))
+                row['price'] = float(row['price']) if row.get('price') else 0.0
+            except ValueError as e:
+                self.stats['skipped'] += 1
+                if len(self.stats['errors']) < 20:
+                    self.stats['errors'].append(f'Línea {first_line + offset}: {e}')
+                continue
+            parsed.append(row)
+
+        # 1. Dueños nuevos del bloque (un INSERT multi-fila con RETURNING)
+        new_owners = {}
+        for row in parsed:
+            phone_normalized = normalize_phone(row.get('owner_phone'))
+            name = row.get('owner_name') or (PLACEHOLDER_OWNER if not phone_normalized else '')
+            key = _owner_key(name, phone_normalized)
+            row['owner_key'] = key
+            if key not in self.owners and key not in new_owners:
+                new_owners[key] = {
+                    'name': name or row.get('owner_phone'),
+                    'phone': row.get('owner_phone') or None,
+                    # El INSERT masivo no pasa por @validates: se completa a mano
+                    'phone_normalized': phone_normalized,
+                    'address': row.get('owner_address') or None,
+                }
+        if new_owners:
+            ids = db.session.execute(
+                insert(Owner).returning(Owner.id, sort_by_parameter_order=True), list(new_owners.values())
+            ).scalars().all()
+            self.owners.update(zip(new_owners, ids))
+            self.stats['owners'] += len(ids)
+
+        # 2. Perros nuevos del bloque
+        new_dogs = {}
+        for row in parsed:
+            if not row.get('dog_name'):
+                continue
+            key = (self.owners[row['owner_key']], row['dog_name'].lower())
+            row['dog_key'] = key
+            if key not in self.dogs and key not in new_dogs:
+                new_dogs[key] = {'name': row['dog_name'], 'owner_id': key[0], 'is_deleted': False}
+        if new_dogs:
+            ids = db.session.execute(
+                insert(Dog).returning(Dog.id, sort_by_parameter_order=True), list(new_dogs.values())
+            ).scalars().all()
+            self.dogs.update(zip(new_dogs, ids))
+            self.stats['dogs'] += len(ids)
+
+        # 3. Turnos históricos que no estén ya cargados (mismo perro y mismo inicio)
+        appointments = []
+        for row in parsed:
+            if not row.get('dog_key') or not row['start']:
+                continue
+            key = (self.dogs[row['dog_key']], row['start'])
+            if key in self.appointments:
+                self.stats['duplicates'] += 1
+                continue
+            self.appointments.add(key)
+            paid = row['price'] if row.get('status', '').lower() == 'cobrado' and row['price'] > 0 else 0.0
+            appointments.append({
+                'dog_id': key[0],
+                'start_time': row['start'],
+                'end_time': row['end'] or row['start'] + timedelta(hours=1),
+                'description': row.get('description') or None,
+                'status': 'Cobrado' if paid else 'Pendiente',
+                'total_amount': row['price'],
+                'final_price': row['price'],
+                'amount_paid': paid,
+            })
+        if appointments:
+            ids = db.session.execute(
+                insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True), appointments
+            ).scalars().all()
+            self.stats['appointments'] += len(ids)
+
+            # 4. El pago de los que llegan cobrados
+            payments = [{
+                'appointment_id': appointment_id,
+                'amount': a['amount_paid'],
+                'date': a['start_time'],
+                'payment_method': IMPORTED_PAYMENT_METHOD,
+                'payment_type': 'Pago',
+                'notes': 'Importado desde CSV',
+            } for appointment_id, a in zip(ids, appointments) if a['amount_paid']]
+            if payments:
+                db.session.execute(insert(Payment), payments)
+                self.stats['payments'] += len(payments)
+            recalcular_estadisticas_perro(*{a['dog_id'] for a in appointments})
+
+        db.session.commit()
+
+
+def import_csv(path, chunk_size=1000, progress=None, branch=None):
+    """Importa un CSV (UTF-8) en la base principal o en la de `branch`."""
+    if branch is None and branch_names():
+        raise ValueError('Hay sucursales configuradas: indicar la sucursal destino.')
+    if branch is not None and branch not in branch_names():
+        raise ValueError(f'Sucursal desconocida: {branch}')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if branch is None:
+            return Importer(chunk_size).run(csv.DictReader(f), progress)
+        with use_branch(branch):
+            return Importer(chunk_size).run(csv.DictReader(f), progress)
+
+
+@click.command('import-csv')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=1000, show_default=True, help='Filas por transacción.')
+@click.option('--branch', default=None, help='Sucursal destino (obligatoria si hay BRANCHES).')
+def import_csv_command(path, chunk_size, branch):
+    """Importa dueños, perros y turnos históricos desde un CSV."""
+    def progress(stats, elapsed):
+        click.echo(f"  {stats['rows']:,} filas ({stats['rows'] / elapsed:,.0f} filas/s)")
+
+    try:
+        stats = import_csv(path, chunk_size, progress, branch=branch)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"Importadas {stats['rows']:,} filas en {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} filas/s): "
+        f"{stats['owners']} dueños, {stats['dogs']} perros, {stats['appointments']} turnos "
+        f"({stats['payments']} cobrados), {stats['duplicates']} turnos repetidos, {stats['skipped']} salteadas."
+    )
+    for error in stats['errors']:
+        click.echo(f'  {error}')
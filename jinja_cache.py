@@ -0,0 +1,54 @@
+# jinja_cache.py
+"""
+Templates precompilados.
+
+Jinja compila cada template la primera vez que se usa, en cada worker, así
+que los primeros requests después de un deploy o reinicio pagan la
+compilación de turnos.html, edit_appointment.html, etc.
+
+- El bytecode compilado se guarda en JINJA_BYTECODE_CACHE
+  (instance/jinja_cache por defecto; None lo desactiva). Lo comparten todos
+  los workers y sobrevive a los reinicios; si el template cambia, Jinja lo
+  detecta por checksum y lo recompila.
+- Al arrancar (TEMPLATE_WARMUP, activado por defecto) se cargan todos los
+  templates: los que ya están en el directorio sólo se leen.
+
+Para dejar el caché listo antes de levantar los workers:
+    flask --app app:create_app templates compile
+"""
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_template_cache(app):
+    """Configura el caché de bytecode en disco (llamar antes del primer render)."""
+    directory = app.config.get('JINJA_BYTECODE_CACHE', os.path.join(app.instance_path, 'jinja_cache'))
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def warm_templates(app):
+    """Carga (y compila si hace falta) todos los templates. Devuelve cuántos."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+templates_cli = AppGroup('templates', help='Templates precompilados')
+
+
+@templates_cli.command('compile')
+def compile_command():
+    """Compila todos los templates al caché de bytecode."""
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException('JINJA_BYTECODE_CACHE está desactivado.')
+    started = time.perf_counter()
+    count = warm_templates(current_app)
+    click.echo(f'{count} templates compilados en {time.perf_counter() - started:.2f}s.')
@@ -0,0 +1,309 @@
+# loadtest.py
+"""
+Prueba de carga local para los flujos de turnos y caja.
+
+Simula el "sábado a la mañana": varios hilos (o procesos) recorren el flujo
+buscar perro -> reservar turno -> cobrar -> refrescar calendario contra una
+base SQLite temporal, y al final se informa throughput, histograma de
+latencias y tasa de errores "database is locked" por configuración de motor.
+
+Uso:
+    python loadtest.py --workers 8 --iterations 25 --mode thread --configs default,wal
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+
+# Configuraciones de motor a comparar: argumentos de conexión + PRAGMAs
+ENGINE_CONFIGS = {
+    'default': {'timeout': 5.0, 'pragmas': {}},
+    'nowait': {'timeout': 0.0, 'pragmas': {}},
+    'wal': {'timeout': 5.0, 'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}},
+    'wal_busy': {'timeout': 15.0, 'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}},
+}
+
+STEPS = ('search', 'book', 'pay', 'refresh')
+
+# Límites superiores (ms) de los buckets del histograma
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+DOG_NAMES = ['Rocky', 'Luna', 'Toby', 'Lola', 'Max', 'Coco', 'Simba', 'Nala', 'Bruno', 'Kira']
+
+
+def build_app(config_name, db_path):
+    """Crea una app apuntando a db_path con la configuración de motor indicada."""
+    from app import create_app
+    from extensions import db
+
+    engine_config = ENGINE_CONFIGS[config_name]
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        # guardarBackUpTurnos escribe junto a la base temporal, no en ./export
+        'EXPORT_FOLDER': os.path.join(os.path.dirname(db_path), 'export'),
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': engine_config['timeout']}},
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+    })
+
+    pragmas = engine_config['pragmas']
+    if pragmas:
+        with app.app_context():
+            engine = db.engine
+
+            @event.listens_for(engine, 'connect')
+            def set_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name}={value}')
+                cursor.close()
+
+            # Las conexiones creadas por create_app no tienen los PRAGMAs
+            engine.dispose()
+    return app
+
+
+def seed_database(app, dogs=50):
+    """Carga dueños, perros y servicios para que los flujos tengan datos."""
+    from extensions import db
+    from models import Owner, Dog, Service, ServiceCategory, ServiceSize
+
+    with app.app_context():
+        if not Service.query.first():
+            categories = ServiceCategory.query.all()
+            sizes = ServiceSize.query.all()
+            db.session.add_all([
+                Service(category_id=c.id, size_id=s.id, base_price=10000 + 1000 * s.display_order)
+                for c in categories for s in sizes
+            ])
+
+        for i in range(dogs):
+            owner = Owner(name=f'Dueño {i}', phone=f'11{i:08d}')
+            db.session.add(owner)
+            db.session.flush()
+            db.session.add(Dog(name=f'{DOG_NAMES[i % len(DOG_NAMES)]} {i}', owner_id=owner.id))
+        db.session.commit()
+
+
+def classify(exc):
+    """Clasifica una excepción de request como 'locked' o 'error'."""
+    if isinstance(exc, OperationalError) and 'database is locked' in str(exc):
+        return 'locked'
+    return 'error'
+
+
+def find_appointment(app, tag, retries=20):
+    """
+    Busca el turno recién creado (fuera de la medición), reintentando si la
+    base está bloqueada. Devuelve None si el turno no quedó guardado.
+    """
+    from models import Appointment
+
+    for attempt in range(retries):
+        try:
+            with app.app_context():
+                appointment = Appointment.query.filter_by(description=tag).first()
+                if appointment is None:
+                    return None
+                return appointment.id, appointment.service_id, appointment.final_price
+        except OperationalError as exc:
+            if classify(exc) != 'locked' or attempt == retries - 1:
+                raise
+            time.sleep(0.05)
+
+
+def run_worker(app, worker_id, iterations, seed, workers=1):
+    """
+    Ejecuta el flujo completo `iterations` veces y devuelve las muestras.
+
+    Cada worker reserva sus propios perros y franjas (disjuntos entre
+    workers), así los conteos no dependen del orden de los hilos.
+    """
+    from models import Dog, Service, Professional
+
+    rng = random.Random(seed)
+    samples = []  # (step, latencia_ms, resultado)
+
+    with app.app_context():
+        all_dogs = [d.id for d in Dog.query.filter_by(is_deleted=False).order_by(Dog.id).all()]
+        service_ids = [s.id for s in Service.query.filter_by(is_active=True).all()]
+        professional_ids = [p.id for p in Professional.query.filter_by(is_active=True).all()]
+    dog_ids = all_dogs[worker_id::workers] or all_dogs
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+    def timed(step, call):
+        start = time.perf_counter()
+        try:
+            response = call()
+            outcome = 'ok' if response.status_code < 400 else 'error'
+        except Exception as exc:  # la app propaga excepciones en modo TESTING
+            response = None
+            outcome = classify(exc)
+        samples.append((step, (time.perf_counter() - start) * 1000, outcome))
+        return response if outcome == 'ok' else None
+
+    base_day = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    for i in range(iterations):
+        query = rng.choice(DOG_NAMES)[:rng.randint(2, 5)]
+        timed('search', lambda: client.get('/api/dogs/search', query_string={'q': query}))
+
+        tag = f'loadtest-{worker_id}-{i}'
+        # Franja propia: 19 turnos de 30 minutos por día, repartidos entre workers
+        slot = i * workers + worker_id
+        start_time = base_day + timedelta(days=slot // 19, minutes=30 * (slot % 19))
+        booked = timed('book', lambda: client.post('/appointments', data={
+            'dog_id': rng.choice(dog_ids),
+            'service_id': rng.choice(service_ids),
+            'professional_id': rng.choice(professional_ids),
+            'start_time': start_time.strftime('%Y-%m-%dT%H:%M'),
+            'duration': 60,
+            'description': tag,
+        }))
+
+        found = find_appointment(app, tag) if booked is not None else None
+        if found is not None:
+            appointment_id, service_id, price = found
+            timed('pay', lambda: client.post(f'/appointments/{appointment_id}/checkout', data={
+                'service_id': service_id,
+                'final_price': int(price),
+                'amount': int(price),
+                'payment_method': rng.choice(['Efectivo', 'Transferencia', 'MercadoPago']),
+                'payment_type': 'Pago',
+            }))
+
+        timed('refresh', lambda: client.get('/appointments'))
+
+    return samples
+
+
+def _process_worker(config_name, db_path, worker_id, iterations, seed, workers):
+    """Punto de entrada para modo procesos: cada proceso arma su propia app."""
+    app = build_app(config_name, db_path)
+    return run_worker(app, worker_id, iterations, seed, workers)
+
+
+def run_load(config_name, workers=4, iterations=10, mode='thread', workdir=None, seed=0):
+    """Corre una prueba de carga para una configuración y devuelve el resumen."""
+    workdir = workdir or tempfile.mkdtemp(prefix='loadtest-')
+    db_path = os.path.join(workdir, f'loadtest-{config_name}.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    app = build_app(config_name, db_path)
+    seed_database(app)
+
+    started = time.perf_counter()
+    if mode == 'process':
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process_worker, config_name, db_path, w, iterations, seed + w, workers)
+                       for w in range(workers)]
+            results = [f.result() for f in futures]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_worker, app, w, iterations, seed + w, workers) for w in range(workers)]
+            results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for worker_samples in results for sample in worker_samples]
+    return summarize(config_name, samples, elapsed)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(config_name, samples, elapsed):
+    """Agrupa las muestras por paso: latencias, histograma y resultados."""
+    by_step = defaultdict(list)
+    outcomes = defaultdict(Counter)
+    for step, latency, outcome in samples:
+        by_step[step].append(latency)
+        outcomes[step][outcome] += 1
+
+    steps = {}
+    for step in STEPS:
+        latencies = sorted(by_step.get(step, []))
+        histogram = Counter()
+        for latency in latencies:
+            bucket = next(b for b in HISTOGRAM_BUCKETS if latency <= b)
+            histogram[bucket] += 1
+        steps[step] = {
+            'count': len(latencies),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else 0.0,
+            'histogram': [(b, histogram[b]) for b in HISTOGRAM_BUCKETS],
+            'outcomes': dict(outcomes[step]),
+        }
+
+    total = len(samples)
+    locked = sum(o.get('locked', 0) for o in outcomes.values())
+    errors = sum(o.get('error', 0) for o in outcomes.values())
+    return {
+        'config': config_name,
+        'requests': total,
+        'elapsed': elapsed,
+        'throughput': total / elapsed if elapsed else 0.0,
+        'locked': locked,
+        'locked_rate': locked / total if total else 0.0,
+        'errors': errors,
+        'steps': steps,
+    }
+
+
+def format_report(summary):
+    """Devuelve el resumen como texto para consola."""
+    lines = [
+        f"=== Configuración: {summary['config']} ===",
+        f"Requests: {summary['requests']} en {summary['elapsed']:.2f}s "
+        f"({summary['throughput']:.1f} req/s)",
+        f"'database is locked': {summary['locked']} ({summary['locked_rate']:.1%}) | "
+        f"Otros errores: {summary['errors']}",
+    ]
+    for step, data in summary['steps'].items():
+        if not data['count']:
+            continue
+        lines.append(
+            f"  {step:<8} n={data['count']:<5} p50={data['p50']:.1f}ms p95={data['p95']:.1f}ms "
+            f"p99={data['p99']:.1f}ms max={data['max']:.1f}ms {data['outcomes']}"
+        )
+        peak = max(count for _, count in data['histogram']) or 1
+        for bucket, count in data['histogram']:
+            if not count:
+                continue
+            label = f"<= {bucket:g}ms" if bucket != float('inf') else "> 5000ms"
+            lines.append(f"      {label:>10} | {'#' * max(1, 40 * count // peak)} {count}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de turnos y caja sobre SQLite')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--configs', default=','.join(ENGINE_CONFIGS),
+                        help='Configuraciones separadas por coma: ' + ', '.join(ENGINE_CONFIGS))
+    parser.add_argument('--workdir', default=None, help='Carpeta para las bases temporales')
+    args = parser.parse_args()
+
+    for config_name in args.configs.split(','):
+        summary = run_load(config_name.strip(), args.workers, args.iterations, args.mode, args.workdir)
+        print(format_report(summary))
+
+
+if __name__ == '__main__':
+    main()
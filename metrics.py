@@ -0,0 +1,324 @@
+# metrics.py
+"""
+Métricas en formato Prometheus (GET /metrics).
+
+- http_request_duration_seconds: latencia por endpoint y método (histograma)
+- http_requests_total: requests por endpoint, método y status (tasa de errores)
+- http_requests_in_progress: requests en curso
+- db_statements_per_request: sentencias SQL por request (histograma)
+- db_pool_checked_out: conexiones en uso por base (principal y sucursales)
+- db_lock_errors_total: sentencias que fallaron por "database is locked"
+- db_write_duration_seconds: duración de INSERT/UPDATE/DELETE, que
+  incluye lo que SQLite esperó el lock de escritura (busy timeout)
+- job_duration_seconds: guardarBackUpTurnos, exportaciones y snapshots
+  (también quedan como spans, ver tracing.py)
+
+Cada proceso acumula en memoria. Con METRICS_DIR configurado, además vuelca
+su estado a METRICS_DIR/<pid>.json (cada METRICS_FLUSH_INTERVAL segundos y
+al terminar cada trabajo) y /metrics suma los archivos de todos los workers
+de Gunicorn y de los comandos CLI. Los gauges de procesos que ya no existen
+se descartan; sus contadores e histogramas se siguen sumando hasta
+METRICS_DEAD_RETENTION segundos (900 por defecto) después de su último
+volcado, y después se borra el archivo.
+
+El endpoint está deshabilitado (404) salvo que se configure METRICS_TOKEN
+(pide "Authorization: Bearer <token>") o METRICS_ALLOW, una lista explícita
+de direcciones que pueden leerlo sin token. Detrás de un proxy inverso
+request.remote_addr es la del proxy: en ese caso usar el token.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, abort, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from tracing import span
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+JOB_BUCKETS = (0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# nombre -> (tipo, ayuda, buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Latencia de los requests por endpoint.', LATENCY_BUCKETS),
+    'http_requests_total': ('counter', 'Requests atendidos por endpoint, método y status.', None),
+    'http_requests_in_progress': ('gauge', 'Requests en curso.', None),
+    'db_statements_per_request': ('histogram', 'Sentencias SQL ejecutadas por request.', STATEMENT_BUCKETS),
+    'db_pool_checked_out': ('gauge', 'Conexiones del pool en uso.', None),
+    'db_lock_errors_total': ('counter', 'Sentencias que fallaron por base bloqueada.', None),
+    'db_write_duration_seconds': ('histogram', 'Duración de escrituras SQL, incluida la espera del lock.', LATENCY_BUCKETS),
+    'job_duration_seconds': ('histogram', 'Duración de trabajos (backups, exportaciones).', JOB_BUCKETS),
+}
+
+
+class Registry:
+    """Contadores, gauges e histogramas de este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)  # (nombre, labels) -> valor
+        self._histograms = {}              # (nombre, labels) -> [buckets..., suma, cantidad]
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] += value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = self._key(name, labels)
+        with self._lock:
+            data = self._histograms.setdefault(key, [0] * (len(buckets) + 2))
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'values': [[name, list(labels), value] for (name, labels), value in self._values.items()],
+                'histograms': [[name, list(labels), list(data)] for (name, labels), data in self._histograms.items()],
+            }
+
+
+registry = Registry()
+_last_flush = 0.0
+
+
+#-------- Multiproceso --------#
+
+def flush(directory):
+    """Vuelca el estado de este proceso a <directory>/<pid>.json (reemplazo atómico)."""
+    global _last_flush
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp_path, os.path.join(directory, f'{os.getpid()}.json'))
+    _last_flush = time.monotonic()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory=None, dead_retention=900):
+    """Suma los snapshots de todos los procesos (o sólo el propio, sin directorio).
+
+    Borra los archivos de procesos muertos con más de `dead_retention` segundos.
+    """
+    snapshots = [registry.snapshot()]
+    if directory and os.path.isdir(directory):
+        snapshots = []
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                if not _pid_alive(snapshot['pid']) and time.time() - os.path.getmtime(path) > dead_retention:
+                    os.remove(path)
+                    continue
+            except (OSError, ValueError):
+                continue  # Archivo a medio escribir o borrado
+            snapshots.append(snapshot)
+
+    values, histograms = defaultdict(float), {}
+    for snapshot in snapshots:
+        alive = _pid_alive(snapshot['pid'])
+        for name, labels, value in snapshot['values']:
+            if METRICS[name][0] == 'gauge' and not alive:
+                continue
+            values[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, data in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], data)]
+            else:
+                histograms[key] = list(data)
+    return values, histograms
+
+
+#-------- Formato de texto --------#
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render(values, histograms):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for labels, data in sorted((k[1], v) for k, v in histograms.items() if k[0] == name):
+                cumulative = 0
+                for bound, count in zip(buckets, data):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {data[-1]}')
+                lines.append(f'{name}_sum{_labels(labels)} {data[-2]}')
+                lines.append(f'{name}_count{_labels(labels)} {data[-1]}')
+        else:
+            for labels, value in sorted((k[1], v) for k, v in values.items() if k[0] == name):
+                lines.append(f'{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+#-------- Trabajos --------#
+
+@contextmanager
+def track_job(name):
+    """Mide (y traza) un trabajo; con METRICS_DIR lo vuelca al terminar."""
+    started = time.perf_counter()
+    try:
+        with span(f'job {name}', job=name):
+            yield
+    finally:
+        registry.observe('job_duration_seconds', time.perf_counter() - started, job=name)
+        directory = current_app.config.get('METRICS_DIR') if has_app_context() else None
+        if directory:
+            flush(directory)
+
+
+def timed_job(name):
+    """Decorador equivalente a `with track_job(name):`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_job(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+#-------- Requests y SQL --------#
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics_started' in g:
+        g.sql_statements = g.get('sql_statements', 0) + 1
+
+
+_WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_write(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip()[:7].upper().startswith(_WRITE_PREFIXES):
+        conn.info['metrics_write_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _finish_write(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_write_started', None)
+    if started is not None:
+        registry.observe('db_write_duration_seconds', time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _count_lock_error(context):
+    if context.connection is not None:
+        # Una escritura que falla por lock también esperó: se mide igual
+        started = context.connection.info.pop('metrics_write_started', None)
+        if started is not None:
+            registry.observe('db_write_duration_seconds', time.perf_counter() - started)
+    message = str(context.original_exception).lower()
+    if 'database is locked' in message or 'database is busy' in message:
+        registry.inc('db_lock_errors_total')
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    registry.inc('http_requests_in_progress')
+
+
+def _record_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    endpoint = request.endpoint or 'unmatched'  # 404: sin endpoint, una sola serie
+    status = g.pop('metrics_status', 500 if exc else 200)
+    registry.inc('http_requests_in_progress', -1)
+    registry.observe('http_request_duration_seconds', time.perf_counter() - started,
+                     endpoint=endpoint, method=request.method)
+    registry.inc('http_requests_total', endpoint=endpoint, method=request.method, status=status)
+    registry.observe('db_statements_per_request', g.pop('sql_statements', 0), endpoint=endpoint)
+
+    directory = current_app.config.get('METRICS_DIR')
+    if directory and time.monotonic() - _last_flush > current_app.config.get('METRICS_FLUSH_INTERVAL', 5):
+        flush(directory)
+
+
+def _pool_gauges():
+    from extensions import db
+    engines = {'main': db.engine, **current_app.extensions.get('branch_engines', {})}
+    for name, engine in engines.items():
+        checkedout = getattr(engine.pool, 'checkedout', None)
+        if checkedout is not None:
+            registry.set('db_pool_checked_out', checkedout(), database=name)
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    allowed = current_app.config.get('METRICS_ALLOW') or ()
+    if not token and not allowed:
+        abort(404)
+    if request.remote_addr not in allowed:
+        if not token:
+            abort(403)
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+
+    _pool_gauges()
+    directory = current_app.config.get('METRICS_DIR')
+    if directory:
+        flush(directory)
+    values, histograms = collect(directory, current_app.config.get('METRICS_DEAD_RETENTION', 900))
+    return Response(render(values, histograms), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Registra los hooks de requests y GET /metrics. Llamar antes de otros before_request."""
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,34 @@
+"""appointment amount_paid and version_id
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('amount_paid', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('version_id', sa.Integer(), nullable=False, server_default='1'))
+
+    # Completar el total pagado de los turnos existentes a partir de sus pagos
+    op.execute(
+        "UPDATE appointment SET amount_paid = "
+        "(SELECT COALESCE(SUM(payment.amount), 0) FROM payment WHERE payment.appointment_id = appointment.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_column('version_id')
+        batch_op.drop_column('amount_paid')
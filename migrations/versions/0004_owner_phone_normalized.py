@@ -0,0 +1,60 @@
+"""owner phone_normalized with unique index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 14:20:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _normalize(phone):
+    return re.sub(r'\D', '', phone or '') or None
+
+
+def upgrade():
+    # Antes de tocar el esquema: dos dueños con el mismo teléfono normalizado
+    # no se fusionan acá (se perderían sus datos); se aborta con el detalle
+    conn = op.get_bind()
+    owners = conn.execute(sa.text("SELECT id, name, phone FROM owner ORDER BY id")).fetchall()
+    by_phone = {}
+    for owner_id, name, phone in owners:
+        digits = _normalize(phone)
+        if digits is not None:
+            by_phone.setdefault(digits, []).append(f'#{owner_id} {name} ({phone})')
+    collisions = {digits: found for digits, found in by_phone.items() if len(found) > 1}
+    if collisions:
+        report = '\n'.join(f'  {digits}: ' + ', '.join(found) for digits, found in sorted(collisions.items()))
+        raise RuntimeError(
+            'Hay dueños distintos con el mismo teléfono. Unificarlos (pasar los perros y '
+            'borrar o corregir el duplicado) y volver a correr la migración:\n' + report
+        )
+
+    with op.batch_alter_table('owner', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phone_normalized', sa.String(length=20), nullable=True))
+
+    # Completar desde `phone` (SQLite no tiene regexp_replace: se hace en Python)
+    for owner_id, _, phone in owners:
+        digits = _normalize(phone)
+        if digits is not None:
+            conn.execute(sa.text("UPDATE owner SET phone_normalized = :p WHERE id = :id"),
+                         {'p': digits, 'id': owner_id})
+
+    with op.batch_alter_table('owner', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_owner_phone_normalized'), ['phone_normalized'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('owner', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_owner_phone_normalized'))
+        batch_op.drop_column('phone_normalized')
@@ -0,0 +1,46 @@
+"""indexes for the route queries
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_owner_name', 'owner', ['name'])
+    op.create_index('ix_dog_owner_id', 'dog', ['owner_id'])
+    op.create_index('ix_dog_active_name', 'dog', ['name'],
+                    sqlite_where=sa.text('is_deleted = 0'), postgresql_where=sa.text('is_deleted = false'))
+    op.create_index('ix_medical_note_dog_date', 'medical_note', ['dog_id', 'date'])
+    op.create_index('ix_appointment_active_start', 'appointment', ['is_deleted', 'start_time'])
+    op.create_index('ix_appointment_dog_history', 'appointment', ['dog_id', 'is_deleted', 'start_time'])
+    op.create_index('ix_appointment_status_end', 'appointment', ['status', 'end_time'])
+    op.create_index('ix_appointment_professional_start', 'appointment', ['professional_id', 'start_time'])
+    op.create_index('ix_payment_date', 'payment', ['date'])
+    op.create_index('ix_payment_appointment_id', 'payment', ['appointment_id'])
+    # Estadísticas para que el planificador elija bien entre índices
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    op.drop_index('ix_payment_appointment_id', table_name='payment')
+    op.drop_index('ix_payment_date', table_name='payment')
+    op.drop_index('ix_appointment_professional_start', table_name='appointment')
+    op.drop_index('ix_appointment_status_end', table_name='appointment')
+    op.drop_index('ix_appointment_dog_history', table_name='appointment')
+    op.drop_index('ix_appointment_active_start', table_name='appointment')
+    op.drop_index('ix_medical_note_dog_date', table_name='medical_note')
+    op.drop_index('ix_dog_active_name', table_name='dog')
+    op.drop_index('ix_dog_owner_id', table_name='dog')
+    op.drop_index('ix_owner_name', table_name='owner')
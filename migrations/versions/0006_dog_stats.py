@@ -0,0 +1,51 @@
+"""dog_stats summary table
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dog_stats',
+    sa.Column('dog_id', sa.Integer(), nullable=False),
+    sa.Column('visit_count', sa.Integer(), nullable=False),
+    sa.Column('last_visit', sa.DateTime(), nullable=True),
+    sa.Column('lifetime_spend', sa.Float(), nullable=False),
+    sa.Column('outstanding_balance', sa.Float(), nullable=False),
+    sa.Column('usual_service_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['dog_id'], ['dog.id'], ),
+    sa.ForeignKeyConstraint(['usual_service_id'], ['service.id'], ),
+    sa.PrimaryKeyConstraint('dog_id')
+    )
+
+    # Mismo cálculo que utils.recalcular_estadisticas_perro, para todos los perros
+    op.execute("""
+        INSERT INTO dog_stats (dog_id, visit_count, last_visit, lifetime_spend, outstanding_balance, usual_service_id)
+        SELECT a.dog_id,
+               SUM(CASE WHEN a.status = 'Cobrado' THEN 1 ELSE 0 END),
+               MAX(CASE WHEN a.status = 'Cobrado' THEN a.start_time END),
+               COALESCE(SUM(a.amount_paid), 0),
+               SUM(CASE WHEN a.status = 'Señado' THEN a.final_price - a.amount_paid ELSE 0 END),
+               (SELECT o.service_id FROM appointment o
+                 WHERE o.dog_id = a.dog_id AND o.is_deleted = 0 AND o.status = 'Cobrado'
+                   AND o.service_id IS NOT NULL
+                 GROUP BY o.service_id ORDER BY COUNT(*) DESC, MAX(o.start_time) DESC LIMIT 1)
+          FROM appointment a
+         WHERE a.is_deleted = 0
+         GROUP BY a.dog_id
+    """)
+
+
+def downgrade():
+    op.drop_table('dog_stats')
@@ -0,0 +1,38 @@
+"""day_close table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('day_close',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=False),
+    sa.Column('closed_by', sa.String(length=80), nullable=True),
+    sa.Column('appointments_closed', sa.Integer(), nullable=False),
+    sa.Column('total_payments', sa.Float(), nullable=False),
+    sa.Column('total_deposits', sa.Float(), nullable=False),
+    sa.Column('total_cash', sa.Float(), nullable=False),
+    sa.Column('total_commissions', sa.Float(), nullable=False),
+    sa.Column('drawer', sa.JSON(), nullable=False),
+    sa.Column('commissions', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('date')
+    )
+
+
+def downgrade():
+    op.drop_table('day_close')
@@ -1,7 +1,11 @@
 from extensions import db  # Importa 'db'
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from functools import lru_cache
+from sqlalchemy.orm import validates
+import re
 
 
 # ==========================================
@@ -13,13 +17,34 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(50), default='peluquera')
+    branch = db.Column(db.String(50), nullable=True)  # Sucursal (BRANCHES); None = la por defecto
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, password_hash_method())
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def needs_rehash(self):
+        """True si el hash se generó con otro método o costo que PASSWORD_HASH_METHOD."""
+        return self.password_hash.split('$', 1)[0] != _hash_prefix(password_hash_method())
+
+
+# Método de Werkzeug por defecto; ej. 'pbkdf2:sha256:600000' o 'scrypt:16384:8:1'
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt'
+
+
+def password_hash_method():
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_PASSWORD_HASH_METHOD)
+    return DEFAULT_PASSWORD_HASH_METHOD
+
+
+@lru_cache(maxsize=8)
+def _hash_prefix(method):
+    """Prefijo completo que genera Werkzeug ('pbkdf2:sha256' -> 'pbkdf2:sha256:600000')."""
+    return generate_password_hash('', method).split('$', 1)[0]
+
 
 class Professional(db.Model):
     """Peluquero/Estilista"""
@@ -81,21 +106,43 @@ class Item(db.Model):
     price = db.Column(db.Float, nullable=False)  # Precio del adicional
     is_active = db.Column(db.Boolean, default=True)  # Para ocultar items viejos
 
+class CatalogVersion(db.Model):
+    """Versión del catálogo: se incrementa al editar servicios, items, categorías o tamaños"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
 
 # ==========================================
 # 3. CLIENTES Y MASCOTAS
 # ==========================================
 
+def normalize_phone(value):
+    """Sólo los dígitos del teléfono: '11 4444-5555' -> '1144445555'."""
+    digits = re.sub(r'\D', '', value or '')
+    return digits or None
+
+
 class Owner(db.Model):
     id = db.Column(db.Integer, primary_key = True)
     name = db.Column(db.String(100), nullable= False)
     phone = db.Column(db.String(20), nullable = True)
+    # Clave de búsqueda/deduplicación, se mantiene desde `phone`
+    phone_normalized = db.Column(db.String(20), nullable=True, unique=True, index=True)
     email = db.Column(db.String(100), nullable = True)
     address = db.Column(db.String(200), nullable=True)
 
     #Relacion con los perros
     dogs = db.relationship('Dog', backref='owner', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_owner_name', 'name'),  # Autocompletado ordenado por nombre
+    )
+
+    @validates('phone')
+    def _sync_phone_normalized(self, key, value):
+        self.phone_normalized = normalize_phone(value)
+        return value
+
 
 class Dog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -104,6 +151,24 @@ class Dog(db.Model):
     is_deleted = db.Column(db.Boolean, default=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_dog_owner_id', 'owner_id'),
+        # Sólo perros activos: búsqueda/listado ordenado por nombre
+        db.Index('ix_dog_active_name', 'name', sqlite_where=db.text('is_deleted = 0'),
+                 postgresql_where=db.text('is_deleted = false')),
+    )
+
+class DogStats(db.Model):
+    """Resumen precalculado por perro, lo mantiene recalcular_estadisticas_perro"""
+    dog_id = db.Column(db.Integer, db.ForeignKey('dog.id'), primary_key=True)
+    visit_count = db.Column(db.Integer, nullable=False, default=0)        # Turnos cobrados
+    last_visit = db.Column(db.DateTime)
+    lifetime_spend = db.Column(db.Float, nullable=False, default=0.0)     # Suma de lo pagado
+    outstanding_balance = db.Column(db.Float, nullable=False, default=0.0)  # Saldo de turnos señados
+    usual_service_id = db.Column(db.Integer, db.ForeignKey('service.id'))
+
+    usual_service = db.relationship('Service')
+
 class MedicalNote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     dog_id = db.Column(db.Integer, db.ForeignKey('dog.id'), nullable=False)
@@ -111,6 +176,10 @@ class MedicalNote(db.Model):
     date = db.Column(db.Date, default=datetime.utcnow)
     dog = db.relationship('Dog')
 
+    __table_args__ = (
+        db.Index('ix_medical_note_dog_date', 'dog_id', 'date'),  # Ficha del perro
+    )
+
 
 # ==========================================
 # 4. GESTIÓN DE TURNOS Y VENTAS 
@@ -140,6 +209,19 @@ class Appointment(db.Model):
     discount_value = db.Column(db.Float, default=0.0)
     final_price = db.Column(db.Float, default=0.0)
     commission_amount = db.Column(db.Float, default=0.0)
+    amount_paid = db.Column(db.Float, default=0.0, nullable=False)  # Suma de pagos, la mantiene recalcular_estado_pago
+
+    # Versión de fila: un UPDATE con versión vieja (otra caja) falla en vez de pisar datos
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+    __mapper_args__ = {'version_id_col': version_id}
+
+    # Índices según las consultas de las rutas (ver tests/test_query_plans.py)
+    __table_args__ = (
+        db.Index('ix_appointment_active_start', 'is_deleted', 'start_time'),         # Calendario, papelera
+        db.Index('ix_appointment_dog_history', 'dog_id', 'is_deleted', 'start_time'),  # Historial del perro
+        db.Index('ix_appointment_status_end', 'status', 'end_time'),                 # Cobrados del día
+        db.Index('ix_appointment_professional_start', 'professional_id', 'start_time'),
+    )
 
     dog = db.relationship('Dog')
     service = db.relationship('Service')
@@ -149,8 +231,7 @@ class Appointment(db.Model):
     @property
     def saldo_pendiente(self):
         """Calcula cuánto falta pagar"""
-        pagado = sum(p.amount for p in self.payments)
-        return self.final_price - pagado
+        return self.final_price - (self.amount_paid or 0)
     
 class Payment(db.Model):
     """Caja: Registro de cada ingreso de dinero"""
@@ -166,4 +247,27 @@ class Payment(db.Model):
     # 'Seña' (Anticipo) o 'Pago' (Cancelación)
     payment_type = db.Column(db.String(20), default='Pago') 
     
-    notes = db.Column(db.String(200))
\ No newline at end of file
+    notes = db.Column(db.String(200))
+
+    __table_args__ = (
+        db.Index('ix_payment_date', 'date'),                      # Caja del día
+        db.Index('ix_payment_appointment_id', 'appointment_id'),  # Recalcular saldo
+    )
+
+
+class DayClose(db.Model):
+    """Cierre de caja de un día: lo escribe day_close.close_day, el reporte sólo lee esta fila"""
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, unique=True)
+    closed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    closed_by = db.Column(db.String(80))
+
+    appointments_closed = db.Column(db.Integer, nullable=False, default=0)  # Turnos pagos del día
+    total_payments = db.Column(db.Float, nullable=False, default=0.0)
+    total_deposits = db.Column(db.Float, nullable=False, default=0.0)       # Señas
+    total_cash = db.Column(db.Float, nullable=False, default=0.0)
+    total_commissions = db.Column(db.Float, nullable=False, default=0.0)
+
+    # [{'method', 'type', 'count', 'total'}] y [{'professional', 'appointments', 'commission'}]
+    drawer = db.Column(db.JSON, nullable=False, default=list)
+    commissions = db.Column(db.JSON, nullable=False, default=list)
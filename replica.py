@@ -0,0 +1,201 @@
+# replica.py
+"""
+Réplica de lectura para reportes, historiales y exportaciones.
+
+Dos modos (opcionales, sin configurar todo va a la base principal):
+
+    READ_REPLICA_URI  = 'postgresql://...'   réplica administrada (producción)
+    READ_REPLICA_PATH = 'replica.db'         copia SQLite local, se refresca
+                                             cada READ_REPLICA_REFRESH segundos
+
+Las rutas se suman con @uses_read_replica o `with read_replica():`. Sólo
+los SELECT van a la réplica; si la copia es más vieja que
+READ_REPLICA_MAX_STALENESS, si la réplica no responde o si el usuario
+escribió algo después del último refresco (para que vea lo que acaba de
+guardar), se lee de la principal.
+
+    flask --app app:create_app replica refresh
+    flask --app app:create_app replica status
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import click
+from flask import current_app, g, has_request_context, session
+from flask.cli import AppGroup
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+
+from extensions import db, RoutingSession
+
+
+DEFAULT_REFRESH_SECONDS = 60
+DEFAULT_MAX_STALENESS = 300
+HEALTH_CHECK_SECONDS = 10
+
+
+class ReadReplica:
+    """Engine de sólo lectura y su antigüedad (uno por worker)."""
+
+    def __init__(self, engine, path=None, refresh_seconds=DEFAULT_REFRESH_SECONDS,
+                 max_staleness=DEFAULT_MAX_STALENESS):
+        self.engine = engine
+        self.path = path  # Sólo para la copia local
+        self.refresh_seconds = refresh_seconds
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._healthy_until = 0.0
+
+    def refreshed_at(self):
+        """Momento del último refresco (mtime de la copia); la réplica remota se toma al día."""
+        if self.path is None:
+            return time.time()
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def refresh(self, primary_engine):
+        """Copia la base principal con la API de backup y reemplaza la copia de forma atómica."""
+        if self.path is None:
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False  # Ya hay un refresco en curso en este worker
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            os.close(fd)
+            raw = primary_engine.raw_connection()
+            try:
+                dest = sqlite3.connect(tmp_path)
+                try:
+                    raw.driver_connection.backup(dest)
+                finally:
+                    dest.close()
+            finally:
+                raw.close()
+            os.replace(tmp_path, self.path)
+            return True
+        finally:
+            self._lock.release()
+
+    def refresh_in_background(self, primary_engine):
+        threading.Thread(target=self.refresh, args=(primary_engine,), daemon=True).start()
+
+    def is_healthy(self):
+        """SELECT 1 contra la réplica, cacheado unos segundos."""
+        now = time.monotonic()
+        if now < self._healthy_until:
+            return True
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+        except Exception:
+            return False
+        self._healthy_until = now + HEALTH_CHECK_SECONDS
+        return True
+
+
+def _sqlite_path(app, path):
+    return path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+
+
+def init_read_replica(app):
+    """Crea la réplica según la configuración (o None). Llamar con el app context."""
+    refresh_seconds = app.config.get('READ_REPLICA_REFRESH', DEFAULT_REFRESH_SECONDS)
+    max_staleness = app.config.get('READ_REPLICA_MAX_STALENESS', DEFAULT_MAX_STALENESS)
+    replica = None
+
+    if app.config.get('READ_REPLICA_URI'):
+        replica = ReadReplica(create_engine(app.config['READ_REPLICA_URI'], pool_pre_ping=True),
+                              refresh_seconds=refresh_seconds, max_staleness=max_staleness)
+    elif app.config.get('READ_REPLICA_PATH'):
+        path = _sqlite_path(app, app.config['READ_REPLICA_PATH'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Sólo lectura; NullPool para que cada lectura abra el archivo vigente
+        # aunque un refresco lo haya reemplazado
+        engine = create_engine(f'sqlite:///file:{path}?mode=ro&uri=true', poolclass=NullPool)
+        replica = ReadReplica(engine, path=path, refresh_seconds=refresh_seconds, max_staleness=max_staleness)
+
+    app.extensions['read_replica'] = replica
+
+
+def _replica_usable(replica):
+    refreshed_at = replica.refreshed_at()
+    now = time.time()
+
+    if replica.path is not None and (refreshed_at is None or now - refreshed_at > replica.refresh_seconds):
+        replica.refresh_in_background(db.engine)
+
+    if refreshed_at is None or now - refreshed_at > replica.max_staleness:
+        return False
+    # Leer lo propio: si el usuario escribió después del refresco, va a la principal
+    if has_request_context() and session.get('last_write', 0) > refreshed_at:
+        return False
+    return replica.is_healthy()
+
+
+@contextmanager
+def read_replica():
+    """Dentro del bloque los SELECT van a la réplica, si está disponible y al día."""
+    replica = current_app.extensions.get('read_replica')
+    previous = g.get('read_replica', False)
+    g.read_replica = bool(replica) and _replica_usable(replica)
+    try:
+        yield g.read_replica
+    finally:
+        g.read_replica = previous
+
+
+def uses_read_replica(view):
+    """Decorador para rutas de sólo lectura."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with read_replica():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _mark_write(db_session):
+    if has_request_context():
+        g.wrote = True
+
+
+def remember_write(response):
+    """after_request: guarda cuándo escribió el usuario (ver _replica_usable)."""
+    if g.pop('wrote', False):
+        session['last_write'] = time.time()
+    return response
+
+
+#-------- Comandos CLI --------#
+
+replica_cli = AppGroup('replica', help='Réplica de lectura.')
+
+
+@replica_cli.command('refresh')
+def refresh_command():
+    """Refresca la copia local de la réplica (para cron)."""
+    replica = current_app.extensions.get('read_replica')
+    if replica is None or replica.path is None:
+        raise click.ClickException('No hay copia local configurada (READ_REPLICA_PATH).')
+    started = time.perf_counter()
+    replica.refresh(db.engine)
+    click.echo(f'Réplica refrescada en {time.perf_counter() - started:.2f}s: {replica.path}')
+
+
+@replica_cli.command('status')
+def status_command():
+    """Muestra la antigüedad de la réplica."""
+    replica = current_app.extensions.get('read_replica')
+    if replica is None:
+        click.echo('Sin réplica: todo se lee de la base principal.')
+        return
+    refreshed_at = replica.refreshed_at()
+    age = 'sin copia' if refreshed_at is None else f'{time.time() - refreshed_at:.0f}s'
+    click.echo(f'{replica.engine.url} - antigüedad {age} (máximo {replica.max_staleness}s)')
@@ -0,0 +1,177 @@
+# repricing.py
+"""
+Actualización masiva de precios del catálogo.
+
+Aplica un porcentaje (y un redondeo a múltiplos de $N) a los servicios y
+adicionales activos que pasan el filtro, y recalcula en la base los turnos
+futuros en estado Pendiente que los usan: todo con UPDATE por conjunto en
+una transacción, en vez de editar precio por precio y turno por turno.
+Sólo se recalculan los turnos cuyo precio sigue siendo el del catálogo
+anterior; un precio cargado a mano en la caja (descuento, recargo) se respeta.
+
+La vista previa calcula los precios nuevos con la misma expresión SQL que
+el UPDATE, así lo que se muestra es exactamente lo que se guarda.
+
+Con sucursales (BRANCHES) el catálogo se confirma primero: los turnos de
+cada sucursal leen el catálogo adjunto, que sólo ve lo confirmado.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, exists, func, or_, select, update
+from sqlalchemy.orm import joinedload
+
+from branches import branch_names, use_branch
+from extensions import db
+from fragments import bump_catalog_version
+from models import Appointment, Item, Service, appointment_items
+
+
+class Repricing:
+    """Regla de precio (porcentaje y redondeo) más el filtro de servicios y adicionales."""
+
+    def __init__(self, percent, round_to=1, include_services=True, include_items=True,
+                 category_ids=None, size_ids=None, item_ids=None):
+        self.percent = percent
+        self.round_to = round_to or 1
+        self.include_services = include_services
+        self.include_items = include_items
+        self.category_ids = category_ids or []
+        self.size_ids = size_ids or []
+        self.item_ids = item_ids or []
+
+    def price_expr(self, column):
+        """Precio nuevo en SQL: porcentaje y redondeo al múltiplo más cercano."""
+        return func.round(column * (1 + self.percent / 100.0) / self.round_to) * self.round_to
+
+    def service_filter(self):
+        conditions = [Service.is_active == True]
+        if self.category_ids:
+            conditions.append(Service.category_id.in_(self.category_ids))
+        if self.size_ids:
+            conditions.append(Service.size_id.in_(self.size_ids))
+        return conditions
+
+    def item_filter(self):
+        conditions = [Item.is_active == True]
+        if self.item_ids:
+            conditions.append(Item.id.in_(self.item_ids))
+        return conditions
+
+    def preview(self, now=None):
+        """Precios actuales y nuevos, y cuántos turnos pendientes se recalcularían."""
+        now = now or datetime.now()
+        services, items = [], []
+        if self.include_services:
+            services = db.session.query(Service, self.price_expr(Service.base_price)) \
+                .options(joinedload(Service.category), joinedload(Service.size)) \
+                .filter(*self.service_filter()).order_by(Service.category_id, Service.size_id).all()
+        if self.include_items:
+            items = db.session.query(Item, self.price_expr(Item.price)) \
+                .filter(*self.item_filter()).order_by(Item.name).all()
+
+        service_ids = [s.id for s, _ in services]
+        item_ids = [i.id for i, _ in items]
+        appointments = sum(
+            db.session.scalar(select(func.count()).select_from(Appointment)
+                              .where(*_pending_appointments(service_ids, item_ids, now)))
+            for _ in _each_branch()
+        ) if service_ids or item_ids else 0
+        return {'services': services, 'items': items, 'appointments': appointments}
+
+    def apply(self, now=None):
+        """Actualiza catálogo y turnos pendientes. Devuelve cuántos de cada uno cambió."""
+        now = now or datetime.now()
+        service_ids = db.session.scalars(select(Service.id).where(*self.service_filter())).all() \
+            if self.include_services else []
+        item_ids = db.session.scalars(select(Item.id).where(*self.item_filter())).all() \
+            if self.include_items else []
+        if not service_ids and not item_ids:
+            return {'services': 0, 'items': 0, 'appointments': 0}
+
+        # Precios anteriores: para reconocer los turnos que todavía los tienen
+        old_service_prices = dict(db.session.execute(
+            select(Service.id, Service.base_price).where(Service.id.in_(service_ids))).all())
+        old_item_prices = dict(db.session.execute(
+            select(Item.id, Item.price).where(Item.id.in_(item_ids))).all())
+
+        if service_ids:
+            db.session.execute(update(Service).where(Service.id.in_(service_ids))
+                               .values(base_price=self.price_expr(Service.base_price))
+                               .execution_options(synchronize_session=False))
+        if item_ids:
+            db.session.execute(update(Item).where(Item.id.in_(item_ids))
+                               .values(price=self.price_expr(Item.price))
+                               .execution_options(synchronize_session=False))
+        bump_catalog_version()
+
+        appointments = 0
+        if branch_names():
+            db.session.commit()
+        for _ in _each_branch():
+            appointments += reprice_pending_appointments(service_ids, item_ids, now,
+                                                         old_service_prices, old_item_prices)
+            db.session.commit()
+        return {'services': len(service_ids), 'items': len(item_ids), 'appointments': appointments}
+
+
+def _each_branch():
+    """Recorre las sucursales activándolas (o una vez, sin sucursales)."""
+    names = branch_names()
+    if not names:
+        yield None
+        return
+    for name in names:
+        with use_branch(name):
+            yield name
+
+
+def _catalog_total(service_prices=None, item_prices=None):
+    """Servicio + adicionales del turno según el catálogo, o según los precios dados por id."""
+    service_price = case(service_prices, value=Service.id, else_=Service.base_price) \
+        if service_prices else Service.base_price
+    item_price = case(item_prices, value=Item.id, else_=Item.price) if item_prices else Item.price
+    services_total = select(service_price).where(Service.id == Appointment.service_id).scalar_subquery()
+    items_total = select(func.coalesce(func.sum(item_price), 0)) \
+        .select_from(appointment_items.join(Item, Item.id == appointment_items.c.item_id)) \
+        .where(appointment_items.c.appointment_id == Appointment.id).scalar_subquery()
+    return services_total + items_total
+
+
+def _pending_appointments(service_ids, item_ids, now, service_prices=None, item_prices=None):
+    """Turnos futuros sin pagos que usan alguno de los servicios o adicionales.
+
+    Sólo los que tienen el precio de catálogo (el actual, o el de `service_prices`
+    / `item_prices` si el catálogo ya cambió): los precios a mano no se tocan.
+    """
+    uses_catalog = []
+    if service_ids:
+        uses_catalog.append(Appointment.service_id.in_(service_ids))
+    if item_ids:
+        uses_catalog.append(exists().where(appointment_items.c.appointment_id == Appointment.id,
+                                           appointment_items.c.item_id.in_(item_ids)))
+    return [
+        Appointment.status == 'Pendiente',
+        Appointment.is_deleted == False,
+        Appointment.start_time >= now,
+        # Sin servicio (turnos importados) el precio no sale del catálogo
+        Appointment.service_id.isnot(None),
+        or_(*uses_catalog),
+        func.abs(Appointment.final_price - _catalog_total(service_prices, item_prices)) < 0.01,
+    ]
+
+
+def reprice_pending_appointments(service_ids, item_ids, now, old_service_prices, old_item_prices):
+    """Un UPDATE: total = servicio + adicionales, con los precios del catálogo ya actualizados.
+
+    Sólo cambia los turnos cuyo precio era el total con los precios anteriores.
+    """
+    total = _catalog_total()
+
+    result = db.session.execute(
+        update(Appointment)
+        .where(*_pending_appointments(service_ids, item_ids, now, old_service_prices, old_item_prices))
+        # version_id: una edición abierta con el precio viejo falla en vez de pisarlo
+        .values(total_amount=total, final_price=total, version_id=Appointment.version_id + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
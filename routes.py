@@ -1,13 +1,27 @@
 # routes.py
 
-from flask import Blueprint, render_template, request, redirect, jsonify, url_for, flash
+import re
+from flask import Blueprint, current_app, render_template, stream_template, request, redirect, jsonify, url_for, flash, abort
 from flask_login import login_user, login_required, logout_user, current_user
 from extensions import db, login_manager 
-from models import User, Dog, Appointment, MedicalNote, Service, ServiceCategory, ServiceSize, Item, Owner, Professional, Payment
-from utils import guardarBackUpTurnos 
+from models import User, Dog, Appointment, MedicalNote, Service, ServiceCategory, ServiceSize, Item, Owner, Professional, Payment, DogStats, DayClose, normalize_phone
+from utils import guardarBackUpTurnos, recalcular_estado_pago, recalcular_estadisticas_perro, perros_para_recordar, parse_fields, projection_columns, project_rows
+from cache import get_search_cache, get_user_cache, invalidate_search_cache, search_namespace
+from fragments import catalog_fragment, bump_catalog_version, render_selectable
+from branches import branch_names, consolidated_summary
+from replica import uses_read_replica
+from repricing import Repricing
+from day_close import close_day
+import analytics
+from utilization import MAX_DAYS as UTILIZATION_MAX_DAYS, utilization
+from slow_queries import worst_offenders
+from tracing import memory_exporter, waterfall
 from datetime import datetime, timedelta
-from forms import LoginForm, DogForm, AppointmentForm, ServiceForm, ServiceCategoryForm, ServiceSizeForm, ItemForm, CheckoutForm 
-from sqlalchemy import or_, func
+from forms import LoginForm, DogForm, AppointmentForm, ServiceForm, ServiceCategoryForm, ServiceSizeForm, ItemForm, CheckoutForm, RepricingForm, DayCloseForm
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 
 # Crear un Blueprint
 main = Blueprint('main', __name__)
@@ -16,7 +30,7 @@ main = Blueprint('main', __name__)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return get_user_cache().load(int(user_id))
 
 @main.route('/login', methods=['GET', 'POST'])
 def login():
@@ -24,6 +38,10 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
         if user and user.check_password(form.password.data):
+            # Hash con otro método o costo que PASSWORD_HASH_METHOD: se regenera ahora
+            if user.needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
             login_user(user)
             return redirect(url_for('main.menu_inicio'))
         else:
@@ -61,57 +79,99 @@ def vista_mascotas():
 @login_required
 def vista_turnos():
 
-    services = Service.query.filter_by(is_active=True).all()
-    items = Item.query.filter_by(is_active=True).all()
     professionals = Professional.query.filter_by(is_active=True).all()
     
-    # Agrupar servicios por categoría
-    categories = ServiceCategory.query.filter_by(is_active=True).order_by(ServiceCategory.display_order).all()
-    services_by_category = {}
-    for category in categories:
-        category_services = [s for s in services if s.category_id == category.id]
-        if category_services:
-            services_by_category[category] = category_services
-    
     form = AppointmentForm()
   
-    form.service_id.choices = [(s.id, f"{s.name} - ${s.base_price:,.0f}") for s in services]
-    form.item_ids.choices = [(i.id, f"{i.name} (+${i.price:,.0f})") for i in items]
+    form.service_id.choices = catalog_fragment('service_choices')
+    form.item_ids.choices = catalog_fragment('item_choices')
     form.professional_id.choices = [(p.id, p.name) for p in professionals]
 
-    return render_template('turnos.html', dogs=[], form=form, services_by_category=services_by_category)
+    return render_turnos(form)
+
+
+def render_turnos(form):
+    """Renderiza turnos.html pegando los fragmentos cacheados del catálogo"""
+    return render_template('turnos.html', dogs=[], form=form,
+                           service_grid=catalog_fragment('service_grid'),
+                           item_checkboxes=catalog_fragment('item_checkboxes'))
+
+# Campos de las APIs JSON: nombre -> (columnas necesarias, cómo armar el valor)
+DOG_FIELDS = {
+    'id': ([Dog.id], lambda r: r.id),
+    'name': ([Dog.name], lambda r: r.name),
+    'owner_name': ([Owner.name.label('owner_name')], lambda r: r.owner_name),
+}
+
+OWNER_FIELDS = {
+    'id': ([Owner.id], lambda r: r.id),
+    'name': ([Owner.name], lambda r: r.name),
+    'phone': ([Owner.phone], lambda r: r.phone or ''),
+    'address': ([Owner.address], lambda r: r.address or ''),
+}
+
+APPOINTMENT_FIELDS = {
+    'id': ([Appointment.id], lambda r: r.id),
+    'title': ([Dog.name.label('dog_name'), Appointment.description], lambda r: f"{r.dog_name} - {r.description}"),
+    'start': ([Appointment.start_time], lambda r: r.start_time.isoformat()),
+    'end': ([Appointment.end_time], lambda r: r.end_time.isoformat()),
+    'color': ([Appointment.color], lambda r: r.color or '#3788d8'),
+}
+
+
+def _project_cached(rows, names):
+    """Aplica el sparse fieldset a filas completas guardadas en la caché"""
+    return [{name: row[name] for name in names} for row in rows]
+
 
 @main.route('/api/dogs')
 @login_required
+@uses_read_replica
 def get_dogs_json():
-    dogs = Dog.query.filter_by(is_deleted=False).all()
-    dogs_list = [
-        {
-            'id': dog.id,
-            'name': dog.name,
-            'owner_name': dog.owner.name,
-        }
-        for dog in dogs
-    ]
-    return jsonify(dogs_list)
+    try:
+        fields = parse_fields(DOG_FIELDS, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = db.session.query(*projection_columns(DOG_FIELDS, fields)) \
+        .select_from(Dog).join(Owner, Dog.owner_id == Owner.id) \
+        .filter(Dog.is_deleted == False).all()
+    return jsonify(project_rows(DOG_FIELDS, fields, rows))
 
 #-------- Rutas de Citas --------#
 
+def _parse_calendar_date(param):
+    """Fecha ISO de FullCalendar (puede traer zona horaria) como datetime local."""
+    value = request.args.get(param)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        return None
+
 @main.route('/appointments', methods=["GET"])
 @login_required
 def get_appointments():
     try:
-        appointments = Appointment.query.filter_by(is_deleted=False).all()
-        events = [
-            {
-                'id': a.id,
-                'title': f"{a.dog.name} - {a.description}",
-                'start': a.start_time.isoformat(),
-                'end': a.end_time.isoformat(),
-                'color': a.color or '#3788d8'
-            } for a in appointments
-        ]
-        return jsonify(events)
+        fields = parse_fields(APPOINTMENT_FIELDS, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        query = db.session.query(*projection_columns(APPOINTMENT_FIELDS, fields)) \
+            .select_from(Appointment).join(Dog, Appointment.dog_id == Dog.id) \
+            .filter(Appointment.is_deleted == False)
+
+        # FullCalendar manda el rango visible (?start=...&end=...): sólo esos turnos
+        range_start, range_end = _parse_calendar_date('start'), _parse_calendar_date('end')
+        if range_start:
+            query = query.filter(Appointment.end_time > range_start)
+        if range_end:
+            query = query.filter(Appointment.start_time < range_end)
+
+        rows = query.all()
+        return jsonify(project_rows(APPOINTMENT_FIELDS, fields, rows))
     except Exception as e:
         print("Error en get_appointments: ", e)
         return jsonify({'error': 'Error al cargar turnos'}), 500
@@ -122,12 +182,10 @@ def add_appointment():
     form = AppointmentForm()
    
     # Cargar opciones para el formulario
-    services = Service.query.filter_by(is_active=True).all()
-    items = Item.query.filter_by(is_active=True).all()
     professionals = Professional.query.filter_by(is_active=True).all()
     
-    form.service_id.choices = [(s.id, s.name) for s in services]
-    form.item_ids.choices = [(i.id, i.name) for i in items]
+    form.service_id.choices = catalog_fragment('service_choices')
+    form.item_ids.choices = catalog_fragment('item_choices')
     form.professional_id.choices = [(p.id, p.name) for p in professionals]
 
     if form.validate_on_submit():
@@ -169,23 +227,25 @@ def add_appointment():
         return redirect(url_for('main.vista_turnos'))
 
     else:
+        return render_turnos(form)
 
-        categories = ServiceCategory.query.filter_by(is_active=True).order_by(ServiceCategory.display_order).all()
-        services_by_category = {}
-        for category in categories:
-            category_services = [s for s in services if s.category_id == category.id]
-            if category_services:
-                services_by_category[category] = category_services
-
-        
-        return render_template('turnos.html', dogs=[], form=form, services_by_category=services_by_category)
+def _turno_modificado(endpoint, **values):
+    """Otra persona guardó el turno entre que se leyó y se escribió (version_id)."""
+    db.session.rollback()
+    flash('El turno fue modificado por otra persona. Recargá la página y volvé a intentar.')
+    return redirect(url_for(endpoint, **values))
 
 @main.route('/appointments/delete/<int:appointment_id>', methods=['POST'])
 @login_required
 def delete_appointment(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
     appointment.is_deleted = True
-    db.session.commit()
+    try:
+        db.session.flush()
+        recalcular_estadisticas_perro(appointment.dog_id)
+        db.session.commit()
+    except StaleDataError:
+        return _turno_modificado('main.vista_turnos')
     return redirect(url_for('main.vista_turnos'))
 
 @main.route('/appointments/deleted')
@@ -198,8 +258,14 @@ def view_deleted_appointments():
 @login_required
 def permanent_delete_appointment(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
+    dog_id = appointment.dog_id
     db.session.delete(appointment)
-    db.session.commit()
+    try:
+        db.session.flush()
+        recalcular_estadisticas_perro(dog_id)
+        db.session.commit()
+    except StaleDataError:
+        return _turno_modificado('main.view_deleted_appointments')
     return redirect(url_for('main.view_deleted_appointments'))
 
 @main.route('/appointments/delete_all', methods=['POST'])
@@ -208,7 +274,12 @@ def delete_all_appointments():
     deleted_appointments = Appointment.query.filter_by(is_deleted=True).all()
     for a in deleted_appointments:
         db.session.delete(a)
-    db.session.commit()
+    try:
+        db.session.flush()
+        recalcular_estadisticas_perro(*{a.dog_id for a in deleted_appointments})
+        db.session.commit()
+    except StaleDataError:
+        return _turno_modificado('main.view_deleted_appointments')
     return redirect(url_for('main.view_deleted_appointments'))
 
 @main.route('/appointments/edit/<int:appointment_id>', methods=['GET', 'POST'])
@@ -218,12 +289,10 @@ def edit_appointment(appointment_id):
     form = AppointmentForm(obj=appointment)
 
     # Cargar listas para opciones del formulario
-    services = Service.query.filter_by(is_active=True).all()
-    items = Item.query.filter_by(is_active=True).all()
     professionals = Professional.query.filter_by(is_active=True).all()
     
-    form.service_id.choices = [(s.id, f"{s.name} - ${s.base_price:,.0f}") for s in services]
-    form.item_ids.choices = [(i.id, f"{i.name} (+${i.price:,.0f})") for i in items]
+    form.service_id.choices = catalog_fragment('service_choices')
+    form.item_ids.choices = catalog_fragment('item_choices')
     form.professional_id.choices = [(p.id, p.name) for p in professionals]
 
     if form.validate_on_submit():
@@ -231,6 +300,7 @@ def edit_appointment(appointment_id):
         service = Service.query.get(form.service_id.data)
         
         # Actualizar datos básicos
+        previous_dog_id = appointment.dog_id
         appointment.dog_id = form.dog_id.data
         appointment.service_id = form.service_id.data
         appointment.professional_id = form.professional_id.data
@@ -251,7 +321,12 @@ def edit_appointment(appointment_id):
         # Actualizar items adicionales
         appointment.items = selected_items
 
-        db.session.commit()
+        try:
+            db.session.flush()
+            recalcular_estadisticas_perro(previous_dog_id, appointment.dog_id)
+            db.session.commit()
+        except StaleDataError:
+            return _turno_modificado('main.edit_appointment', appointment_id=appointment_id)
         guardarBackUpTurnos()
         flash(f"Turno actualizado. Total: ${final_price:,.0f}")
         return redirect(url_for('main.vista_turnos'))
@@ -264,14 +339,23 @@ def edit_appointment(appointment_id):
         duration_minutes = (appointment.end_time - appointment.start_time).seconds // 60
         form.duration.data = duration_minutes
 
-    return render_template('edit_appointment.html', form=form, appointment=appointment, services=services)
+    return render_template('edit_appointment.html', form=form, appointment=appointment,
+                           service_options=render_selectable('partials/service_options.html', [form.service_id.data],
+                                                             services=catalog_fragment('service_rows')),
+                           item_checkboxes=render_selectable('partials/item_checkboxes.html', form.item_ids.data,
+                                                             item_choices=catalog_fragment('item_choices')))
 
 @main.route('/appointments/restore/<int:appointment_id>', methods=['POST'])
 @login_required
 def restore_appointment(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
     appointment.is_deleted = False
-    db.session.commit()
+    try:
+        db.session.flush()
+        recalcular_estadisticas_perro(appointment.dog_id)
+        db.session.commit()
+    except StaleDataError:
+        return _turno_modificado('main.view_deleted_appointments')
     return redirect(url_for('main.view_deleted_appointments'))
 
 
@@ -286,8 +370,9 @@ def add_dog():
     if form.validate_on_submit():
 
         owner = None
-        if form.owner_phone.data:
-            owner = Owner.query.filter_by(phone=form.owner_phone.data).first()
+        phone_normalized = normalize_phone(form.owner_phone.data)
+        if phone_normalized:
+            owner = Owner.query.filter_by(phone_normalized=phone_normalized).first()
 
         if not owner:
             owner = Owner(
@@ -310,23 +395,79 @@ def add_dog():
         )
         db.session.add(new_dog)
         db.session.commit()
+        invalidate_search_cache()
         flash('Mascota agregada correctamente.')
         return redirect(url_for('main.vista_mascotas'))
  
     dogs = []
     return render_template('index.html', dogs=dogs, form=form)
 
+TIMELINE_PAGE_SIZE = 20
+
+
+def _parse_cursor(value, parse_date):
+    """Cursor '<fecha ISO>_<id>' de la página anterior; None si falta o es inválido"""
+    if not value:
+        return None
+    try:
+        stamp, _, row_id = value.rpartition('_')
+        return parse_date(stamp), int(row_id)
+    except ValueError:
+        return None
+
+
+def _timeline_page(query, date_column, id_column, cursor):
+    """Paginación por cursor (fecha, id) descendente: no recorre las páginas previas"""
+    if cursor:
+        query = query.filter(or_(
+            date_column < cursor[0],
+            and_(date_column == cursor[0], id_column < cursor[1]),
+        ))
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(TIMELINE_PAGE_SIZE + 1).all()
+    return rows[:TIMELINE_PAGE_SIZE], len(rows) > TIMELINE_PAGE_SIZE
+
+
+def _dog_appointments_page(dog_id, cursor=None):
+    query = Appointment.query.options(
+        joinedload(Appointment.service).joinedload(Service.category),
+        joinedload(Appointment.service).joinedload(Service.size),
+    ).filter(Appointment.dog_id == dog_id, Appointment.is_deleted == False)
+    return _timeline_page(query, Appointment.start_time, Appointment.id, cursor)
+
+
+def _dog_notes_page(dog_id, cursor=None):
+    return _timeline_page(MedicalNote.query.filter_by(dog_id=dog_id), MedicalNote.date, MedicalNote.id, cursor)
+
+
 @main.route('/dogs/<int:dog_id>', methods=['GET'])
 @login_required
+@uses_read_replica
 def view_dog(dog_id):
     dog = Dog.query.get_or_404(dog_id)
-    appointments = Appointment.query.filter(
-        Appointment.dog_id == dog.id,
-        Appointment.is_deleted == False
-    ).order_by(Appointment.start_time.desc()).all()
-
-    notes = MedicalNote.query.filter_by(dog_id=dog.id).order_by(MedicalNote.date.desc()).all()
-    return render_template('dog_detail.html', dog=dog, appointments=appointments, notes=notes)
+    # Resumen precalculado: no se recorre el historial para armar la ficha
+    stats = db.session.get(DogStats, dog.id)
+    appointments, more_appointments = _dog_appointments_page(dog.id)
+    notes, more_notes = _dog_notes_page(dog.id)
+    return render_template('dog_detail.html', dog=dog, stats=stats,
+                           appointments=appointments, more_appointments=more_appointments,
+                           notes=notes, more_notes=more_notes)
+
+@main.route('/dogs/<int:dog_id>/timeline/<kind>')
+@login_required
+@uses_read_replica
+def dog_timeline(dog_id, kind):
+    """Páginas siguientes de turnos o notas (las pide el botón "Ver más")"""
+    if kind == 'appointments':
+        cursor = _parse_cursor(request.args.get('before'), datetime.fromisoformat)
+        items, has_more = _dog_appointments_page(dog_id, cursor)
+        template = 'partials/dog_appointments.html'
+    elif kind == 'notes':
+        cursor = _parse_cursor(request.args.get('before'), lambda v: datetime.fromisoformat(v).date())
+        items, has_more = _dog_notes_page(dog_id, cursor)
+        template = 'partials/dog_notes.html'
+    else:
+        abort(404)
+    return render_template(template, dog_id=dog_id, items=items, has_more=has_more)
 
 @main.route('/dogs/delete/<int:dog_id>', methods=['POST'])
 @login_required
@@ -334,6 +475,7 @@ def delete_dog(dog_id):
     dog = Dog.query.get_or_404(dog_id)
     dog.is_deleted = True
     db.session.commit()
+    invalidate_search_cache()
     return redirect(url_for('main.vista_mascotas'))
 
 @main.route('/dogs/edit/<int:dog_id>', methods=['GET', 'POST'])
@@ -349,7 +491,16 @@ def edit_dog(dog_id):
         form.address.data = dog.owner.address
 
     if form.validate_on_submit():
-        
+
+        # Un teléfono que ya es de otro dueño es casi siempre un error de tipeo:
+        # no se mueve la mascota a otra cuenta, se pide corregirlo
+        phone_normalized = normalize_phone(form.owner_phone.data)
+        if phone_normalized and phone_normalized != dog.owner.phone_normalized:
+            existing = Owner.query.filter_by(phone_normalized=phone_normalized).first()
+            if existing:
+                form.owner_phone.errors.append(f'Ese teléfono ya es de otro dueño ({existing.name}).')
+                return render_template('edit_dog.html', form=form, dog=dog)
+
         #Actualizar Datos de la mascota
         dog.name = form.name.data
         dog.notes = form.notes.data
@@ -360,6 +511,7 @@ def edit_dog(dog_id):
         dog.owner.address = form.address.data
 
         db.session.commit()
+        invalidate_search_cache()
         flash('Mascota actualizada.')
         return redirect(url_for('main.vista_mascotas'))
     
@@ -381,12 +533,55 @@ def add_note():
     db.session.commit()
     return redirect(url_for('main.view_dog', dog_id=dog_id))
 
+DOG_SEARCH_LIMIT = 50
+OWNER_SEARCH_LIMIT = 20
+
+
+def _dog_matches(row, query):
+    """Mismo criterio que el ILIKE de search_dogs_api, aplicado en memoria"""
+    return query in row['name'].lower() or query in row['owner_name'].lower()
+
+
+def _owner_matches(row, query):
+    """Mismo criterio que el ILIKE de search_owners_api, aplicado en memoria"""
+    return query in row['name'].lower()
+
+
+def _owner_phone_matches(row, digits):
+    """Mismo criterio que el rango sobre phone_normalized, aplicado en memoria"""
+    return (normalize_phone(row['phone']) or '').startswith(digits)
+
+
+# Consultas que parecen un teléfono: '11 4444', '(011) 44-', '+54 11'
+PHONE_QUERY = re.compile(r'^[\d\s\-+().]*\d[\d\s\-+().]*$')
+
+
+def _can_reuse_prefix(query):
+    # Los comodines de LIKE no se pueden filtrar como texto literal
+    return '%' not in query and '_' not in query
+
+
 @main.route('/api/dogs/search')
 @login_required
 def search_dogs_api():
 
     query = request.args.get('q', '').strip()
-    base_query = Dog.query.join(Owner).filter(Dog.is_deleted == False)
+    try:
+        fields = parse_fields(DOG_FIELDS, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    cache = get_search_cache()
+
+    # La búsqueda por ID no es monótona por prefijo ("12" no incluye al 123)
+    matches = _dog_matches if _can_reuse_prefix(query) and not query.isdigit() else None
+    cached = cache.get(search_namespace('dogs'), query, matches)
+    if cached is not None:
+        return jsonify(_project_cached(cached, fields))
+
+    # La caché guarda filas completas: siempre se leen todos los campos
+    base_query = db.session.query(*projection_columns(DOG_FIELDS, DOG_FIELDS)) \
+        .select_from(Dog).join(Owner, Dog.owner_id == Owner.id) \
+        .filter(Dog.is_deleted == False)
 
     if query:
         if query.isdigit():
@@ -407,15 +602,11 @@ def search_dogs_api():
                 )
             )
 
-    results = base_query.order_by(Dog.name.asc()).limit(50).all()
-
-    dogs_data = [{
-        'id': d.id,
-        'name': d.name,
-        'owner_name': d.owner.name
-    } for d in results]
+    results = base_query.order_by(Dog.name.asc()).limit(DOG_SEARCH_LIMIT).all()
+    dogs_data = project_rows(DOG_FIELDS, list(DOG_FIELDS), results)
 
-    return jsonify(dogs_data)
+    cache.put(search_namespace('dogs'), query, dogs_data, complete=len(dogs_data) < DOG_SEARCH_LIMIT)
+    return jsonify(_project_cached(dogs_data, fields))
 
 
 @main.route('/api/owners/search')
@@ -423,26 +614,37 @@ def search_dogs_api():
 def search_owners_api():
     """Buscar owners por nombre o teléfono para autocompletado"""
     query = request.args.get('q', '').strip()
+    try:
+        fields = parse_fields(OWNER_FIELDS, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     if not query:
         return jsonify([])
-    
-    # Buscar por nombre o teléfono
-    results = Owner.query.filter(
-        or_(
-            Owner.name.ilike(f'%{query}%'),
-            Owner.phone.ilike(f'%{query}%')
-        )
-    ).order_by(Owner.name.asc()).limit(20).all()
-    
-    owners_data = [{
-        'id': o.id,
-        'name': o.name,
-        'phone': o.phone or '',
-        'address': o.address or ''
-    } for o in results]
-    
-    return jsonify(owners_data)
+
+    cache = get_search_cache()
+    base_query = db.session.query(*projection_columns(OWNER_FIELDS, OWNER_FIELDS))
+
+    if PHONE_QUERY.match(query):
+        # Teléfono: prefijo de dígitos, rango sobre el índice de phone_normalized
+        # ('1144' <= x < '1144:', ':' es el carácter siguiente a '9')
+        namespace, key = search_namespace('owner_phones'), normalize_phone(query)
+        matches = _owner_phone_matches
+        base_query = base_query.filter(Owner.phone_normalized >= key, Owner.phone_normalized < key + ':')
+    else:
+        namespace, key = search_namespace('owners'), query
+        matches = _owner_matches if _can_reuse_prefix(query) else None
+        base_query = base_query.filter(Owner.name.ilike(f'%{query}%'))
+
+    cached = cache.get(namespace, key, matches)
+    if cached is not None:
+        return jsonify(_project_cached(cached, fields))
+
+    results = base_query.order_by(Owner.name.asc()).limit(OWNER_SEARCH_LIMIT).all()
+    owners_data = project_rows(OWNER_FIELDS, list(OWNER_FIELDS), results)
+
+    cache.put(namespace, key, owners_data, complete=len(owners_data) < OWNER_SEARCH_LIMIT)
+    return jsonify(_project_cached(owners_data, fields))
 
 
 #-------- Rutas de Gestión de Servicios --------#
@@ -476,6 +678,7 @@ def add_service():
             is_active=bool(form.is_active.data)
         )
         db.session.add(new_service)
+        bump_catalog_version()
         db.session.commit()
         flash(f'Servicio "{new_service.name}" agregado exitosamente.')
         return redirect(url_for('main.list_services'))
@@ -503,6 +706,7 @@ def edit_service(service_id):
         service.duration_minutes = form.duration_minutes.data
         service.is_active = bool(form.is_active.data)
         
+        bump_catalog_version()
         db.session.commit()
         flash(f'Servicio "{service.name}" actualizado.')
         return redirect(url_for('main.list_services'))
@@ -519,6 +723,7 @@ def delete_service(service_id):
     """Desactivar un servicio"""
     service = Service.query.get_or_404(service_id)
     service.is_active = False
+    bump_catalog_version()
     db.session.commit()
     flash(f'Servicio "{service.name}" desactivado.')
     return redirect(url_for('main.list_services'))
@@ -530,11 +735,40 @@ def permanent_delete_service(service_id):
     service = Service.query.get_or_404(service_id)
     service_name = service.name
     db.session.delete(service)
+    bump_catalog_version()
     db.session.commit()
     flash(f'Servicio "{service_name}" eliminado permanentemente.')
     return redirect(url_for('main.list_services'))
 
 
+@main.route('/services/repricing', methods=['GET', 'POST'])
+@login_required
+def reprice_catalog():
+    """Aumento masivo de servicios y adicionales, con vista previa"""
+    form = RepricingForm()
+    form.category_ids.choices = [(c.id, c.name) for c in ServiceCategory.query.filter_by(is_active=True).order_by(ServiceCategory.display_order)]
+    form.size_ids.choices = [(s.id, s.name) for s in ServiceSize.query.filter_by(is_active=True).order_by(ServiceSize.display_order)]
+    form.item_ids.choices = [(i.id, i.name) for i in Item.query.filter_by(is_active=True).order_by(Item.name)]
+
+    preview = None
+    if form.validate_on_submit():
+        repricing = Repricing(
+            float(form.percent.data), form.round_to.data,
+            include_services=form.include_services.data, include_items=form.include_items.data,
+            category_ids=form.category_ids.data, size_ids=form.size_ids.data, item_ids=form.item_ids.data,
+        )
+        if form.submit.data:
+            result = repricing.apply()
+            if result['appointments']:
+                guardarBackUpTurnos()
+            flash(f"Precios actualizados: {result['services']} servicios, {result['items']} adicionales "
+                  f"y {result['appointments']} turnos pendientes recalculados.")
+            return redirect(url_for('main.list_services'))
+        preview = repricing.preview()
+
+    return render_template('services/repricing.html', form=form, preview=preview)
+
+
 #-------- Rutas de Gestión de Items Adicionales --------#
 
 @main.route('/items')
@@ -556,6 +790,7 @@ def add_item():
             is_active=bool(form.is_active.data)
         )
         db.session.add(new_item)
+        bump_catalog_version()
         db.session.commit()
         flash(f'Item "{new_item.name}" agregado exitosamente.')
         return redirect(url_for('main.list_items'))
@@ -574,6 +809,7 @@ def edit_item(item_id):
         item.price = form.price.data
         item.is_active = bool(form.is_active.data)
         
+        bump_catalog_version()
         db.session.commit()
         flash(f'Item "{item.name}" actualizado.')
         return redirect(url_for('main.list_items'))
@@ -590,6 +826,7 @@ def delete_item(item_id):
     """Desactivar un item adicional"""
     item = Item.query.get_or_404(item_id)
     item.is_active = False
+    bump_catalog_version()
     db.session.commit()
     flash(f'Item "{item.name}" desactivado.')
     return redirect(url_for('main.list_items'))
@@ -617,6 +854,7 @@ def add_category():
             is_active=bool(form.is_active.data)
         )
         db.session.add(new_category)
+        bump_catalog_version()
         db.session.commit()
         flash(f'Categoría "{new_category.name}" agregada exitosamente.')
         return redirect(url_for('main.list_categories'))
@@ -636,6 +874,7 @@ def edit_category(category_id):
         category.display_order = form.display_order.data or 0
         category.is_active = bool(form.is_active.data)
         
+        bump_catalog_version()
         db.session.commit()
         flash(f'Categoría "{category.name}" actualizada.')
         return redirect(url_for('main.list_categories'))
@@ -653,6 +892,7 @@ def delete_category(category_id):
     """Desactivar una categoría de servicio"""
     category = ServiceCategory.query.get_or_404(category_id)
     category.is_active = False
+    bump_catalog_version()
     db.session.commit()
     flash(f'Categoría "{category.name}" desactivada.')
     return redirect(url_for('main.list_categories'))
@@ -679,6 +919,7 @@ def add_size():
             is_active=bool(form.is_active.data)
         )
         db.session.add(new_size)
+        bump_catalog_version()
         db.session.commit()
         flash(f'Tamaño "{new_size.name}" agregado exitosamente.')
         return redirect(url_for('main.list_sizes'))
@@ -697,6 +938,7 @@ def edit_size(size_id):
         size.display_order = form.display_order.data or 0
         size.is_active = bool(form.is_active.data)
         
+        bump_catalog_version()
         db.session.commit()
         flash(f'Tamaño "{size.name}" actualizado.')
         return redirect(url_for('main.list_sizes'))
@@ -714,6 +956,7 @@ def delete_size(size_id):
     """Desactivar un tamaño de servicio"""
     size = ServiceSize.query.get_or_404(size_id)
     size.is_active = False
+    bump_catalog_version()
     db.session.commit()
     flash(f'Tamaño "{size.name}" desactivado.')
     return redirect(url_for('main.list_sizes'))
@@ -726,14 +969,9 @@ def checkout(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
     form = CheckoutForm()
     
-    # Cargar opciones de servicios y adicionales
-    services = Service.query.filter_by(is_active=True).all()
-    items = Item.query.filter_by(is_active=True).all()
-    
-    # Configurar choices del formulario
-    form.service_id.choices = [(s.id, f"{s.name} - ${s.base_price:,.0f}") for s in services]
-    # Items con precio para mostrar en el formulario (aunque usaremos JS para el cálculo dinámico visual)
-    form.item_ids.choices = [(i.id, f"{i.name} (+${i.price:,.0f})") for i in items]
+    # Configurar choices del formulario (cacheados por versión del catálogo)
+    form.service_id.choices = catalog_fragment('service_choices')
+    form.item_ids.choices = catalog_fragment('item_choices')
 
     # Pre-popular datos en GET
     if request.method == 'GET':
@@ -778,54 +1016,48 @@ def checkout(appointment_id):
         )
         db.session.add(new_payment)
 
-        # 3. Actualizar Estado
-        # Calculamos manualmente el total pagado incluyendo el nuevo pago
-        total_pagado_previo = sum(p.amount for p in appointment.payments)
-        total_pagado = total_pagado_previo + amount_paid
-        saldo_restante = new_total - total_pagado
-        
-        if saldo_restante <= 0:
-            appointment.status = 'Cobrado'
-            
-            # Calcular comisión sobre el PRECIO FINAL real cobrado
-            prof = appointment.professional
-            if prof:
-                pct = prof.commission_percentage
-                appointment.commission_amount = appointment.final_price * (pct / 100)
-        elif total_pagado > 0:
-            appointment.status = 'Señado'
-            
-        db.session.commit()
+        # 3. Actualizar Estado, saldo y comisión en la base (una sola sentencia)
+        try:
+            db.session.flush()  # Falla si otra caja modificó el turno mientras tanto
+            recalcular_estado_pago(appointment.id)
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            flash('El turno fue modificado desde otra caja. Revisá los datos y volvé a cobrar.')
+            return redirect(url_for('main.checkout', appointment_id=appointment_id))
 
         flash(f'Actualizado y pago de ${amount_paid:,.0f} registrado.')
         return redirect(url_for('main.checkout', appointment_id=appointment.id))
 
-    # Datos para JavaScript
-    import json
-    services_json = json.dumps({s.id: s.base_price for s in services})
-    items_json = json.dumps({i.id: i.price for i in items})
-    
     # Total ya pagado (para el recibo)
-    total_pagado = sum(p.amount for p in appointment.payments)
+    total_pagado = appointment.amount_paid or 0
     
     return render_template('sales/checkout.html', 
                            appointment=appointment, 
                            form=form, 
-                           services=services, 
-                           items=items, 
-                           services_json=services_json,
-                           items_json=items_json,
+                           service_options=render_selectable('partials/checkout_service_options.html',
+                                                             [form.service_id.data],
+                                                             service_choices=catalog_fragment('service_choices')),
+                           item_checkboxes=render_selectable('partials/checkout_items.html', form.item_ids.data,
+                                                             items=catalog_fragment('item_rows')),
+                           services_json=catalog_fragment('services_json'),
+                           items_json=catalog_fragment('items_json'),
                            total_pagado=total_pagado)
 
 @main.route('/sales')
 @login_required
+@uses_read_replica
 def daily_sales():
     """Reporte de Ventas del Día y Comisiones"""
     today = datetime.now().date()
+    # Rango [hoy, mañana) en vez de func.date(...): así se usan los índices
+    day_start = datetime.combine(today, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
 
     # Todos los pagos del día
     all_payments = Payment.query.filter(
-        func.date(Payment.date) == today
+        Payment.date >= day_start,
+        Payment.date < day_end
     ).order_by(Payment.date.desc()).all()
     
     # Separar pagos de señas
@@ -839,8 +1071,9 @@ def daily_sales():
 
     # Turnos cobrados hoy (para comisiones)
     completed_appointments = Appointment.query.filter(
-        func.date(Appointment.end_time) == today,
-        Appointment.status == 'Cobrado'
+        Appointment.status == 'Cobrado',
+        Appointment.end_time >= day_start,
+        Appointment.end_time < day_end
     ).all()
     
     # Total comisiones
@@ -848,8 +1081,12 @@ def daily_sales():
     
     # Formulario vacío para CSRF token
     form = CheckoutForm()
+    close_form = DayCloseForm(date=today)
+    day_close = DayClose.query.filter_by(date=today).first()
 
     return render_template('sales/daily_report.html', 
+                           close_form=close_form,
+                           day_close=day_close,
                            pagos=pagos,
                            senas=senas,
                            total_pagos=total_pagos,
@@ -865,29 +1102,154 @@ def daily_sales():
 def delete_payment(payment_id):
     """Eliminar un pago (seña o pago)"""
     payment = Payment.query.get_or_404(payment_id)
-    appointment = payment.appointment
+    appointment_id = payment.appointment_id
     
     # Guardar datos para el mensaje
     amount = payment.amount
     payment_type = payment.payment_type
     
-    # Eliminar el pago
+    # Eliminar el pago y recalcular estado del turno en la base:
+    # sin pagos vuelve a Pendiente, si no cubre el total queda Señado
     db.session.delete(payment)
-    
-    # Recalcular estado del turno
-    # Si no hay más pagos, volver a Pendiente
-    # Si hay pagos pero no cubre el total, poner Señado
-    remaining_payments = [p for p in appointment.payments if p.id != payment_id]
-    total_pagado_ahora = sum(p.amount for p in remaining_payments)
-    
-    if total_pagado_ahora <= 0:
-        appointment.status = 'Pendiente'
-    elif total_pagado_ahora < appointment.final_price:
-        appointment.status = 'Señado'
-    else:
-        appointment.status = 'Cobrado'
-    
+    db.session.flush()
+    recalcular_estado_pago(appointment_id)
     db.session.commit()
     
     flash(f'{payment_type} de ${amount:,.0f} eliminado.')
-    return redirect(url_for('main.daily_sales'))
\ No newline at end of file
+    return redirect(url_for('main.daily_sales'))
+
+@main.route('/sales/close', methods=['POST'])
+@login_required
+def close_sales_day():
+    """Cierre del día: turnos pagos a Cobrado con su comisión y arqueo de caja, en una transacción"""
+    form = DayCloseForm()
+    if not form.validate_on_submit():
+        flash('No se pudo cerrar el día: fecha inválida.')
+        return redirect(url_for('main.daily_sales'))
+
+    # Sólo se cierra hoy; un día anterior (corrección) tiene que venir confirmado
+    today = datetime.now().date()
+    if form.date.data > today:
+        flash('No se puede cerrar un día que todavía no pasó.')
+        return redirect(url_for('main.daily_sales'))
+    if form.date.data < today and not form.confirm_past.data:
+        flash(f'Para cerrar el {form.date.data.strftime("%d/%m/%Y")} hay que confirmar que es un día anterior.')
+        return redirect(url_for('main.daily_sales'))
+
+    try:
+        record = close_day(form.date.data, current_user.username)
+    except IntegrityError:
+        # Otra caja cerró el mismo día al mismo tiempo (date es único)
+        db.session.rollback()
+        flash('Día ya cerrado desde otra caja. Si falta un pago, volvé a cerrarlo.')
+        return redirect(url_for('main.day_close_report', day=form.date.data.isoformat()))
+    flash(f'Día cerrado: {record.appointments_closed} turnos cobrados, ${record.total_cash:,.0f} en caja.')
+    return redirect(url_for('main.day_close_report', day=record.date.isoformat()))
+
+@main.route('/sales/close/<day>')
+@login_required
+@uses_read_replica
+def day_close_report(day):
+    """Cierre guardado de un día (una sola fila)"""
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+    except ValueError:
+        abort(404)
+    record = DayClose.query.filter_by(date=day).first_or_404()
+    return render_template('sales/day_close.html', record=record)
+
+
+#-------- Rutas de Reportes --------#
+
+def _report_range(default_from, default_to=None):
+    """Parámetros from/to (YYYY-MM-DD, ambos inclusive) de los reportes"""
+    try:
+        date_from = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d')
+    except ValueError:
+        date_from = default_from
+    try:
+        date_to = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d')
+    except ValueError:
+        date_to = default_to or date_from
+    return date_from, max(date_to, date_from)
+
+@main.route('/reports/recall')
+@login_required
+@uses_read_replica
+def recall_report():
+    """Perros atrasados según su intervalo habitual y sin turno reservado"""
+    weeks = request.args.get('weeks', 6, type=int)
+    weeks = min(max(weeks, 1), 52)
+    dogs = perros_para_recordar(datetime.now(), default_weeks=weeks)
+    return render_template('reports/recall.html', dogs=dogs, weeks=weeks)
+
+@main.route('/reports/branches')
+@login_required
+def branches_report():
+    """Caja consolidada de todas las sucursales (sólo admin)"""
+    if current_user.role != 'admin':
+        abort(403)
+    if not branch_names():
+        flash('No hay sucursales configuradas (BRANCHES).')
+        return redirect(url_for('main.daily_sales'))
+
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    date_from, date_to = _report_range(today)
+
+    rows, totals = consolidated_summary(date_from, date_to + timedelta(days=1))
+    return render_template('reports/branches.html', rows=rows, totals=totals,
+                           date_from=date_from, date_to=date_to)
+
+@main.route('/reports/slow-queries')
+@login_required
+def slow_queries_report():
+    """Consultas más lentas del log, agrupadas por sentencia (sólo admin)"""
+    if current_user.role != 'admin':
+        abort(403)
+    log = current_app.extensions.get('slow_query_log')
+    offenders = worst_offenders(log) if log else []
+    return render_template('reports/slow_queries.html', offenders=offenders, log=log)
+
+@main.route('/reports/traces')
+@main.route('/reports/traces/<trace_id>')
+@login_required
+def traces_report(trace_id=None):
+    """Últimas trazas y la cascada de una de ellas (sólo admin)"""
+    if current_user.role != 'admin':
+        abort(403)
+    exporter = memory_exporter()
+    traces = exporter.traces() if exporter else []
+    selected = None
+    if trace_id:
+        spans = exporter.get(trace_id) if exporter else None
+        if spans is None:
+            abort(404)
+        selected = waterfall(spans)
+    return render_template('reports/traces.html', traces=traces, selected=selected, enabled=exporter is not None)
+
+@main.route('/reports/utilization')
+@login_required
+@uses_read_replica
+def utilization_report():
+    """Ocupación de cada peluquera y mapa día x hora (últimas 4 semanas por defecto, hasta un año)"""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    date_from, date_to = _report_range(today - timedelta(days=27), today)
+    date_to = min(date_to, date_from + timedelta(days=UTILIZATION_MAX_DAYS - 1))
+    report = utilization(date_from, date_to + timedelta(days=1))
+    return render_template('reports/utilization.html', report=report, date_from=date_from, date_to=date_to)
+
+@main.route('/reports/analytics')
+@login_required
+@uses_read_replica
+def analytics_report():
+    """Facturación por servicio, tamaño, peluquera y adicional (trimestre actual por defecto)"""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    quarter_start = today.replace(month=3 * ((today.month - 1) // 3) + 1, day=1)
+    date_from, date_to = _report_range(quarter_start, today)
+    end = date_to + timedelta(days=1)
+
+    summary = analytics.totals(date_from, end)
+    # stream_template: cada sección se consulta y se envía a medida que se renderiza
+    return stream_template('reports/analytics.html', summary=summary,
+                           sections=analytics.sections(date_from, end, summary),
+                           date_from=date_from, date_to=date_to)
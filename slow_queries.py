@@ -0,0 +1,183 @@
+# slow_queries.py
+"""
+Log de consultas lentas.
+
+Toda sentencia SQL que tarda más de SLOW_QUERY_MS (250 por defecto, None
+lo desactiva) se agrega como una línea JSON a SLOW_QUERY_LOG
+(instance/logs/slow_queries.jsonl), con rotación por tamaño. Como con las
+métricas, cada proceso escribe su propio archivo (slow_queries.<pid>.jsonl):
+varios workers rotando el mismo archivo se pisarían. Se guarda el
+texto de la sentencia, la forma de los parámetros (tipos, no valores: son
+teléfonos y nombres de clientes), la duración, la ruta que la originó y,
+en SQLite, el EXPLAIN QUERY PLAN capturado en el momento.
+
+/reports/slow-queries agrupa el log por sentencia y ordena por tiempo total.
+"""
+import glob
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+DEFAULT_THRESHOLD_MS = 250
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+class SlowQueryLog:
+    """Destino del log: un archivo con RotatingFileHandler por proceso."""
+
+    def __init__(self, path, threshold_ms, max_bytes=1_000_000, backups=3):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._pid = None
+        self.logger = None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def process_path(self, pid=None):
+        """slow_queries.jsonl -> slow_queries.<pid>.jsonl"""
+        base, ext = os.path.splitext(self.path)
+        return f'{base}.{pid or os.getpid()}{ext}'
+
+    def _logger(self):
+        # El handler se arma en el proceso que escribe (después del fork de gunicorn)
+        pid = os.getpid()
+        if self._pid != pid:
+            path = self.process_path(pid)
+            logger = logging.getLogger(f'slow_queries.{path}')
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if not logger.handlers:
+                handler = RotatingFileHandler(path, maxBytes=self.max_bytes, backupCount=self.backups,
+                                              encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+            self.logger, self._pid = logger, pid
+        return self.logger
+
+    def write(self, entry):
+        self._logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def files(self):
+        """Archivos de todos los procesos (actuales y rotados), del más viejo al más nuevo."""
+        base, ext = os.path.splitext(self.path)
+        pattern = f'{glob.escape(base)}.*{ext}'
+        paths = glob.glob(pattern) + glob.glob(pattern + '.*')
+        return sorted(paths, key=os.path.getmtime)
+
+    def entries(self):
+        for path in self.files():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Línea cortada por una rotación
+
+
+def init_slow_query_log(app):
+    threshold = app.config.get('SLOW_QUERY_MS', DEFAULT_THRESHOLD_MS)
+    if threshold is None:
+        app.extensions['slow_query_log'] = None
+        return
+    path = app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'logs', 'slow_queries.jsonl')
+    app.extensions['slow_query_log'] = SlowQueryLog(
+        path, threshold,
+        max_bytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 1_000_000),
+        backups=app.config.get('SLOW_QUERY_LOG_BACKUPS', 3),
+    )
+
+
+def _shape(value):
+    if value is None:
+        return 'None'
+    if isinstance(value, str):
+        return f'str({len(value)})'
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany):
+    """Tipos de los parámetros (y largo de los textos), sin los valores."""
+    if executemany:
+        first = parameter_shape(parameters[0], False) if parameters else []
+        return {'rows': len(parameters), 'first': first}
+    if isinstance(parameters, dict):
+        return {name: _shape(value) for name, value in parameters.items()}
+    return [_shape(value) for value in parameters or ()]
+
+
+def _query_plan(cursor, statement, parameters):
+    """EXPLAIN QUERY PLAN por la conexión DBAPI: no pasa por los eventos del engine."""
+    try:
+        rows = cursor.connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    except Exception as e:
+        return [f'(sin plan: {e})']
+    return [row[-1] for row in rows]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _drop_timer(context):
+    # La sentencia falló: no hay after_cursor_execute que saque su marca
+    if context.connection is not None and context.statement is not None:
+        started = context.connection.info.get('slow_query_started')
+        if started:
+            started.pop()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _log_if_slow(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['slow_query_started'].pop()
+    if not has_app_context():
+        return
+    log = current_app.extensions.get('slow_query_log')
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if log is None or elapsed_ms < log.threshold_ms:
+        return
+
+    entry = {
+        'at': datetime.now().isoformat(timespec='seconds'),
+        'duration_ms': round(elapsed_ms, 2),
+        'statement': statement,
+        'parameters': parameter_shape(parameters, executemany),
+        'route': request.endpoint if has_request_context() else 'cli',
+        'database': conn.engine.url.database,
+    }
+    if conn.dialect.name == 'sqlite' and not executemany \
+            and statement.lstrip().upper().startswith(EXPLAINABLE):
+        entry['plan'] = _query_plan(cursor, statement, parameters)
+    log.write(entry)
+
+
+def worst_offenders(log, limit=50):
+    """Sentencias agrupadas por texto, de mayor a menor tiempo total."""
+    groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'routes': set()})
+    for entry in log.entries():
+        group = groups[entry['statement']]
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['routes'].add(entry.get('route') or '-')
+        group['last_at'] = max(group.get('last_at', ''), entry['at'])
+        group['plan'] = entry.get('plan') or group.get('plan')
+        group['parameters'] = entry.get('parameters')
+
+    ranked = sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:limit]
+    return [
+        {**group, 'statement': statement, 'avg_ms': group['total_ms'] / group['count'],
+         'routes': sorted(group['routes'])}
+        for statement, group in ranked
+    ]
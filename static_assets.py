@@ -0,0 +1,172 @@
+# static_assets.py
+"""
+CSS propio, con hash en el nombre y precomprimido.
+
+En lugar del compilador JIT de Tailwind que corre en el navegador:
+
+    flask --app app:create_app assets build     # arma assets/dist/
+
+`build` genera el CSS de Tailwind sólo con las clases que aparecen en
+templates y módulos (assets/tailwind.config.js) y lo escribe como
+app.<hash>.css, más sus variantes .gz (y .br si está instalado brotli) y
+manifest.json.
+
+Los templates usan `asset_url('app.css')`. Se sirve en /assets/ con
+Cache-Control de un año (immutable: el hash cambia con el contenido) y la
+variante comprimida que acepte el navegador. Sin build (desarrollo, tests)
+asset_url devuelve None y el template cae al Tailwind del CDN.
+
+FullCalendar no pasa por acá: se sigue cargando del CDN, fijado a
+FULLCALENDAR_VERSION (global `fullcalendar_cdn` en los templates).
+
+assets/dist/ no se versiona.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+import tempfile
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli sólo se precomprime con gzip
+    brotli = None
+
+
+TAILWIND_VERSION = '3.4.17'
+FULLCALENDAR_VERSION = '6.1.17'
+
+FULLCALENDAR_CDN = f'https://cdn.jsdelivr.net/npm/fullcalendar@{FULLCALENDAR_VERSION}/index.global.min.js'
+TAILWIND_CDN = f'https://cdn.tailwindcss.com/{TAILWIND_VERSION}'
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+MAX_AGE = 365 * 24 * 3600
+
+
+def source_dir(app):
+    return os.path.join(app.root_path, 'assets')
+
+
+def dist_dir(app):
+    return app.config.get('ASSETS_DIST') or os.path.join(source_dir(app), 'dist')
+
+
+def load_manifest(app):
+    try:
+        with open(os.path.join(dist_dir(app), 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+#-------- Build --------#
+
+def fingerprint(sources, out_dir):
+    """Copia cada archivo como nombre.<hash>.ext con sus variantes comprimidas.
+
+    sources: {nombre lógico: ruta}. Devuelve el manifiesto {nombre: archivo}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for name, path in sources.items():
+        with open(path, 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        _write(os.path.join(out_dir, hashed), data)
+        if ext in COMPRESSIBLE:
+            _write(os.path.join(out_dir, hashed + '.gz'), gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(os.path.join(out_dir, hashed + '.br'), brotli.compress(data, quality=11))
+        manifest[name] = hashed
+
+    _write(os.path.join(out_dir, 'manifest.json'),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _write(path, data):
+    """Escritura atómica: un worker nunca sirve un archivo a medio escribir."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_tailwind(app, output):
+    """Compila assets/tailwind.css purgado con el CLI de Tailwind (binario o npx)."""
+    command = app.config.get('TAILWIND_COMMAND') or (
+        ['tailwindcss'] if shutil.which('tailwindcss') else ['npx', '--yes', f'tailwindcss@{TAILWIND_VERSION}'])
+    source = source_dir(app)
+    subprocess.run([*command, '--config', os.path.join(source, 'tailwind.config.js'),
+                    '--input', os.path.join(source, 'tailwind.css'), '--output', output, '--minify'],
+                   cwd=app.root_path, check=True)
+
+
+def build(app):
+    """Arma assets/dist/ con el CSS de Tailwind. Devuelve el manifiesto."""
+    with tempfile.TemporaryDirectory() as tmp:
+        css = os.path.join(tmp, 'app.css')
+        build_tailwind(app, css)
+        out = dist_dir(app)
+        if os.path.isdir(out):
+            shutil.rmtree(out)  # Sin hashes viejos colgando
+        return fingerprint({'app.css': css}, out)
+
+
+#-------- Servir --------#
+
+def asset_url(name):
+    """URL con hash del asset; None sin build."""
+    hashed = current_app.extensions['assets'].get(name)
+    return f'/assets/{hashed}' if hashed else None
+
+
+def serve_asset(filename):
+    directory = dist_dir(current_app)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[encoding] and os.path.isfile(os.path.join(directory, filename + suffix)):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype, max_age=MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, mimetype=mimetype, max_age=MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_assets(app):
+    """Lee el manifiesto, registra asset_url en Jinja y la ruta /assets/."""
+    app.extensions['assets'] = load_manifest(app)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['tailwind_cdn'] = TAILWIND_CDN
+    app.jinja_env.globals['fullcalendar_cdn'] = FULLCALENDAR_CDN
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+
+
+#-------- CLI --------#
+
+assets_cli = AppGroup('assets', help='CSS de Tailwind con hash')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Genera assets/dist/ con nombres con hash y variantes comprimidas."""
+    try:
+        manifest = build(current_app)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise click.ClickException(f'No se pudo compilar Tailwind: {e}')
+    current_app.extensions['assets'] = manifest
+    for name, hashed in sorted(manifest.items()):
+        click.echo(f'{name} -> assets/dist/{hashed}')
@@ -1,9 +1,26 @@
 # tests/conftest.py
 import pytest
+from flask import Flask
+
 from app import create_app
 from extensions import db
 from models import User
 
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true', help='Corre también los tests de rendimiento (@pytest.mark.slow)')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: test de rendimiento con tiempos de reloj; sólo con --run-slow')
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-slow'):
+        return
+    skip = pytest.mark.skip(reason='test de rendimiento: correr con --run-slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
+
 @pytest.fixture
 def app():
     # 1. Configuración de la App
@@ -34,4 +51,25 @@ def app():
 
 @pytest.fixture
 def client(app):
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Fábrica de apps aisladas: base SQLite propia en tmp_path, más la config de cada test."""
+    def factory(**config):
+        return create_app({
+            'TESTING': True,
+            'WTF_CSRF_ENABLED': False,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+            **config,
+        })
+    return factory
+
+@pytest.fixture
+def login():
+    """Loguea un cliente (o uno nuevo de la app que se pase) y lo devuelve."""
+    def log_in(target, username='admin', password='admin'):
+        client = target.test_client() if isinstance(target, Flask) else target
+        client.post('/login', data={'username': username, 'password': password})
+        return client
+    return log_in
@@ -0,0 +1,106 @@
+# tests/test_analytics.py
+"""Tests de la analítica de servicios, peluqueras y adicionales"""
+from datetime import datetime, timedelta
+
+import analytics
+from models import Appointment, Dog, Item, Owner, Professional, Service, ServiceCategory, ServiceSize, db
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def crear_turnos():
+    bano = ServiceCategory(name="Baño", display_order=1)
+    chico = ServiceSize(name="Chico", display_order=1)
+    grande = ServiceSize(name="Grande", display_order=2)
+    owner = Owner(name="Ana")
+    sandra = Professional(name="Sandra", commission_percentage=50)
+    db.session.add_all([bano, chico, grande, owner, sandra])
+    db.session.flush()
+    bano_chico = Service(category_id=bano.id, size_id=chico.id, base_price=10000)
+    bano_grande = Service(category_id=bano.id, size_id=grande.id, base_price=20000)
+    perfume = Item(name="Perfume", price=1000)
+    dog = Dog(name="Luna", owner_id=owner.id)
+    db.session.add_all([bano_chico, bano_grande, perfume, dog])
+    db.session.flush()
+
+    start = datetime(2025, 2, 3, 10)
+    turnos = [
+        # (servicio, precio, horas, estado, adicionales)
+        (bano_chico, 11000, 1, 'Cobrado', [perfume]),
+        (bano_chico, 10000, 1, 'Cobrado', []),
+        (bano_grande, 20000, 2, 'Cobrado', []),
+        (bano_grande, 20000, 2, 'Pendiente', [perfume]),  # No cuenta: no está cobrado
+    ]
+    for i, (service, price, hours, status, items) in enumerate(turnos):
+        day = start + timedelta(days=i)
+        db.session.add(Appointment(dog_id=dog.id, service_id=service.id, professional_id=sandra.id,
+                                   start_time=day, end_time=day + timedelta(hours=hours), status=status,
+                                   total_amount=price, final_price=price, items=items))
+    db.session.commit()
+
+
+def test_totales_y_agrupaciones(app):
+    crear_turnos()
+    start, end = datetime(2025, 1, 1), datetime(2025, 4, 1)
+
+    summary = analytics.totals(start, end)
+    assert (summary['appointments'], summary['revenue']) == (3, 41000)
+    assert summary['hours'] == 4
+    assert summary['revenue_per_hour'] == 10250
+
+    by_size = list(analytics.grouped(start, end, 'size', summary))
+    assert [(r['label'], r['appointments'], r['revenue']) for r in by_size] == [('Chico', 2, 21000), ('Grande', 1, 20000)]
+    chico = by_size[0]
+    assert chico['average_ticket'] == 10500
+    assert chico['revenue_per_hour'] == 10500
+
+    by_service = list(analytics.grouped(start, end, 'service', summary))
+    assert {r['label'] for r in by_service} == {'Baño - Chico', 'Baño - Grande'}
+
+    [sandra] = analytics.grouped(start, end, 'professional', summary)
+    assert (sandra['label'], sandra['share']) == ('Sandra', 1.0)
+
+
+def test_agrupa_por_id_y_no_por_nombre(app):
+    crear_turnos()
+    otra_sandra = Professional(name="Sandra", commission_percentage=40)
+    db.session.add(otra_sandra)
+    db.session.flush()
+    dog, service = Dog.query.first(), Service.query.first()
+    day = datetime(2025, 3, 1, 10)
+    db.session.add(Appointment(dog_id=dog.id, service_id=service.id, professional_id=otra_sandra.id,
+                               start_time=day, end_time=day + timedelta(hours=1), status='Cobrado',
+                               total_amount=5000, final_price=5000))
+    db.session.commit()
+    start, end = datetime(2025, 1, 1), datetime(2025, 4, 1)
+
+    rows = list(analytics.grouped(start, end, 'professional', analytics.totals(start, end)))
+    assert [(r['label'], r['revenue']) for r in rows] == [('Sandra', 41000), ('Sandra', 5000)]
+
+
+def test_adicionales_tasa_de_adjuncion(app):
+    crear_turnos()
+    start, end = datetime(2025, 1, 1), datetime(2025, 4, 1)
+    summary = analytics.totals(start, end)
+
+    [perfume] = analytics.add_ons(start, end, summary)
+    assert perfume['label'] == 'Perfume'
+    assert perfume['appointments'] == 1
+    assert perfume['attach_rate'] == 1 / 3
+    assert perfume['average_ticket'] == 11000
+
+
+def test_reporte_por_rango(client, app):
+    login(client)
+    crear_turnos()
+
+    page = client.get('/reports/analytics?from=2025-01-01&to=2025-03-31').get_data(as_text=True)
+    assert 'Baño - Chico' in page
+    assert 'Perfume' in page
+    assert '$41.000' in page
+    assert analytics.ADD_ONS_NOTE in page
+
+    page = client.get('/reports/analytics?from=2024-01-01&to=2024-03-31').get_data(as_text=True)
+    assert 'Sin turnos cobrados en el período.' in page
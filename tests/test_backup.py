@@ -0,0 +1,128 @@
+# tests/test_backup.py
+"""Tests de snapshots de la base SQLite"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from backup import BackupError, create_snapshot, list_snapshots, restore_snapshot, snapshot_all, verify_snapshot
+from branches import use_branch
+from extensions import db
+from models import Owner
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'peluqueria.db'}",
+        'BACKUP_DIR': str(tmp_path / 'backups'),
+        'BACKUP_RETENTION': {'hourly': 2},
+        'TESTING': True,
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def test_snapshot_verificar_y_restaurar(file_app):
+    db.session.add(Owner(name="Antes del backup"))
+    db.session.commit()
+
+    result = create_snapshot()
+    assert os.path.exists(result['file'])
+    assert result['promoted'] == ['daily', 'weekly']
+    assert verify_snapshot(result['file'])['owner'] == 1
+
+    db.session.add(Owner(name="Después del backup"))
+    db.session.commit()
+    restore_snapshot(result['file'])
+
+    assert [o.name for o in Owner.query.all()] == ["Antes del backup"]
+
+
+def test_rotacion_por_nivel(file_app):
+    start = datetime(2025, 5, 1, 8, 0)
+    for hour in range(4):
+        create_snapshot(now=start + timedelta(hours=hour))
+
+    assert len(list_snapshots('hourly')) == 2  # retención configurada
+    assert len(list_snapshots('daily')) == 1   # todavía no pasó un día
+    assert os.path.basename(list_snapshots('hourly')[0]) == 'peluqueria-20250501-110000-000000.db.gz'
+
+
+def test_dos_snapshots_en_el_mismo_segundo(file_app):
+    now = datetime(2025, 5, 1, 8, 0, 0)
+    first = create_snapshot(now=now)
+    second = create_snapshot(now=now + timedelta(microseconds=1))
+
+    assert first['file'] != second['file']
+    assert list_snapshots('hourly') == [second['file'], first['file']]
+
+
+def test_convive_con_nombres_sin_microsegundos(file_app):
+    create_snapshot(now=datetime(2025, 5, 1, 8, 0))
+    legacy = os.path.join(os.path.dirname(list_snapshots('daily')[0]), 'peluqueria-20250501-090000.db.gz')
+    os.link(list_snapshots('daily')[0], legacy)
+    assert list_snapshots('daily')[0] == legacy
+
+    # El último daily (con nombre viejo) es de hace menos de un día: no se promueve
+    assert 'daily' not in create_snapshot(now=datetime(2025, 5, 2, 8, 30))['promoted']
+    assert 'daily' in create_snapshot(now=datetime(2025, 5, 2, 9, 30))['promoted']
+
+
+def test_comando_verify(file_app):
+    result = create_snapshot()
+    output = file_app.test_cli_runner().invoke(args=['backup', 'verify', result['file']])
+
+    assert 'Snapshot OK' in output.output
+
+
+@pytest.fixture
+def branch_file_app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'peluqueria.db'}",
+        'BRANCHES': {'centro': f"sqlite:///{tmp_path / 'centro.db'}"},
+        'BACKUP_DIR': str(tmp_path / 'backups'),
+        'TESTING': True,
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+    for engine in app.extensions['branch_engines'].values():
+        engine.dispose()
+
+
+def test_snapshot_y_restore_de_sucursales(branch_file_app):
+    with use_branch('centro'):
+        db.session.add(Owner(name="Cliente del centro"))
+        db.session.commit()
+
+    principal, centro = snapshot_all()
+    assert centro['branch'] == 'centro' and '/branches/centro/' in centro['file']
+    assert verify_snapshot(centro['file'])['owner'] == 1
+    assert 'user' not in verify_snapshot(centro['file'])
+
+    with use_branch('centro'):
+        db.session.add(Owner(name="Después del backup"))
+        db.session.commit()
+    # Cada snapshot sólo se restaura sobre su base
+    with pytest.raises(BackupError):
+        restore_snapshot(centro['file'])
+    with pytest.raises(BackupError):
+        restore_snapshot(principal['file'], branch='centro')
+
+    restore_snapshot(centro['file'], branch='centro')
+    with use_branch('centro'):
+        assert [o.name for o in Owner.query.all()] == ["Cliente del centro"]
+
+
+def test_comando_verify_sin_archivo_revisa_todas_las_bases(branch_file_app):
+    runner = branch_file_app.test_cli_runner()
+    assert runner.invoke(args=['backup', 'verify']).exit_code != 0
+
+    runner.invoke(args=['backup', 'snapshot'])
+    output = runner.invoke(args=['backup', 'verify'])
+
+    assert output.exit_code == 0
+    assert output.output.count('Snapshot OK') == 2
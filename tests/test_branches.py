@@ -0,0 +1,112 @@
+# tests/test_branches.py
+"""Tests de sucursales: una base por sucursal y catálogo compartido"""
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from branches import use_branch
+from extensions import db
+from models import Appointment, Dog, Owner, Payment, Service, ServiceCategory, ServiceSize, User
+
+
+@pytest.fixture
+def branch_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "shared.db"}',
+        'BRANCHES': {
+            'centro': f'sqlite:///{tmp_path / "centro.db"}',
+            'norte': f'sqlite:///{tmp_path / "norte.db"}',
+        },
+    })
+    with app.app_context():
+        for username, branch, role in (('ana', 'centro', 'peluquera'), ('beto', 'norte', 'peluquera'),
+                                       ('jefe', None, 'admin')):
+            user = User(username=username, branch=branch, role=role)
+            user.set_password('clave')
+            db.session.add(user)
+        db.session.commit()
+
+    # Sin app context abierto: cada request tiene su propio `g` (usuario y sucursal)
+    yield app
+
+    for engine in app.extensions['branch_engines'].values():
+        engine.dispose()
+
+
+def login_as(app, username):
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': 'clave'})
+    return client
+
+
+def contar(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def crear_turno(branch, amount, service_id=None):
+    with use_branch(branch):
+        owner = Owner(name="Carla")
+        db.session.add(owner)
+        db.session.flush()
+        dog = Dog(name="Luna", owner_id=owner.id)
+        db.session.add(dog)
+        db.session.flush()
+        appointment = Appointment(dog_id=dog.id, service_id=service_id, start_time=datetime.now(),
+                                  end_time=datetime.now(), final_price=amount)
+        db.session.add(appointment)
+        db.session.flush()
+        db.session.add(Payment(appointment_id=appointment.id, amount=amount, payment_method='Efectivo'))
+        db.session.commit()
+        return dog.id
+
+
+def test_cada_sucursal_escribe_en_su_base(branch_app, tmp_path):
+    centro, norte = login_as(branch_app, 'ana'), login_as(branch_app, 'beto')
+
+    centro.post('/dogs', data={'name': 'Luna', 'owner_name': 'Carla', 'owner_phone': '1155'})
+    norte.post('/dogs', data={'name': 'Toby', 'owner_name': 'Pedro', 'owner_phone': '2266'})
+
+    assert [d['name'] for d in centro.get('/api/dogs').get_json()] == ['Luna']
+    assert [d['name'] for d in norte.get('/api/dogs').get_json()] == ['Toby']
+    assert norte.get('/api/owners/search?q=Carla').get_json() == []
+    assert contar(tmp_path / 'centro.db', 'dog') == 1
+    assert contar(tmp_path / 'shared.db', 'dog') == 0
+
+
+def test_turnos_de_sucursal_unen_con_catalogo_compartido(branch_app):
+    with branch_app.app_context():
+        category, size = ServiceCategory.query.first(), ServiceSize.query.first()
+        service = Service(category_id=category.id, size_id=size.id, base_price=9000)
+        db.session.add(service)
+        db.session.commit()
+        dog_id = crear_turno('centro', 9000, service.id)
+
+    # La ficha hace JOIN de turnos (sucursal) con servicios (catálogo adjunto)
+    html = login_as(branch_app, 'ana').get(f'/dogs/{dog_id}').get_data(as_text=True)
+    assert 'Baño - Chico' in html
+
+
+def test_catalogo_es_de_solo_lectura_desde_la_sucursal(branch_app):
+    with branch_app.app_context():
+        with branch_app.extensions['branch_engines']['centro'].connect() as conn:
+            with pytest.raises(Exception, match='readonly'):
+                conn.exec_driver_sql("UPDATE service_category SET name = 'X'")
+
+
+def test_reporte_consolidado(branch_app):
+    with branch_app.app_context():
+        crear_turno('centro', 5000)
+        crear_turno('norte', 7000)
+
+    html = login_as(branch_app, 'jefe').get('/reports/branches').get_data(as_text=True)
+
+    assert '$5.000' in html and '$7.000' in html and '$12.000' in html
+    assert login_as(branch_app, 'ana').get('/reports/branches').status_code == 403
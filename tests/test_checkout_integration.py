@@ -315,3 +315,85 @@ class TestSaldoPendiente:
             
             appointment = Appointment.query.get(appt_id)
             assert appointment.saldo_pendiente == 15000
+
+
+class TestRecalculoAtomico:
+    """Tests del recálculo de estado/saldo/comisión hecho en la base"""
+    
+    def test_pago_completo_calcula_comision_y_total_pagado(self, client, app, setup_data):
+        """Al quedar Cobrado se guarda el total pagado y la comisión de la peluquera"""
+        login(client)
+        
+        with app.app_context():
+            appt_id = setup_data['appointment_id']
+            client.post(
+                f'/appointments/{appt_id}/checkout',
+                data={
+                    'service_id': setup_data['service_id'],
+                    'amount': 20000,
+                    'payment_method': 'Efectivo',
+                    'payment_type': 'Pago',
+                    'final_price': 20000
+                },
+                follow_redirects=True
+            )
+            
+            appointment = Appointment.query.get(appt_id)
+            assert appointment.amount_paid == 20000
+            assert appointment.commission_amount == 10000  # 50% de 20000
+            
+            # Al eliminar el pago la comisión deja de corresponder
+            client.post(f'/payments/delete/{appointment.payments[0].id}', follow_redirects=True)
+            appointment = Appointment.query.get(appt_id)
+            assert appointment.status == 'Pendiente'
+            assert appointment.amount_paid == 0
+            assert appointment.commission_amount == 0
+    
+    def test_turno_modificado_por_otra_caja_no_registra_pago(self, client, app, setup_data):
+        """Si la versión del turno cambió, el cobro se rechaza en vez de pisar datos"""
+        login(client)
+        
+        with app.app_context():
+            appt_id = setup_data['appointment_id']
+            en_memoria = Appointment.query.get(appt_id)  # Queda en la sesión con la versión actual
+            
+            # Otra caja modifica el turno por su cuenta
+            with db.engine.begin() as conn:
+                conn.execute(db.text("UPDATE appointment SET version_id = version_id + 1 WHERE id = :id"), {'id': appt_id})
+            
+            response = client.post(
+                f'/appointments/{appt_id}/checkout',
+                data={
+                    'service_id': setup_data['service_id'],
+                    'amount': 5000,
+                    'payment_method': 'Efectivo',
+                    'payment_type': 'Seña',
+                    'final_price': 25000
+                },
+                follow_redirects=True
+            )
+            
+            assert 'modificado desde otra caja' in response.get_data(as_text=True)
+            assert Payment.query.filter_by(appointment_id=appt_id).count() == 0
+
+    @pytest.mark.parametrize('url, deleted', [('/appointments/delete/{id}', False),
+                                              ('/appointments/restore/{id}', True)])
+    def test_borrar_o_restaurar_turno_modificado_no_pisa_datos(self, client, app, setup_data, url, deleted):
+        """Borrar/restaurar con una versión vieja hace rollback y pide recargar"""
+        login(client)
+        
+        with app.app_context():
+            appt_id = setup_data['appointment_id']
+            en_memoria = Appointment.query.get(appt_id)  # Queda en la sesión con la versión actual
+            en_memoria.is_deleted = deleted
+            db.session.commit()
+            en_memoria.version_id  # Recarga la versión antes de que otro la cambie
+            
+            with db.engine.begin() as conn:
+                conn.execute(db.text("UPDATE appointment SET version_id = version_id + 1 WHERE id = :id"), {'id': appt_id})
+            
+            response = client.post(url.format(id=appt_id), follow_redirects=True)
+            
+            assert 'modificado por otra persona' in response.get_data(as_text=True)
+            db.session.expire_all()
+            assert db.session.get(Appointment, appt_id).is_deleted is deleted
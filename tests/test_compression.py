@@ -0,0 +1,74 @@
+# tests/test_compression.py
+"""Tests de la compresión de respuestas"""
+import gzip
+
+import pytest
+from flask import Response, request, stream_with_context
+
+import compression
+from app import create_app
+
+
+@pytest.fixture
+def gz_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+    })
+
+    def con_etag():
+        response = Response('turno ' * 1000, mimetype='text/html')
+        response.add_etag()
+        return response.make_conditional(request)
+
+    app.add_url_rule('/_etag', 'con_etag', con_etag)
+    app.add_url_rule('/_chico', 'chico', lambda: Response('ok', mimetype='text/html'))
+    app.add_url_rule('/_stream', 'stream', lambda: Response(stream_with_context(iter(['x' * 5000])), mimetype='text/html'))
+    yield app
+
+
+def login(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    return client
+
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def test_comprime_html_grande(gz_app):
+    client = login(gz_app)
+    plain = client.get('/services')
+    response = client.get('/services', headers=GZIP)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert int(response.headers['Content-Length']) < len(plain.data) / 2
+    assert 'Content-Encoding' not in plain.headers
+
+
+def test_no_comprime_chicas_ni_streaming(gz_app):
+    client = gz_app.test_client()
+    assert 'Content-Encoding' not in client.get('/_chico', headers=GZIP).headers
+    streamed = client.get('/_stream', headers=GZIP)
+    assert 'Content-Encoding' not in streamed.headers and streamed.data == b'x' * 5000
+
+
+def test_etag_debil_sigue_dando_304(gz_app):
+    client = gz_app.test_client()
+    response = client.get('/_etag', headers=GZIP)
+    etag = response.headers['ETag']
+    assert etag.startswith('W/') and response.headers['Content-Encoding'] == 'gzip'
+
+    again = client.get('/_etag', headers={**GZIP, 'If-None-Match': etag})
+    assert again.status_code == 304
+
+
+def test_cuerpo_repetido_sale_del_cache(gz_app, monkeypatch):
+    client = gz_app.test_client()
+    first = client.get('/_etag', headers=GZIP).data
+
+    monkeypatch.setattr(compression, '_compress', lambda encoding, data: pytest.fail('volvió a comprimir'))
+    assert client.get('/_etag', headers=GZIP).data == first
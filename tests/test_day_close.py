@@ -0,0 +1,148 @@
+# tests/test_day_close.py
+"""Tests del cierre del día: turnos pagos a cobrado, comisiones y arqueo"""
+from datetime import date, datetime, timedelta
+
+from day_close import close_day
+from models import Appointment, DayClose, Dog, DogStats, Owner, Payment, Professional, db
+
+
+DAY = date(2025, 3, 10)
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def turno(dog, professional, hour, final_price, paid, day=DAY, deleted=False, status='Pendiente'):
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+    appointment = Appointment(dog_id=dog.id, professional_id=professional.id, start_time=start,
+                              end_time=start + timedelta(hours=1), final_price=final_price,
+                              total_amount=final_price, amount_paid=sum(p[0] for p in paid),
+                              status=status, is_deleted=deleted)
+    db.session.add(appointment)
+    db.session.flush()
+    for amount, method, kind in paid:
+        db.session.add(Payment(appointment_id=appointment.id, amount=amount, payment_method=method,
+                               payment_type=kind, date=start + timedelta(minutes=30)))
+    return appointment
+
+
+def crear_dia():
+    owner = Owner(name="Ana")
+    rita = Professional(name="Rita", commission_percentage=40)
+    db.session.add_all([owner, rita])
+    db.session.flush()
+    dog = Dog(name="Luna", owner_id=owner.id)
+    db.session.add(dog)
+    db.session.flush()
+
+    pago = turno(dog, rita, 10, 10000, [(10000, 'Efectivo', 'Pago')])
+    senado = turno(dog, rita, 12, 20000, [(5000, 'Transferencia', 'Seña')], status='Señado')
+    turno(dog, rita, 14, 8000, [(8000, 'Efectivo', 'Pago')], deleted=True)
+    turno(dog, rita, 10, 9000, [(9000, 'Efectivo', 'Pago')], day=DAY + timedelta(days=1))
+    db.session.commit()
+    return dog, pago.id, senado.id
+
+
+def test_cierra_turnos_pagos_y_arma_arqueo(app):
+    dog, pago_id, senado_id = crear_dia()
+
+    record = close_day(DAY, 'admin')
+
+    pago, senado = db.session.get(Appointment, pago_id), db.session.get(Appointment, senado_id)
+    assert (pago.status, pago.commission_amount) == ('Cobrado', 4000)
+    assert (senado.status, senado.commission_amount) == ('Señado', 0)
+    assert db.session.get(DogStats, dog.id).visit_count == 1
+
+    assert record.appointments_closed == 1
+    # El pago del turno borrado sigue en la caja, igual que en /sales
+    assert record.drawer == [
+        {'method': 'Efectivo', 'type': 'Pago', 'count': 2, 'total': 18000},
+        {'method': 'Transferencia', 'type': 'Seña', 'count': 1, 'total': 5000},
+    ]
+    assert (record.total_payments, record.total_deposits, record.total_cash) == (18000, 5000, 23000)
+    assert record.commissions == [{'professional': 'Rita', 'appointments': 1, 'commission': 4000}]
+    assert record.total_commissions == 4000
+
+
+def test_cerrar_de_nuevo_reemplaza_el_cierre(app):
+    _, _, senado_id = crear_dia()
+    close_day(DAY)
+
+    # Pago tardío del saldo
+    senado = db.session.get(Appointment, senado_id)
+    db.session.add(Payment(appointment_id=senado_id, amount=15000, payment_method='MercadoPago',
+                           payment_type='Pago', date=senado.start_time + timedelta(hours=2)))
+    senado.amount_paid = 20000
+    db.session.commit()
+
+    record = close_day(DAY)
+    assert DayClose.query.count() == 1
+    assert record.appointments_closed == 1  # sólo el que cambió
+    assert record.total_cash == 38000
+    assert record.total_commissions == 4000 + 8000
+
+
+def test_no_toca_turnos_ya_cobrados(app):
+    dog, pago_id, _ = crear_dia()
+    pago = db.session.get(Appointment, pago_id)
+    pago.status, pago.commission_amount = 'Cobrado', 3000  # comisión con el porcentaje de ese momento
+    db.session.commit()
+    version = pago.version_id
+
+    record = close_day(DAY)
+
+    pago = db.session.get(Appointment, pago_id)
+    assert (pago.commission_amount, pago.version_id) == (3000, version)
+    assert record.appointments_closed == 0
+
+
+def test_turno_que_cruza_la_medianoche_es_del_dia_en_que_termina(app):
+    dog, _, _ = crear_dia()
+    rita = Professional.query.filter_by(name="Rita").one()
+    tarde = turno(dog, rita, 23.5, 6000, [(6000, 'Efectivo', 'Pago')])
+    db.session.commit()
+
+    close_day(DAY)
+    assert db.session.get(Appointment, tarde.id).status == 'Pendiente'
+
+    close_day(DAY + timedelta(days=1))
+    assert db.session.get(Appointment, tarde.id).status == 'Cobrado'
+
+
+def test_cierre_simultaneo_no_da_error(app, client, monkeypatch):
+    crear_dia()
+    close_day(DAY, 'otra caja')
+    login(client)
+
+    def cierre_en_carrera(day, closed_by=None):
+        # No vio la fila de la otra caja al buscar: el INSERT choca con date único
+        db.session.add(DayClose(date=day, closed_by=closed_by))
+        db.session.commit()
+    monkeypatch.setattr('routes.close_day', cierre_en_carrera)
+
+    response = client.post('/sales/close', data={'date': DAY.isoformat(), 'confirm_past': 'y'},
+                           follow_redirects=True)
+    assert response.status_code == 200
+    assert 'Día ya cerrado' in response.get_data(as_text=True)
+    assert DayClose.query.one().closed_by == 'otra caja'
+
+
+def test_rutas_de_cierre(app, client):
+    crear_dia()
+    login(client)
+
+    # Un día anterior sólo con confirmación; uno futuro nunca
+    client.post('/sales/close', data={'date': DAY.isoformat()})
+    assert DayClose.query.count() == 0
+    client.post('/sales/close', data={'date': (date.today() + timedelta(days=1)).isoformat(), 'confirm_past': 'y'})
+    assert DayClose.query.count() == 0
+
+    response = client.post('/sales/close', data={'date': DAY.isoformat(), 'confirm_past': 'y'})
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/sales/close/{DAY.isoformat()}')
+
+    page = client.get(f'/sales/close/{DAY.isoformat()}').get_data(as_text=True)
+    assert 'Transferencia' in page and 'Rita' in page
+    assert client.get('/sales/close/2025-01-01').status_code == 404
+    assert 'Cerrar Día' in client.get('/sales').get_data(as_text=True)
@@ -0,0 +1,92 @@
+# tests/test_dog_stats.py
+"""Tests del resumen precalculado y el historial paginado de la ficha del perro"""
+from datetime import datetime, timedelta
+
+import routes
+from models import Appointment, Dog, DogStats, MedicalNote, Owner, Service, ServiceCategory, ServiceSize, db
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def crear_perro_con_turnos(cantidad, final_price=10000):
+    category = ServiceCategory(name="Baño", display_order=1)
+    size = ServiceSize(name="Chico", display_order=1)
+    owner = Owner(name="Ana")
+    db.session.add_all([category, size, owner])
+    db.session.flush()
+    service = Service(category_id=category.id, size_id=size.id, base_price=final_price)
+    dog = Dog(name="Luna", owner_id=owner.id)
+    db.session.add_all([service, dog])
+    db.session.flush()
+    start = datetime(2025, 1, 1, 10)
+    appointments = [
+        Appointment(dog_id=dog.id, service_id=service.id, start_time=start + timedelta(days=i),
+                    end_time=start + timedelta(days=i, hours=1), description=f"Visita {i}",
+                    final_price=final_price, total_amount=final_price)
+        for i in range(cantidad)
+    ]
+    db.session.add_all(appointments)
+    db.session.commit()
+    return dog.id, service.id, [a.id for a in appointments]
+
+
+def cobrar(client, appointment_id, service_id, amount, payment_type='Pago'):
+    return client.post(f'/appointments/{appointment_id}/checkout', data={
+        'service_id': service_id, 'final_price': 10000, 'amount': amount,
+        'payment_method': 'Efectivo', 'payment_type': payment_type,
+    })
+
+
+def test_pagos_mantienen_el_resumen(client, app):
+    login(client)
+    dog_id, service_id, ids = crear_perro_con_turnos(3)
+
+    cobrar(client, ids[0], service_id, 10000)
+    cobrar(client, ids[1], service_id, 10000)
+    cobrar(client, ids[2], service_id, 4000, 'Seña')
+
+    stats = db.session.get(DogStats, dog_id, populate_existing=True)
+    assert stats.visit_count == 2
+    assert stats.last_visit == datetime(2025, 1, 2, 10)
+    assert stats.lifetime_spend == 24000
+    assert stats.outstanding_balance == 6000
+    assert stats.usual_service_id == service_id
+
+    # La ficha usa el formato de miles del resto de la app
+    page = client.get(f'/dogs/{dog_id}').get_data(as_text=True)
+    assert '$24.000' in page and '$6.000' in page
+
+
+def test_borrar_turno_actualiza_resumen(client, app):
+    login(client)
+    dog_id, service_id, ids = crear_perro_con_turnos(2)
+    cobrar(client, ids[0], service_id, 10000)
+    cobrar(client, ids[1], service_id, 10000)
+
+    client.post(f'/appointments/delete/{ids[1]}')
+
+    stats = db.session.get(DogStats, dog_id, populate_existing=True)
+    assert (stats.visit_count, stats.lifetime_spend) == (1, 10000)
+
+
+def test_historial_paginado(client, app, monkeypatch):
+    monkeypatch.setattr(routes, 'TIMELINE_PAGE_SIZE', 2)
+    login(client)
+    dog_id, _, _ = crear_perro_con_turnos(5)
+    db.session.add_all([MedicalNote(dog_id=dog_id, note=f"Nota {i}") for i in range(3)])
+    db.session.commit()
+
+    html = client.get(f'/dogs/{dog_id}').get_data(as_text=True)
+    assert 'Visita 4' in html and 'Visita 3' in html and 'Visita 2' not in html
+    assert 'Ver notas anteriores' in html
+
+    pagina = client.get(f'/dogs/{dog_id}/timeline/appointments?before=2025-01-04T10:00:00_4').get_data(as_text=True)
+    assert 'Visita 2' in pagina and 'Visita 1' in pagina and 'Visita 3' not in pagina
+    assert 'Ver turnos anteriores' in pagina
+
+    ultima = client.get(f'/dogs/{dog_id}/timeline/appointments?before=2025-01-02T10:00:00_2').get_data(as_text=True)
+    assert 'Visita 0' in ultima and 'Ver turnos anteriores' not in ultima
+
+    assert client.get(f'/dogs/{dog_id}/timeline/otra').status_code == 404
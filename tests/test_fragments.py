@@ -0,0 +1,88 @@
+# tests/test_fragments.py
+"""Tests de la caché de fragmentos del catálogo"""
+from datetime import datetime
+
+from fragments import bump_catalog_version, current_catalog_version, render_selectable
+from models import Appointment, CatalogVersion, Dog, Item, Owner, Service, ServiceCategory, ServiceSize, db
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def crear_catalogo(app):
+    with app.app_context():
+        category = ServiceCategory(name="Baño Especial", display_order=1)
+        size = ServiceSize(name="Mini", display_order=1)
+        db.session.add_all([category, size])
+        db.session.flush()
+        service = Service(category_id=category.id, size_id=size.id, base_price=12000)
+        item = Item(name="Perfume", price=700)
+        db.session.add_all([service, item])
+        db.session.commit()
+        return service.id, item.id
+
+
+def test_render_selectable_marca_solo_el_valor_pedido(app):
+    with app.test_request_context():
+        html = render_selectable('partials/checkout_service_options.html', [1],
+                                 service_choices=[(1, 'A'), (10, 'B')])
+
+    assert '<option value="1" selected>A</option>' in html
+    assert '<option value="10">B</option>' in html
+
+
+def test_bump_catalog_version_usa_una_sola_fila(app):
+    with app.test_request_context():
+        bump_catalog_version()
+        bump_catalog_version()
+        db.session.commit()
+
+        assert CatalogVersion.query.count() == 1
+        assert current_catalog_version() == 2
+
+
+def test_editar_servicio_invalida_fragmentos(client, app):
+    login(client)
+    service_id, _ = crear_catalogo(app)
+
+    assert '12.000' in client.get('/turnos').get_data(as_text=True)
+
+    with app.app_context():
+        service = db.session.get(Service, service_id)
+        client.post(f'/services/edit/{service_id}', data={
+            'category_id': service.category_id, 'size_id': service.size_id,
+            'base_price': 15000, 'duration_minutes': 60, 'is_active': 1,
+        })
+
+    html = client.get('/turnos').get_data(as_text=True)
+    assert '15.000' in html
+    assert '12.000' not in html
+
+
+def test_checkout_y_edicion_marcan_la_seleccion(client, app):
+    login(client)
+    service_id, item_id = crear_catalogo(app)
+    with app.app_context():
+        owner = Owner(name="Ana")
+        db.session.add(owner)
+        db.session.flush()
+        dog = Dog(name="Toby", owner_id=owner.id)
+        db.session.add(dog)
+        db.session.flush()
+        appointment = Appointment(dog_id=dog.id, service_id=service_id, start_time=datetime(2025, 1, 1, 10),
+                                  end_time=datetime(2025, 1, 1, 11), final_price=12700, total_amount=12700)
+        appointment.items = [db.session.get(Item, item_id)]
+        db.session.add(appointment)
+        db.session.commit()
+        appointment_id = appointment.id
+
+    html = client.get(f'/appointments/{appointment_id}/checkout').get_data(as_text=True)
+
+    assert f'<option value="{service_id}" selected>' in html
+    assert f'name="item_ids" value="{item_id}" checked' in html
+
+    html = client.get(f'/appointments/edit/{appointment_id}').get_data(as_text=True)
+
+    assert f'<option value="{service_id}" data-duration="60" selected>' in html
+    assert f'name="item_ids" value="{item_id}" checked' in html
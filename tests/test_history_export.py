@@ -0,0 +1,74 @@
+# tests/test_history_export.py
+"""Tests de la exportación columnar del historial de ventas"""
+import csv
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from history_export import export_history
+from models import Appointment, Dog, Item, Owner, Payment, db
+
+
+def crear_historial(cantidad):
+    owner = Owner(name="Ana")
+    db.session.add(owner)
+    db.session.flush()
+    dog = Dog(name="Luna", owner_id=owner.id)
+    perfume = Item(name="Perfume", price=1000)
+    db.session.add_all([dog, perfume])
+    db.session.flush()
+    start = datetime(2025, 3, 1, 10)
+    for i in range(cantidad):
+        day = start + timedelta(days=i)
+        appointment = Appointment(dog_id=dog.id, start_time=day, end_time=day + timedelta(hours=1),
+                                  status='Cobrado', final_price=11000, total_amount=11000,
+                                  amount_paid=11000, items=[perfume])
+        db.session.add(appointment)
+        db.session.flush()
+        db.session.add(Payment(appointment_id=appointment.id, amount=11000, date=day,
+                               payment_method='Efectivo', payment_type='Pago'))
+    db.session.commit()
+
+
+def leer_csv(out_dir, files):
+    rows = []
+    for name in files:
+        with gzip.open(out_dir / name, 'rt', newline='', encoding='utf-8') as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_csv_comprimido_en_partes_con_manifiesto(app, tmp_path):
+    crear_historial(5)
+
+    manifest = export_history(tmp_path, fmt='csv', batch_size=2, rows_per_file=2)
+
+    assert manifest == json.loads((tmp_path / 'manifest.json').read_text(encoding='utf-8'))
+    appointments = manifest['tables']['appointments']
+    assert appointments['rows'] == 5
+    assert appointments['files'] == ['appointments-00000.csv.gz', 'appointments-00001.csv.gz',
+                                     'appointments-00002.csv.gz']
+    assert {'name': 'start_time', 'type': 'timestamp'} in appointments['columns']
+
+    rows = leer_csv(tmp_path, appointments['files'])
+    assert [r['start_time'] for r in rows][:2] == ['2025-03-01 10:00:00', '2025-03-02 10:00:00']
+    assert rows[0]['is_deleted'] == '0'
+    assert rows[0]['service_id'] == ''
+
+    payments = leer_csv(tmp_path, manifest['tables']['payments']['files'])
+    assert len(payments) == 5 and float(payments[0]['amount']) == 11000
+    items = leer_csv(tmp_path, manifest['tables']['appointment_items']['files'])
+    assert {r['item_name'] for r in items} == {'Perfume'}
+
+
+def test_parquet_con_tipos(app, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    crear_historial(3)
+
+    manifest = export_history(tmp_path, fmt='parquet', batch_size=2)
+
+    table = pq.read_table(tmp_path / 'appointments.parquet', columns=['id', 'final_price', 'start_time'])
+    assert manifest['tables']['appointments']['rows'] == table.num_rows == 3
+    assert str(table.schema.field('start_time').type) == 'timestamp[us]'
@@ -0,0 +1,114 @@
+# tests/test_importer.py
+"""Tests de la importación masiva desde CSV"""
+import pytest
+
+from app import create_app
+from branches import use_branch
+from importer import import_csv
+from models import Appointment, Dog, Owner, Payment, db
+
+
+def escribir_csv(tmp_path, contenido):
+    path = tmp_path / 'datos.csv'
+    path.write_text(contenido, encoding='utf-8')
+    return str(path)
+
+
+def test_importa_y_deduplica_por_telefono(app, tmp_path):
+    path = escribir_csv(tmp_path, (
+        'owner_name,owner_phone,dog_name,start,end,description,price\n'
+        'Carla,1155,Luna,2024-05-01 10:00,2024-05-01 11:00,Baño,9000\n'
+        'Carla G.,11-55,Luna,2024-06-01 10:00,,Corte,12000\n'
+        'Carla,1155,Toby,,,,\n'
+        'Pedro,2266,Rocco,01/07/2024 09:30,,,\n'
+        'Pedro,2266,Rocco,fecha mala,,,\n'
+    ))
+
+    stats = import_csv(path, chunk_size=2)
+
+    assert (stats['rows'], stats['owners'], stats['dogs'], stats['appointments'], stats['skipped']) == (5, 2, 3, 3, 1)
+    assert 'Línea 6' in stats['errors'][0]
+    assert Owner.query.count() == 2
+    assert Dog.query.filter_by(name='Luna').count() == 1
+    corte = Appointment.query.filter_by(description='Corte').one()
+    assert corte.end_time.hour == 11 and corte.final_price == 12000
+
+
+def test_reimportar_reusa_existentes(app, tmp_path):
+    path = escribir_csv(tmp_path, 'owner_name,owner_phone,dog_name\nCarla,1155,Luna\n')
+
+    import_csv(path)
+    stats = import_csv(path)
+
+    assert (stats['owners'], stats['dogs']) == (0, 0)
+    assert Dog.query.count() == 1
+
+
+def test_reimportar_no_duplica_turnos(app, tmp_path):
+    path = escribir_csv(tmp_path, (
+        'owner_name,owner_phone,dog_name,start,price\n'
+        'Carla,1155,Luna,2024-05-01 10:00,9000\n'
+        'Carla,1155,Luna,2024-05-01 10:00,9000\n'
+    ))
+
+    first = import_csv(path)
+    second = import_csv(path)
+
+    assert (first['appointments'], first['duplicates']) == (1, 1)
+    assert (second['appointments'], second['duplicates']) == (0, 2)
+    assert Appointment.query.count() == 1
+
+
+def test_cobrados_se_importan_con_su_pago(app, tmp_path):
+    path = escribir_csv(tmp_path, (
+        'owner_name,owner_phone,dog_name,start,status,price\n'
+        'Carla,1155,Luna,2024-05-01 10:00,Cobrado,9000\n'
+        'Carla,1155,Luna,2024-06-01 10:00,Señado,9000\n'
+    ))
+
+    stats = import_csv(path)
+
+    assert stats['payments'] == 1
+    cobrado, senado = Appointment.query.order_by(Appointment.start_time).all()
+    assert (cobrado.status, cobrado.amount_paid, cobrado.saldo_pendiente) == ('Cobrado', 9000, 0)
+    payment = Payment.query.one()
+    assert (payment.appointment_id, payment.amount, payment.date) == (cobrado.id, 9000, cobrado.start_time)
+    # Sin montos en el archivo, la seña no se puede reconstruir
+    assert (senado.status, senado.amount_paid) == ('Pendiente', 0)
+
+
+def test_importa_backup_de_turnos(app, tmp_path):
+    path = escribir_csv(tmp_path, (
+        'ID,Perro,Inicio,Fin,Descripcion\n'
+        '1,Luna,2024-05-01T10:00,2024-05-01T11:00,Baño\n'
+        '2,Toby,2024-05-02T10:00,2024-05-02T11:00,\n'
+    ))
+
+    stats = import_csv(path)
+
+    assert stats['appointments'] == 2
+    owner = Owner.query.one()
+    assert owner.name == 'Sin datos (importado)'
+    assert {d.name for d in owner.dogs} == {'Luna', 'Toby'}
+
+
+def test_con_sucursales_importa_en_la_indicada(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'BRANCHES': {'centro': f'sqlite:///{tmp_path / "centro.db"}'},
+    })
+    path = escribir_csv(tmp_path, 'owner_name,owner_phone,dog_name\nCarla,1155,Luna\n')
+    with app.app_context():
+        with pytest.raises(ValueError):
+            import_csv(path)
+        output = app.test_cli_runner().invoke(args=['import-csv', path])
+        assert output.exit_code != 0 and 'sucursal' in output.output
+
+        import_csv(path, branch='centro')
+        assert Dog.query.count() == 0
+        with use_branch('centro'):
+            assert Dog.query.count() == 1
+        db.session.remove()
+    for engine in app.extensions['branch_engines'].values():
+        engine.dispose()
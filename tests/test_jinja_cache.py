@@ -0,0 +1,43 @@
+# tests/test_jinja_cache.py
+"""Tests del caché de bytecode de templates y la precompilación al arrancar"""
+from app import create_app
+from jinja_cache import warm_templates
+
+
+def nueva_app(tmp_path, **config):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'JINJA_BYTECODE_CACHE': str(tmp_path / 'jinja_cache'),
+        **config,
+    })
+
+
+def test_precompila_todos_los_templates(tmp_path):
+    app = nueva_app(tmp_path)
+    names = app.jinja_env.list_templates(extensions=['html'])
+    assert 'turnos.html' in names and 'partials/service_grid.html' in names
+    assert len(list((tmp_path / 'jinja_cache').iterdir())) == len(names)
+
+
+def test_otro_worker_no_recompila(tmp_path, monkeypatch):
+    nueva_app(tmp_path)
+    app = nueva_app(tmp_path, TEMPLATE_WARMUP=False)
+
+    def compile(*args, **kwargs):
+        raise AssertionError('recompiló un template que estaba en el caché')
+
+    monkeypatch.setattr(app.jinja_env, 'compile', compile)
+    assert warm_templates(app) > 0
+    assert app.test_client().get('/login').status_code == 200
+
+
+def test_cli_compile(tmp_path):
+    app = nueva_app(tmp_path, TEMPLATE_WARMUP=False)
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert 'templates compilados' in result.output
+
+    app = nueva_app(tmp_path, TEMPLATE_WARMUP=False, JINJA_BYTECODE_CACHE=None)
+    assert app.jinja_env.bytecode_cache is None
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert result.exit_code != 0
@@ -0,0 +1,68 @@
+# tests/test_json_api.py
+"""Tests de las APIs JSON proyectadas por columnas"""
+from datetime import datetime
+
+from models import Appointment, Dog, Owner, db
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def crear_turno(app):
+    with app.app_context():
+        owner = Owner(name="Carla", phone="1155", address="Calle 1")
+        db.session.add(owner)
+        db.session.flush()
+        dog = Dog(name="Luna", owner_id=owner.id)
+        db.session.add(dog)
+        db.session.flush()
+        db.session.add(Appointment(
+            dog_id=dog.id,
+            start_time=datetime(2025, 3, 1, 10, 0),
+            end_time=datetime(2025, 3, 1, 11, 0),
+            description="Baño",
+        ))
+        db.session.commit()
+
+
+def test_appointments_devuelve_eventos(client, app):
+    login(client)
+    crear_turno(app)
+
+    events = client.get('/appointments').get_json()
+
+    assert events == [{
+        'id': events[0]['id'],
+        'title': 'Luna - Baño',
+        'start': '2025-03-01T10:00:00',
+        'end': '2025-03-01T11:00:00',
+        'color': '#3788d8',
+    }]
+
+
+def test_sparse_fieldset(client, app):
+    login(client)
+    crear_turno(app)
+
+    assert list(client.get('/appointments?fields=id,start').get_json()[0]) == ['id', 'start']
+    assert client.get('/api/dogs?fields=name').get_json() == [{'name': 'Luna'}]
+    assert client.get('/api/owners/search?q=Car&fields=phone').get_json() == [{'phone': '1155'}]
+
+
+def test_campo_desconocido_devuelve_400(client, app):
+    login(client)
+
+    response = client.get('/api/dogs/search?q=a&fields=id,password')
+
+    assert response.status_code == 400
+    assert 'password' in response.get_json()['error']
+
+
+def test_fields_vacio_devuelve_400(client, app):
+    login(client)
+
+    for url in ('/api/dogs?fields=,', '/appointments?fields=%20', '/api/owners/search?q=a&fields=,'):
+        response = client.get(url)
+        assert response.status_code == 400, url
+        assert 'ningún campo' in response.get_json()['error']
@@ -0,0 +1,21 @@
+# tests/test_loadtest.py
+"""Smoke test del arnés de prueba de carga"""
+from loadtest import build_app, find_appointment, format_report, run_load
+
+
+def test_run_load_wal_completa_flujos(tmp_path):
+    """Con WAL y pocos hilos, todos los pasos deben completarse sin bloqueos"""
+    summary = run_load('wal_busy', workers=2, iterations=2, workdir=str(tmp_path))
+
+    assert summary['requests'] == 2 * 2 * 4  # buscar, reservar, cobrar, refrescar
+    assert summary['locked'] == 0
+    assert summary['errors'] == 0
+    assert summary['steps']['pay']['outcomes'] == {'ok': 4}
+    assert 'wal_busy' in format_report(summary)
+    # El backup CSV queda junto a la base temporal (sin cambiar el cwd del proceso)
+    assert (tmp_path / 'export' / 'turnosBackup.csv').exists()
+
+
+def test_find_appointment_sin_turno_devuelve_none(tmp_path):
+    app = build_app('default', str(tmp_path / 'vacia.db'))
+    assert find_appointment(app, 'no-existe') is None
@@ -0,0 +1,105 @@
+# tests/test_metrics.py
+"""Tests de /metrics: latencias por endpoint, SQL por request, trabajos y agregación entre procesos"""
+import json
+import os
+import re
+
+import pytest
+
+from app import create_app
+from metrics import registry, track_job
+
+
+@pytest.fixture
+def metrics_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'METRICS_DIR': str(tmp_path / 'metrics'),
+        'METRICS_ALLOW': ['127.0.0.1'],
+    })
+    yield app
+
+
+def valor(text, serie):
+    match = re.search(rf'^{re.escape(serie)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_latencia_y_sentencias_por_endpoint(metrics_app):
+    client = metrics_app.test_client()
+    before = client.get('/metrics').get_data(as_text=True)
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    client.get('/menu')
+
+    text = client.get('/metrics').get_data(as_text=True)
+    serie = 'http_request_duration_seconds_count{endpoint="main.menu_inicio",method="GET"}'
+    assert valor(text, serie) == valor(before, serie) + 1
+    assert 'http_requests_total{endpoint="main.login",method="POST",status="302"}' in text
+    assert 'db_statements_per_request_count{endpoint="main.login"}' in text
+    assert 'db_pool_checked_out{database="main"}' in text
+    assert valor(text, 'db_write_duration_seconds_count') >= 1
+    assert valor(text, 'http_requests_in_progress') == 1  # El propio scrape
+
+
+def test_trabajos_y_procesos_muertos(metrics_app, tmp_path):
+    with metrics_app.app_context():
+        with track_job('export_history'):
+            pass
+
+    # Snapshot de otro proceso que ya terminó: su contador suma, su gauge no
+    snapshot = registry.snapshot()
+    snapshot['pid'] = 2 ** 22 + 1
+    snapshot['histograms'] = []
+    snapshot['values'] = [
+        ['http_requests_total', [['endpoint', 'main.menu_inicio'], ['method', 'GET'], ['status', 200]], 5],
+        ['http_requests_in_progress', [], 3],
+    ]
+    (tmp_path / 'metrics' / f"{snapshot['pid']}.json").write_text(json.dumps(snapshot), encoding='utf-8')
+
+    text = metrics_app.test_client().get('/metrics').get_data(as_text=True)
+    assert valor(text, 'job_duration_seconds_count{job="export_history"}') >= 1
+    assert valor(text, 'http_requests_total{endpoint="main.menu_inicio",method="GET",status="200"}') >= 5
+    assert valor(text, 'http_requests_in_progress') == 1  # El propio scrape
+
+
+def test_archivos_de_procesos_muertos_se_borran(metrics_app, tmp_path):
+    directory = tmp_path / 'metrics'
+    directory.mkdir()
+    snapshot = {'pid': 2 ** 22 + 1, 'histograms': [], 'values': [
+        ['http_requests_total', [['endpoint', 'main.muerto'], ['method', 'GET'], ['status', 200]], 5],
+    ]}
+    path = directory / f"{snapshot['pid']}.json"
+    path.write_text(json.dumps(snapshot), encoding='utf-8')
+
+    client = metrics_app.test_client()
+    text = client.get('/metrics').get_data(as_text=True)
+    assert path.exists()  # Dentro de la retención todavía suma
+    assert valor(text, 'http_requests_total{endpoint="main.muerto",method="GET",status="200"}') == 5
+
+    metrics_app.config['METRICS_DEAD_RETENTION'] = 0
+    text = client.get('/metrics').get_data(as_text=True)
+    assert not path.exists()
+    assert 'endpoint="main.muerto"' not in text
+    assert (directory / f'{os.getpid()}.json').exists()  # El proceso propio no se toca
+
+
+def test_token_y_acceso_remoto(metrics_app):
+    client = metrics_app.test_client()
+    remoto = {'REMOTE_ADDR': '10.0.0.5'}
+    assert client.get('/metrics', environ_base=remoto).status_code == 403
+    assert client.get('/metrics').status_code == 200  # 127.0.0.1 está en METRICS_ALLOW
+
+    metrics_app.config['METRICS_TOKEN'] = 'secreto'
+    assert client.get('/metrics', environ_base=remoto).status_code == 401
+    assert client.get('/metrics', environ_base=remoto,
+                      headers={'Authorization': 'Bearer secreto'}).status_code == 200
+
+    metrics_app.config['METRICS_ALLOW'] = []
+    assert client.get('/metrics').status_code == 401
+
+
+def test_sin_token_ni_lista_el_endpoint_no_existe(metrics_app):
+    metrics_app.config['METRICS_ALLOW'] = []
+    assert metrics_app.test_client().get('/metrics').status_code == 404
@@ -0,0 +1,69 @@
+# tests/test_owner_phone.py
+"""Tests del teléfono normalizado de los dueños"""
+from models import Dog, Owner, db, normalize_phone
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def test_normalize_phone():
+    assert normalize_phone('11 4444-5555') == '1144445555'
+    assert normalize_phone('(011) 4444.5555') == '01144445555'
+    assert normalize_phone(' - ') is None
+    assert normalize_phone(None) is None
+
+
+def test_validates_mantiene_columna_normalizada(app):
+    owner = Owner(name="Ana", phone="11 4444-5555")
+    assert owner.phone_normalized == '1144445555'
+
+    owner.phone = None
+    assert owner.phone_normalized is None
+
+
+def test_add_dog_no_duplica_dueno_por_formato(client, app):
+    login(client)
+
+    client.post('/dogs', data={'name': 'Luna', 'owner_name': 'Ana', 'owner_phone': '11 4444-5555'})
+    client.post('/dogs', data={'name': 'Toby', 'owner_name': 'Ana', 'owner_phone': '1144445555'})
+
+    owner = Owner.query.one()
+    assert {d.name for d in owner.dogs} == {'Luna', 'Toby'}
+
+
+def test_edit_dog_con_telefono_de_otro_dueno_no_lo_reasigna(client, app):
+    login(client)
+    client.post('/dogs', data={'name': 'Luna', 'owner_name': 'Ana', 'owner_phone': '1144445555', 'address': 'Calle 1'})
+    client.post('/dogs', data={'name': 'Toby', 'owner_name': 'Beto', 'owner_phone': '1166667777', 'address': 'Calle 2'})
+    toby = Dog.query.filter_by(name='Toby').one()
+
+    # Teléfono de Ana tipeado por error en la ficha de Toby
+    response = client.post(f'/dogs/edit/{toby.id}', data={'name': 'Toby', 'owner_name': 'Beto',
+                                                          'owner_phone': '11-4444-5555', 'address': 'Calle 2'})
+
+    assert response.status_code == 200
+    assert 'Ese teléfono ya es de otro dueño (Ana)' in response.get_data(as_text=True)
+    db.session.expire_all()
+    ana = Owner.query.filter_by(phone_normalized='1144445555').one()
+    beto = Owner.query.filter_by(phone_normalized='1166667777').one()
+    assert toby.owner_id == beto.id
+    assert (ana.name, ana.address) == ('Ana', 'Calle 1')
+    assert {d.name for d in ana.dogs} == {'Luna'}
+
+
+def test_busqueda_por_prefijo_de_telefono(client, app):
+    login(client)
+    db.session.add_all([
+        Owner(name="Ana", phone="11 4444-5555"),
+        Owner(name="Beto", phone="11 4499-0000"),
+        Owner(name="Caro 11", phone="22 3333-0000"),
+    ])
+    db.session.commit()
+
+    def nombres(q):
+        return [o['name'] for o in client.get(f'/api/owners/search?q={q}').get_json()]
+
+    assert nombres('11 44') == ['Ana', 'Beto']
+    assert nombres('114444') == ['Ana']  # filtrado en memoria desde el prefijo
+    assert nombres('Caro') == ['Caro 11']
@@ -0,0 +1,136 @@
+# tests/test_query_plans.py
+"""
+Regresión de planes de consulta: se capturan las consultas que ejecutan las
+rutas más usadas y se corre EXPLAIN QUERY PLAN sobre cada una. Falla si
+alguna recorre entera (SCAN sin índice) una tabla que crece con el uso.
+"""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import Appointment, Dog, MedicalNote, Owner, Payment, db
+
+
+# Tablas que crecen con el uso; el catálogo y los usuarios son chicos
+GROWING_TABLES = {'appointment', 'payment', 'dog', 'owner', 'medical_note'}
+# Cualquier SCAN recorre la tabla o un índice entero: O(n) igual
+FULL_SCAN = re.compile(r'^SCAN (\w+)\b')
+
+# Recorridos aceptados a sabiendas. El autocompletado busca por "contiene"
+# (LIKE '%q%'), que ningún índice B-tree resuelve por rango: recorre el índice
+# del nombre en orden y corta en el LIMIT, y PrefixSearchCache evita repetirlo
+# por cada tecla. Si se vuelve lento, el paso siguiente es FTS5 con trigramas.
+ALLOWED_SCANS = {
+    'SCAN owner USING INDEX ix_owner_name',     # /api/owners/search?q=<nombre>
+    'SCAN dog USING INDEX ix_dog_active_name',  # /api/dogs/search
+}
+
+
+def test_detecta_recorridos_de_indice_entero():
+    assert FULL_SCAN.match('SCAN owner USING INDEX ix_owner_name').group(1) == 'owner'
+    assert FULL_SCAN.match('SCAN appointment').group(1) == 'appointment'
+    assert FULL_SCAN.match('SEARCH owner USING INDEX ix_owner_phone_normalized (phone_normalized>?)') is None
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+@pytest.fixture
+def datos(app):
+    now = datetime.now().replace(microsecond=0)
+    owner = Owner(name="Ana", phone="11 4444-5555")
+    db.session.add(owner)
+    db.session.flush()
+    dog = Dog(name="Luna", owner_id=owner.id)
+    db.session.add(dog)
+    db.session.flush()
+    appointment = Appointment(dog_id=dog.id, start_time=now, end_time=now + timedelta(hours=1),
+                              description="Baño", final_price=1000, total_amount=1000)
+    db.session.add(appointment)
+    db.session.flush()
+    db.session.add_all([
+        MedicalNote(dog_id=dog.id, note="Piel sensible"),
+        Payment(appointment_id=appointment.id, amount=500, payment_method='Efectivo', payment_type='Seña'),
+    ])
+    db.session.commit()
+    return {'dog_id': dog.id, 'appointment_id': appointment.id}
+
+
+def capturar_consultas(client, urls):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE')):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for url in urls:
+            # buffered: las rutas con stream_template consultan mientras se lee la respuesta
+            assert client.get(url, buffered=True).status_code == 200, url
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def full_scans(statements):
+    scans = []
+    connection = db.session.connection()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        for row in plan:
+            match = FULL_SCAN.match(row[-1])
+            if match and match.group(1) in GROWING_TABLES and row[-1] not in ALLOWED_SCANS:
+                scans.append(f'{row[-1]} <- {statement}')
+    return scans
+
+
+def test_rutas_calientes_usan_indices(client, app, datos):
+    login(client)
+    today = datetime.now().date()
+    urls = [
+        f'/appointments?start={today}T00:00:00-03:00&end={today + timedelta(days=7)}T00:00:00-03:00',
+        f"/dogs/{datos['dog_id']}",
+        f"/dogs/{datos['dog_id']}/timeline/appointments?before={today}T23:00:00_999",
+        '/appointments/deleted',
+        '/sales',
+        f"/appointments/{datos['appointment_id']}/checkout",
+        '/api/owners/search?q=11 44',
+        '/api/owners/search?q=An',
+        '/api/dogs/search?q=Lu',
+        '/reports/recall',
+        '/reports/analytics?from=2000-01-01',
+        f'/reports/utilization?from={today - timedelta(days=364)}&to={today}',
+    ]
+
+    statements = capturar_consultas(client, urls)
+
+    assert statements
+    assert full_scans(statements) == []
+
+
+def test_recalculo_de_pago_usa_indice(client, app, datos):
+    from utils import recalcular_estado_pago
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        recalcular_estado_pago(datos['appointment_id'])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    db.session.rollback()
+
+    assert full_scans(statements) == []
+
+
+def test_rango_del_calendario_filtra_turnos(client, app, datos):
+    login(client)
+
+    assert len(client.get('/appointments?start=2000-01-01&end=2000-01-08').get_json()) == 0
+    assert len(client.get('/appointments').get_json()) == 1
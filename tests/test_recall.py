@@ -0,0 +1,55 @@
+# tests/test_recall.py
+"""Tests del reporte de perros para recordar"""
+from datetime import datetime, timedelta
+
+from models import Appointment, Dog, Owner, db
+from utils import perros_para_recordar
+
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def perro(nombre, dias_atras, borrado=False):
+    """Crea un perro con turnos hace `dias_atras` días (negativo = futuro)"""
+    owner = Owner(name=f"Dueño de {nombre}", phone="1144445555" if nombre == "Luna" else None)
+    db.session.add(owner)
+    db.session.flush()
+    dog = Dog(name=nombre, owner_id=owner.id)
+    db.session.add(dog)
+    db.session.flush()
+    for dias in dias_atras:
+        start = NOW - timedelta(days=dias)
+        db.session.add(Appointment(dog_id=dog.id, start_time=start, end_time=start + timedelta(hours=1),
+                                   is_deleted=borrado))
+    db.session.commit()
+    return dog.id
+
+
+def test_lista_atrasados_sin_turno_futuro(app):
+    perro("Luna", [100, 70, 40])            # cada 30 días, hace 40: atrasada 10
+    perro("Toby", [50, 30, 10])             # cada 20 días, hace 10: al día
+    perro("Rocco", [90, 60, -5])            # atrasado pero con turno futuro
+    perro("Max", [60])                      # una visita: intervalo por defecto 6 semanas
+    perro("Kira", [200, 150], borrado=True)  # turnos borrados no cuentan
+
+    rows = perros_para_recordar(NOW, default_weeks=6)
+
+    assert [(r.dog_name, r.visits) for r in rows] == [("Max", 1), ("Luna", 3)]
+    luna = rows[1]
+    assert round(luna.typical_days) == 30
+    assert round(luna.days_overdue) == 10
+    assert luna.phone == "1144445555"
+    assert luna.last_visit == NOW - timedelta(days=40)
+
+
+def test_reporte_recall(client, app):
+    login(client)
+    perro("Luna", [400, 300])
+
+    html = client.get('/reports/recall?weeks=4').get_data(as_text=True)
+
+    assert 'Luna' in html and 'tel:1144445555' in html
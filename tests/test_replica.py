@@ -0,0 +1,88 @@
+# tests/test_replica.py
+"""Tests de la réplica de lectura: SELECT a la copia, escrituras y datos frescos a la principal"""
+import os
+import time
+
+import pytest
+
+from app import create_app
+from extensions import db
+from models import Dog, Owner, User
+from replica import read_replica
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'READ_REPLICA_PATH': str(tmp_path / 'replica.db'),
+        'READ_REPLICA_REFRESH': 3600,  # Sin refrescos en segundo plano durante el test
+        'READ_REPLICA_MAX_STALENESS': 600,
+    })
+    with app.app_context():
+        agregar_perro('Luna')
+        app.extensions['read_replica'].refresh(db.engine)
+    yield app
+
+
+def agregar_perro(name):
+    owner = Owner(name='Carla')
+    db.session.add(owner)
+    db.session.flush()
+    db.session.add(Dog(name=name, owner_id=owner.id))
+    db.session.commit()
+
+
+def login(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    return client
+
+
+def nombres(client):
+    return sorted(d['name'] for d in client.get('/api/dogs?fields=name').get_json())
+
+
+def test_rutas_marcadas_leen_de_la_replica(replica_app):
+    with replica_app.app_context():
+        agregar_perro('Toby')  # Sólo en la principal: la copia es anterior
+
+    assert nombres(login(replica_app)) == ['Luna']
+
+
+def test_copia_vencida_vuelve_a_la_principal(replica_app):
+    with replica_app.app_context():
+        agregar_perro('Toby')
+    replica = replica_app.extensions['read_replica']
+    viejo = time.time() - 3600
+    os.utime(replica.path, (viejo, viejo))
+
+    assert nombres(login(replica_app)) == ['Luna', 'Toby']
+
+
+def test_quien_escribe_ve_sus_cambios(replica_app):
+    client = login(replica_app)
+    with replica_app.app_context():
+        dog_id = Dog.query.filter_by(name='Luna').one().id
+
+    client.post('/add_note', data={'dog_id': dog_id, 'note': 'Recién bañada'})
+    response = client.get(f'/dogs/{dog_id}')
+    assert 'Recién bañada' in response.get_data(as_text=True)
+
+
+def test_escrituras_dentro_del_contexto_van_a_la_principal(replica_app):
+    with replica_app.test_request_context():
+        with read_replica() as using_replica:
+            assert using_replica
+            assert [d.name for d in Dog.query.all()] == ['Luna']
+            agregar_perro('Toby')  # La copia es de sólo lectura: fallaría si fuera ahí
+        assert sorted(d.name for d in Dog.query.all()) == ['Luna', 'Toby']
+
+
+def test_sin_replica_configurada_todo_va_a_la_principal(app):
+    with app.test_request_context():
+        with read_replica() as using_replica:
+            assert not using_replica
+            assert User.query.filter_by(username='admin').first() is not None
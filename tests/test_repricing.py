@@ -0,0 +1,102 @@
+# tests/test_repricing.py
+"""Tests del aumento masivo de precios y el recálculo de turnos pendientes"""
+from datetime import datetime, timedelta
+
+import routes
+from models import Appointment, Dog, Item, Owner, Payment, Service, ServiceCategory, ServiceSize, db
+from repricing import Repricing
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def crear_catalogo():
+    bano = ServiceCategory(name="Baño", display_order=1)
+    corte = ServiceCategory(name="Corte", display_order=2)
+    chico = ServiceSize(name="Chico", display_order=1)
+    owner = Owner(name="Ana")
+    db.session.add_all([bano, corte, chico, owner])
+    db.session.flush()
+    servicio_bano = Service(category_id=bano.id, size_id=chico.id, base_price=10000)
+    servicio_corte = Service(category_id=corte.id, size_id=chico.id, base_price=20000)
+    perfume = Item(name="Perfume", price=1000)
+    dog = Dog(name="Luna", owner_id=owner.id)
+    db.session.add_all([servicio_bano, servicio_corte, perfume, dog])
+    db.session.flush()
+    return servicio_bano, servicio_corte, perfume, dog
+
+
+def crear_turno(dog, service, items=(), start=None, status='Pendiente'):
+    start = start or datetime.now() + timedelta(days=3)
+    total = service.base_price + sum(i.price for i in items)
+    appointment = Appointment(dog_id=dog.id, service_id=service.id, start_time=start,
+                              end_time=start + timedelta(hours=1), status=status,
+                              total_amount=total, final_price=total, items=list(items))
+    db.session.add(appointment)
+    db.session.flush()
+    return appointment
+
+
+def test_vista_previa_no_modifica_nada(app):
+    bano, corte, perfume, dog = crear_catalogo()
+    crear_turno(dog, bano, [perfume])
+    crear_turno(dog, bano).final_price = 8000  # Precio a mano: no se recalcula
+    db.session.commit()
+
+    preview = Repricing(12.5, round_to=100, category_ids=[bano.category_id], item_ids=[perfume.id]).preview()
+
+    assert [(s.id, price) for s, price in preview['services']] == [(bano.id, 11300)]
+    assert [(i.id, price) for i, price in preview['items']] == [(perfume.id, 1100)]
+    assert preview['appointments'] == 1
+    assert db.session.get(Service, bano.id, populate_existing=True).base_price == 10000
+
+
+def test_aplicar_recalcula_solo_turnos_futuros_pendientes(app):
+    bano, corte, perfume, dog = crear_catalogo()
+    futuro = crear_turno(dog, bano, [perfume])
+    pasado = crear_turno(dog, bano, start=datetime.now() - timedelta(days=3))
+    senado = crear_turno(dog, bano, status='Señado')
+    otro_servicio = crear_turno(dog, corte)
+    con_descuento = crear_turno(dog, bano, [perfume])
+    con_descuento.final_price = con_descuento.total_amount = 9500  # Precio a mano en la caja
+    db.session.add(Payment(appointment_id=senado.id, amount=5000, payment_type='Seña', payment_method='Efectivo'))
+    db.session.commit()
+    version = futuro.version_id
+
+    result = Repricing(10, round_to=100, category_ids=[bano.category_id], item_ids=[perfume.id]).apply()
+
+    assert result == {'services': 1, 'items': 1, 'appointments': 1}
+    db.session.expire_all()
+    assert db.session.get(Service, bano.id).base_price == 11000
+    assert db.session.get(Service, corte.id).base_price == 20000
+    assert db.session.get(Item, perfume.id).price == 1100
+    futuro = db.session.get(Appointment, futuro.id)
+    assert (futuro.total_amount, futuro.final_price) == (12100, 12100)
+    assert futuro.version_id == version + 1
+    assert db.session.get(Appointment, pasado.id).final_price == 10000
+    assert db.session.get(Appointment, senado.id).final_price == 10000
+    assert db.session.get(Appointment, otro_servicio.id).final_price == 20000
+    assert db.session.get(Appointment, con_descuento.id).final_price == 9500
+
+
+def test_ruta_vista_previa_y_aplicar(client, app, monkeypatch):
+    backups = []
+    monkeypatch.setattr(routes, 'guardarBackUpTurnos', lambda: backups.append(1))
+    login(client)
+    bano, corte, perfume, dog = crear_catalogo()
+    crear_turno(dog, corte)
+    db.session.commit()
+    data = {'percent': '5', 'round_to': '500', 'include_services': 'y'}
+
+    response = client.post('/services/repricing', data={**data, 'preview': 'Vista Previa'})
+    assert response.status_code == 200
+    assert '21.000' in response.get_data(as_text=True)
+    assert db.session.get(Service, corte.id, populate_existing=True).base_price == 20000
+
+    response = client.post('/services/repricing', data={**data, 'submit': 'Aplicar Precios'})
+    assert response.status_code == 302
+    assert backups == [1]  # Cambiaron turnos: se regenera el backup CSV
+    db.session.expire_all()
+    assert db.session.get(Service, corte.id).base_price == 21000
+    assert db.session.get(Item, perfume.id).price == 1000  # Adicionales sin tildar
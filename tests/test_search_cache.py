@@ -0,0 +1,86 @@
+# tests/test_search_cache.py
+"""Tests de la caché de búsquedas del autocompletado"""
+import cache as cache_module
+from cache import PrefixSearchCache
+from models import Dog, Owner, db
+
+
+def _matches(row, query):
+    return query in row['name'].lower()
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+class TestPrefixSearchCache:
+
+    def test_prefijo_completo_se_filtra_en_memoria(self):
+        cache = PrefixSearchCache()
+        cache.put('dogs', 'Ro', [{'name': 'Rocky'}, {'name': 'Roma'}], complete=True)
+
+        assert cache.get('dogs', 'Rock', _matches) == [{'name': 'Rocky'}]
+
+    def test_prefijo_truncado_no_se_reutiliza(self):
+        cache = PrefixSearchCache()
+        cache.put('dogs', 'Ro', [{'name': 'Rocky'}], complete=False)
+
+        assert cache.get('dogs', 'Rock', _matches) is None
+
+    def test_normaliza_y_respeta_tamano_maximo(self):
+        cache = PrefixSearchCache(max_entries=2)
+        cache.put('dogs', ' Luna ', [1], complete=True)
+        cache.put('dogs', 'toby', [2], complete=True)
+        cache.put('dogs', 'max', [3], complete=True)
+
+        assert cache.get('dogs', 'LUNA') is None  # desalojada por LRU
+        assert cache.get('dogs', 'Toby') == [2]
+
+    def test_invalidate_por_namespace(self):
+        cache = PrefixSearchCache()
+        cache.put('dogs', 'a', [1], complete=True)
+        cache.put('owners', 'a', [2], complete=True)
+        cache.invalidate('dogs')
+
+        assert cache.get('dogs', 'a') is None
+        assert cache.get('owners', 'a') == [2]
+
+    def test_vence_por_ttl_aunque_escriba_otro_worker(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+        cache = PrefixSearchCache(ttl=10)
+        cache.put('dogs', 'ro', [{'name': 'Rocky'}], complete=True)
+        assert cache.get('dogs', 'roc', _matches) == [{'name': 'Rocky'}]
+
+        now[0] += 10
+        # Ni la entrada ni lo derivado de su prefijo sobreviven al vencimiento
+        assert cache.get('dogs', 'ro') is None
+        assert cache.get('dogs', 'roc', _matches) is None
+
+    def test_ttl_cero_no_cachea(self):
+        cache = PrefixSearchCache(ttl=0)
+        cache.put('dogs', 'a', [1], complete=True)
+
+        assert cache.get('dogs', 'a') is None
+
+
+def test_busqueda_reutiliza_prefijo_e_invalida_al_escribir(client, app):
+    login(client)
+    with app.app_context():
+        owner = Owner(name="Ana", phone="1100")
+        db.session.add(owner)
+        db.session.flush()
+        db.session.add_all([Dog(name="Rocky", owner_id=owner.id), Dog(name="Roma", owner_id=owner.id)])
+        db.session.commit()
+
+        assert len(client.get('/api/dogs/search?q=Ro').get_json()) == 2
+
+        # Un perro nuevo insertado por fuera de las rutas no se ve: sale de la caché
+        db.session.add(Dog(name="Rocco", owner_id=owner.id))
+        db.session.commit()
+        assert [d['name'] for d in client.get('/api/dogs/search?q=Roc').get_json()] == ['Rocky']
+
+        # Escribir a través de las rutas invalida la caché
+        client.post('/dogs', data={'name': 'Rocket', 'owner_name': 'Ana', 'owner_phone': '1100'})
+        names = [d['name'] for d in client.get('/api/dogs/search?q=Roc').get_json()]
+        assert names == ['Rocco', 'Rocket', 'Rocky']
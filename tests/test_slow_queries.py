@@ -0,0 +1,69 @@
+# tests/test_slow_queries.py
+"""Tests del log de consultas lentas y su página de resumen"""
+import json
+import os
+
+import pytest
+
+from slow_queries import parameter_shape
+
+
+@pytest.fixture
+def slow_app(make_app, tmp_path):
+    return make_app(
+        SLOW_QUERY_MS=0,  # Todas cuentan como lentas
+        SLOW_QUERY_LOG=str(tmp_path / 'logs' / 'slow.jsonl'),
+    )
+
+
+def leer_log(tmp_path):
+    path = tmp_path / 'logs' / f'slow.{os.getpid()}.jsonl'
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_registra_ruta_parametros_y_plan(slow_app, tmp_path, login):
+    client = login(slow_app)
+    client.get('/api/owners/search?q=Carla')
+
+    entries = [e for e in leer_log(tmp_path)
+               if e['route'] == 'main.search_owners_api' and 'FROM owner' in e['statement']]
+    assert entries
+    entry = entries[0]
+    assert 'Carla' not in json.dumps(entry)  # Sólo la forma de los parámetros
+    assert 'str(7)' in entry['parameters']  # '%Carla%'
+    assert entry['plan'] and entry['duration_ms'] >= 0
+
+
+def test_junta_los_archivos_de_cada_proceso(slow_app, tmp_path, login):
+    otro = {'at': '2025-01-01T10:00:00', 'duration_ms': 900.0, 'statement': 'SELECT lenta',
+            'parameters': [], 'route': 'main.daily_sales'}
+    (tmp_path / 'logs' / 'slow.99999.jsonl').write_text(json.dumps(otro) + '\n', encoding='utf-8')
+    client = login(slow_app)
+    client.get('/sales')
+
+    log = slow_app.extensions['slow_query_log']
+    assert not (tmp_path / 'logs' / 'slow.jsonl').exists()
+    assert len(log.files()) == 2
+    assert 'SELECT lenta' in {e['statement'] for e in log.entries()}
+
+
+def test_forma_de_parametros():
+    assert parameter_shape(('Ana', 3, None), False) == ['str(3)', 'int', 'None']
+    assert parameter_shape({'name': 'Ana'}, False) == {'name': 'str(3)'}
+    assert parameter_shape([(1, 'a'), (2, 'b')], True) == {'rows': 2, 'first': ['int', 'str(1)']}
+
+
+def test_resumen_ordena_por_tiempo_total(slow_app, login):
+    client = login(slow_app)
+    for _ in range(3):
+        client.get('/sales')
+
+    page = client.get('/reports/slow-queries')
+    assert page.status_code == 200
+    assert 'FROM payment' in page.get_data(as_text=True)
+
+
+def test_desactivado_con_none(make_app, tmp_path):
+    app = make_app(SLOW_QUERY_MS=None, SLOW_QUERY_LOG=str(tmp_path / 'logs' / 'slow.jsonl'))
+    assert app.extensions['slow_query_log'] is None
+    assert not (tmp_path / 'logs').exists()
@@ -0,0 +1,71 @@
+# tests/test_static_assets.py
+"""Tests de los assets con hash: build, manifiesto y cabeceras al servirlos"""
+import gzip
+import json
+
+import pytest
+
+from app import create_app
+from static_assets import TAILWIND_CDN, fingerprint
+
+
+CSS = b'.bg-white{background-color:#fff}' * 50
+
+
+def nueva_app(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'ASSETS_DIST': str(tmp_path / 'dist'),
+        'JINJA_BYTECODE_CACHE': None,
+    })
+
+
+@pytest.fixture
+def built_app(tmp_path):
+    (tmp_path / 'app.css').write_bytes(CSS)
+    fingerprint({'app.css': str(tmp_path / 'app.css')}, str(tmp_path / 'dist'))
+    return nueva_app(tmp_path)
+
+
+def test_fingerprint_con_hash_y_gzip(tmp_path):
+    (tmp_path / 'app.css').write_bytes(CSS)
+    manifest = fingerprint({'app.css': str(tmp_path / 'app.css')}, str(tmp_path / 'dist'))
+
+    hashed = manifest['app.css']
+    assert hashed.startswith('app.') and hashed.endswith('.css') and hashed != 'app.css'
+    assert (tmp_path / 'dist' / hashed).read_bytes() == CSS
+    assert gzip.decompress((tmp_path / 'dist' / f'{hashed}.gz').read_bytes()) == CSS
+    assert json.loads((tmp_path / 'dist' / 'manifest.json').read_text()) == manifest
+
+    # Mismo contenido, mismo nombre
+    assert fingerprint({'app.css': str(tmp_path / 'app.css')}, str(tmp_path / 'dist')) == manifest
+
+
+def test_sirve_variante_comprimida_con_cache_largo(built_app):
+    client = built_app.test_client()
+    page = client.get('/login').get_data(as_text=True)
+    hashed = built_app.extensions['assets']['app.css']
+    assert f'/assets/{hashed}' in page and 'cdn.tailwindcss.com' not in page
+
+    response = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == CSS
+
+    plain = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers and plain.data == CSS
+
+
+def test_sin_build_usa_cdn_fijado(tmp_path):
+    app = nueva_app(tmp_path)
+    page = app.test_client().get('/login').get_data(as_text=True)
+    assert TAILWIND_CDN in page
+    with app.app_context():
+        assert app.jinja_env.globals['asset_url']('app.css') is None
+    assert '@6.1.17/' in app.jinja_env.globals['fullcalendar_cdn']
+    assert app.test_client().get('/assets/app.css').status_code == 404
@@ -0,0 +1,88 @@
+# tests/test_tracing.py
+"""Tests de las trazas: spans de request, SQL, templates y trabajos"""
+import json
+
+import pytest
+
+from app import create_app
+from metrics import track_job
+from tracing import memory_exporter, span
+
+
+@pytest.fixture
+def traced_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'TRACING': 'memory,file',
+        'TRACING_FILE': str(tmp_path / 'logs' / 'traces.jsonl'),
+    })
+    yield app
+
+
+def login(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    return client
+
+
+def ultima_traza(app, name):
+    with app.app_context():
+        return next(spans for spans in memory_exporter().traces() if spans[0]['name'] == name)
+
+
+def test_request_con_sql_y_template_como_hijos(traced_app):
+    client = login(traced_app)
+    client.get('/sales')
+
+    spans = ultima_traza(traced_app, 'GET main.daily_sales')
+    root = spans[0]
+    assert root['kind'] == 'server' and root['parentSpanId'] == ''
+    assert root['attributes']['http.status_code'] == 200
+    assert {s['traceId'] for s in spans} == {root['traceId']}
+
+    sql = [s for s in spans if s['kind'] == 'client']
+    assert any('FROM payment' in s['attributes']['db.statement'] for s in sql)
+    [template] = [s for s in spans if s['name'] == 'render sales/daily_report.html']
+    assert template['parentSpanId'] == root['spanId']
+    assert all(s['startTimeUnixNano'] <= s['endTimeUnixNano'] for s in spans)
+
+
+def test_trabajo_fuera_de_request_abre_su_traza(traced_app, tmp_path):
+    with traced_app.app_context():
+        with track_job('export_history'):
+            with span('paso interno'):
+                pass
+
+    spans = ultima_traza(traced_app, 'job export_history')
+    assert [s['name'] for s in spans] == ['job export_history', 'paso interno']
+    assert spans[1]['parentSpanId'] == spans[0]['spanId']
+
+    lines = (tmp_path / 'logs' / 'traces.jsonl').read_text(encoding='utf-8').splitlines()
+    assert spans[0]['traceId'] in {json.loads(line)['traceId'] for line in lines}
+
+
+def test_error_marca_el_span(traced_app):
+    with traced_app.app_context():
+        with pytest.raises(ValueError):
+            with span('falla'):
+                raise ValueError('sin stock')
+
+    [falla] = ultima_traza(traced_app, 'falla')
+    assert falla['status'] == {'code': 'ERROR', 'message': 'sin stock'}
+
+
+def test_pagina_de_cascada(traced_app):
+    client = login(traced_app)
+    client.get('/sales')
+    trace_id = ultima_traza(traced_app, 'GET main.daily_sales')[0]['traceId']
+
+    page = client.get(f'/reports/traces/{trace_id}').get_data(as_text=True)
+    assert 'render sales/daily_report.html' in page
+    assert client.get('/reports/traces/noexiste').status_code == 404
+
+
+def test_sin_tracing_no_hay_spans(app):
+    with span('nada') as current:
+        assert current is None
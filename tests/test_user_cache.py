@@ -0,0 +1,93 @@
+# tests/test_user_cache.py
+"""Tests de la caché del usuario logueado y del rehash de contraseñas al iniciar sesión"""
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models import User
+
+
+@pytest.fixture
+def user_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "main.db"}',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+    # Sin app context abierto: cada request tiene su propio `g`
+    yield app
+
+
+def login(app, password='admin'):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': password})
+    return client
+
+
+def user_selects(app, client, path):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM user' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        assert client.get(path).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def test_usuario_cacheado_no_consulta_la_base(user_app):
+    client = login(user_app)
+    user_selects(user_app, client, '/menu')  # Llena la caché
+
+    assert user_selects(user_app, client, '/menu') == []
+
+
+def test_cambios_del_usuario_invalidan_la_cache(user_app):
+    client = login(user_app)
+    user_selects(user_app, client, '/menu')
+
+    with user_app.app_context():
+        User.query.filter_by(username='admin').one().role = 'peluquera'
+        db.session.commit()
+
+    assert len(user_selects(user_app, client, '/menu')) == 1
+    assert client.get('/reports/branches').status_code == 403
+
+
+def test_ttl_cero_desactiva_la_cache(user_app):
+    user_app.extensions['user_cache'].ttl = 0
+    client = login(user_app)
+    user_selects(user_app, client, '/menu')
+
+    assert len(user_selects(user_app, client, '/menu')) == 1
+
+
+def test_login_regenera_hash_con_otro_metodo(user_app):
+    # El admin inicial se creó con el método configurado: cambiar el costo fuerza el rehash
+    user_app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    with user_app.app_context():
+        assert User.query.filter_by(username='admin').one().needs_rehash()
+
+    login(user_app)
+
+    with user_app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        assert admin.password_hash.startswith('pbkdf2:sha256:2000$')
+        assert not admin.needs_rehash()
+    assert login(user_app).get('/menu').status_code == 200
+
+
+def test_login_fallido_no_regenera_hash(user_app):
+    user_app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    login(user_app, password='otra')
+
+    with user_app.app_context():
+        assert User.query.filter_by(username='admin').one().password_hash.startswith('pbkdf2:sha256:1000$')
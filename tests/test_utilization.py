@@ -0,0 +1,115 @@
+# tests/test_utilization.py
+"""Tests de la ocupación de peluqueras (barrido por franjas de 10 minutos)"""
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import utilization
+from models import Appointment, Dog, Owner, Professional, db
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+
+def crear_turnos():
+    owner = Owner(name="Ana")
+    rita = Professional(name="Rita", commission_percentage=50)
+    db.session.add_all([owner, rita])
+    db.session.flush()
+    dog = Dog(name="Luna", owner_id=owner.id)
+    db.session.add(dog)
+    db.session.flush()
+
+    turnos = [
+        # (inicio, minutos, borrado)
+        (datetime(2025, 2, 3, 10), 60, False),      # Lunes
+        (datetime(2025, 2, 3, 10, 30), 60, False),  # Superpuesto: suma sólo 30 minutos
+        (datetime(2025, 2, 4, 20, 30), 60, False),  # Martes, la mitad después del cierre
+        (datetime(2025, 2, 9, 10), 20, False),      # Domingo: cerrado
+        (datetime(2025, 2, 5, 10), 60, True),       # Borrado
+        (datetime(2025, 1, 31, 10), 60, False),     # Fuera del período
+    ]
+    for start, minutes, deleted in turnos:
+        db.session.add(Appointment(dog_id=dog.id, professional_id=rita.id, start_time=start,
+                                   end_time=start + timedelta(minutes=minutes), is_deleted=deleted))
+    db.session.commit()
+
+
+def test_ocupacion_por_peluquera_y_mapa(app):
+    crear_turnos()
+    report = utilization.utilization(datetime(2025, 2, 3), datetime(2025, 2, 10))
+
+    rita = next(p for p in report['professionals'] if p['name'] == 'Rita')
+    assert rita['booked_hours'] == pytest.approx(1.5 + 1 + 20 / 60)
+    assert rita['capacity_hours'] == 6 * 13  # Lunes a sábado, 8 a 21
+    assert rita['idle_hours'] == pytest.approx(78 - 2)  # Fuera de horario no descuenta capacidad
+    assert rita['utilization'] == pytest.approx(2 / 78)
+
+    rows = {row['weekday']: {c['hour']: c for c in row['cells']} for row in report['heatmap']}
+    n_prof = len(report['professionals'])
+    assert rows['Lun'][10]['booked_hours'] == 1
+    assert rows['Lun'][10]['utilization'] == pytest.approx(1 / n_prof)
+    assert rows['Lun'][11]['booked_hours'] == pytest.approx(0.5)
+    assert rows['Mar'][21]['utilization'] is None and rows['Mar'][21]['booked_hours'] == pytest.approx(0.5)
+    assert rows['Dom'][10]['utilization'] is None
+
+
+def test_pagina(app, client):
+    crear_turnos()
+    login(client)
+    response = client.get('/reports/utilization?from=2025-02-03&to=2025-02-09')
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Rita' in page and 'Sáb' in page
+
+    # Un rango de años se corta a MAX_DAYS desde el inicio
+    page = client.get('/reports/utilization?from=2020-01-01&to=2030-01-01').get_data(as_text=True)
+    assert 'al 31/12/2020' in page
+
+
+def intervalos_al_azar(n_prof, days, count):
+    rng = random.Random(7)
+    n_slots = days * utilization.SLOTS_PER_DAY
+    prof, starts, ends = [], [], []
+    for _ in range(count):
+        start = rng.randrange(n_slots)
+        prof.append(rng.randrange(n_prof))
+        starts.append(start)
+        ends.append(min(start + rng.randint(1, 18), n_slots))
+    return prof, starts, ends
+
+
+def test_un_anio_de_turnos(app):
+    days = 365
+    prof, starts, ends = intervalos_al_azar(4, days, 15000)
+    is_open = utilization._open_mask(days * utilization.SLOTS_PER_DAY, 0)
+
+    booked, booked_open, grid = utilization.sweep(prof, starts, ends, 4, is_open, 0)
+    assert sum(map(sum, grid)) == sum(booked)
+    assert all(o <= b for o, b in zip(booked_open, booked))
+
+
+@pytest.mark.slow
+def test_un_anio_en_menos_de_un_segundo(app):
+    days = 365
+    prof, starts, ends = intervalos_al_azar(4, days, 15000)
+    is_open = utilization._open_mask(days * utilization.SLOTS_PER_DAY, 0)
+
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        utilization.sweep(prof, starts, ends, 4, is_open, 0)
+        timings.append(time.perf_counter() - started)
+    assert min(timings) < 1
+
+
+def test_numpy_y_listas_coinciden(app):
+    pytest.importorskip('numpy')
+    days = 30
+    prof, starts, ends = intervalos_al_azar(3, days, 500)
+    is_open = utilization._open_mask(days * utilization.SLOTS_PER_DAY, 2)
+    assert utilization._sweep_numpy(prof, starts, ends, 3, is_open, 2) == \
+        utilization._sweep_python(prof, starts, ends, 3, is_open, 2)
@@ -0,0 +1,253 @@
+# tracing.py
+"""
+Trazas livianas por request, con la estructura de spans de OpenTelemetry.
+
+Cada request abre un span raíz; adentro quedan como hijos las sentencias
+SQL, los render_template y los trabajos (guardarBackUpTurnos,
+exportaciones, snapshots, ver metrics.track_job). Un trabajo corrido desde
+la CLI abre su propia traza.
+
+    TRACING = 'memory'         últimas TRACING_MEMORY_SIZE trazas en memoria
+                               (se ven en /reports/traces como cascada)
+    TRACING = 'file'           una línea JSON por span en TRACING_FILE
+                               (instance/logs/traces.jsonl)
+    TRACING = 'memory,file'    ambos
+
+Sin TRACING (por defecto) no se registra nada. Los campos de cada span
+(traceId, spanId, parentSpanId, startTimeUnixNano, ...) siguen el JSON de
+OTLP, así el archivo se puede reenviar a un colector.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_current_span = ContextVar('current_span', default=None)
+
+MAX_STATEMENT_LENGTH = 500
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent', 'name', 'kind', 'start', 'end', 'attributes', 'error', 'spans')
+
+    def __init__(self, name, kind, parent, attributes):
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+        # Spans terminados de la traza: lo comparte toda la traza, lo exporta la raíz
+        self.spans = parent.spans if parent else []
+
+    def to_dict(self):
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent.span_id if self.parent else '',
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': self.start,
+            'endTimeUnixNano': self.end,
+            'attributes': self.attributes,
+            'status': {'code': 'ERROR', 'message': self.error} if self.error else {'code': 'OK'},
+        }
+
+
+#-------- Exportadores --------#
+
+class MemoryExporter:
+    """Últimas trazas completas, para la página de cascada."""
+
+    def __init__(self, size=200):
+        self.size = size
+        self._traces = OrderedDict()  # trace_id -> lista de spans (dicts)
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self._traces[spans[0]['traceId']] = spans
+            while len(self._traces) > self.size:
+                self._traces.popitem(last=False)
+
+    def traces(self):
+        with self._lock:
+            return list(reversed(self._traces.values()))
+
+    def get(self, trace_id):
+        with self._lock:
+            return self._traces.get(trace_id)
+
+
+class FileExporter:
+    """Una línea JSON por span."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span, ensure_ascii=False, default=str) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+def init_tracing(app):
+    """Configura los exportadores según TRACING y registra los hooks de requests."""
+    exporters = []
+    for name in filter(None, (app.config.get('TRACING') or '').split(',')):
+        name = name.strip()
+        if name == 'memory':
+            exporters.append(MemoryExporter(app.config.get('TRACING_MEMORY_SIZE', 200)))
+        elif name == 'file':
+            exporters.append(FileExporter(app.config.get('TRACING_FILE')
+                                          or os.path.join(app.instance_path, 'logs', 'traces.jsonl')))
+        else:
+            raise ValueError(f'Exportador de trazas desconocido: {name}')
+    app.extensions['tracing'] = exporters
+
+    if exporters:
+        app.before_request(_start_request_span)
+        app.after_request(_record_status)
+        app.teardown_request(_end_request_span)
+
+
+def memory_exporter():
+    return next((e for e in current_app.extensions.get('tracing', []) if isinstance(e, MemoryExporter)), None)
+
+
+#-------- Spans --------#
+
+def _enabled():
+    return has_app_context() and bool(current_app.extensions.get('tracing'))
+
+
+def start_span(name, kind='internal', root=True, **attributes):
+    """Abre un span hijo del actual (o una traza nueva si root). None si no corresponde."""
+    parent = _current_span.get()
+    if (parent is None and not root) or not _enabled():
+        return None
+    span = Span(name, kind, parent, attributes)
+    _current_span.set(span)
+    return span
+
+
+def end_span(span, error=None):
+    if span is None:
+        return
+    span.end = time.time_ns()
+    if error is not None:
+        span.error = str(error)
+    span.spans.append(span.to_dict())
+    # set (no reset): los hooks pueden cerrar en otro contexto que el que abrió
+    _current_span.set(span.parent)
+    if span.parent is None:
+        spans = sorted(span.spans, key=lambda s: s['startTimeUnixNano'])
+        for exporter in current_app.extensions.get('tracing', []):
+            exporter.export(spans)
+
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    """`with span('checkout: total pagado'):` alrededor de cualquier bloque."""
+    current = start_span(name, kind, **attributes)
+    try:
+        yield current
+    except Exception as e:
+        end_span(current, e)
+        raise
+    else:
+        end_span(current)
+
+
+#-------- Requests --------#
+
+def _start_request_span():
+    g.trace_span = start_span(f'{request.method} {request.endpoint or request.path}', kind='server',
+                              **{'http.method': request.method, 'http.target': request.path,
+                                 'http.route': request.endpoint})
+
+
+def _record_status(response):
+    current = g.get('trace_span')
+    if current is not None:
+        current.attributes['http.status_code'] = response.status_code
+    return response
+
+
+def _end_request_span(exc):
+    end_span(g.pop('trace_span', None), exc)
+
+
+#-------- SQL y templates --------#
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_sql_span(conn, cursor, statement, parameters, context, executemany):
+    current = start_span(statement.split(None, 1)[0].upper() if statement.strip() else 'SQL', kind='client',
+                         root=False, **{'db.system': conn.dialect.name,
+                                        'db.statement': statement[:MAX_STATEMENT_LENGTH]})
+    conn.info.setdefault('trace_spans', []).append(current)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_sql_span(conn, cursor, statement, parameters, context, executemany):
+    end_span(conn.info['trace_spans'].pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _fail_sql_span(context):
+    if context.connection is not None and context.statement is not None:
+        spans = context.connection.info.get('trace_spans')
+        if spans:
+            end_span(spans.pop(), context.original_exception)
+
+
+def _start_template_span(sender, template, context, **extra):
+    current = start_span(f'render {template.name}', root=False, template=template.name)
+    if current is not None:
+        g.setdefault('template_spans', []).append(current)
+
+
+def _end_template_span(sender, template, context, **extra):
+    spans = g.get('template_spans')
+    if spans:
+        end_span(spans.pop())
+
+
+before_render_template.connect(_start_template_span)
+template_rendered.connect(_end_template_span)
+
+
+#-------- Cascada --------#
+
+def waterfall(spans):
+    """Filas para dibujar la traza: profundidad y posición/ancho en % de la raíz."""
+    root = next(s for s in spans if not s['parentSpanId'])
+    total = max(root['endTimeUnixNano'] - root['startTimeUnixNano'], 1)
+    depths = {root['spanId']: 0}
+    rows = []
+    for s in spans:  # Ordenados por inicio: el padre siempre antes que sus hijos
+        depth = depths.get(s['parentSpanId'], -1) + 1 if s['parentSpanId'] else 0
+        depths[s['spanId']] = depth
+        duration = s['endTimeUnixNano'] - s['startTimeUnixNano']
+        rows.append({
+            **s,
+            'depth': depth,
+            'duration_ms': duration / 1e6,
+            'offset_pct': (s['startTimeUnixNano'] - root['startTimeUnixNano']) * 100 / total,
+            'width_pct': max(duration * 100 / total, 0.2),
+        })
+    return rows
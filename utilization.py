@@ -0,0 +1,170 @@
+# utilization.py
+"""
+Ocupación de las peluqueras por franjas de 10 minutos.
+
+Trae los intervalos (peluquera, inicio, fin) del período en una sola
+consulta, ya convertidos a índices de franja, y los barre como diferencias
+acumuladas: +1 en la franja de inicio, -1 en la de fin y una suma
+acumulada por peluquera da las franjas ocupadas (dos turnos superpuestos de
+la misma peluquera cuentan una vez). Con numpy el barrido es vectorizado;
+sin numpy se hace lo mismo con listas (un año sigue tardando menos de un
+segundo).
+
+Capacidad: horario del local (UTILIZATION_OPEN_HOUR a UTILIZATION_CLOSE_HOUR,
+por defecto 8 a 21 como el calendario) en los días de UTILIZATION_WEEKDAYS
+(lunes a sábado), para cada peluquera activa o con turnos en el período.
+Cuentan todos los turnos no borrados (reservados, señados y cobrados).
+"""
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from flask import current_app
+from sqlalchemy import Integer, cast, func
+
+from extensions import db
+from models import Appointment, Professional
+from replica import read_replica
+
+try:
+    import numpy as np
+except ImportError:  # Opcional: sin numpy se barre con listas
+    np = None
+
+
+SLOT_MINUTES = 10
+MAX_DAYS = 366  # Tope del período: el barrido reserva memoria por franja
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+SLOTS_PER_DAY = 24 * SLOTS_PER_HOUR
+WEEKDAYS = ('Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom')
+
+
+def _intervals(start, end):
+    """(professional_id, franja de inicio, franja de fin) relativos a `start`."""
+    epoch = int((start - datetime(1970, 1, 1)).total_seconds())  # strftime('%s') toma las fechas como UTC
+    seconds = SLOT_MINUTES * 60
+    first = (cast(func.strftime('%s', Appointment.start_time), Integer) - epoch) // seconds
+    last = (cast(func.strftime('%s', Appointment.end_time), Integer) - epoch + seconds - 1) // seconds
+    with read_replica():
+        return db.session.query(Appointment.professional_id, first, last).filter(
+            Appointment.is_deleted == False,
+            # Rango sobre ix_appointment_active_start; ningún turno dura más de un día
+            Appointment.start_time >= start - timedelta(days=1),
+            Appointment.start_time < end,
+            Appointment.end_time > start,
+            Appointment.professional_id.isnot(None),
+        ).all()
+
+
+def _open_mask(n_slots, first_weekday):
+    config = current_app.config
+    opening = config.get('UTILIZATION_OPEN_HOUR', 8) * SLOTS_PER_HOUR
+    closing = config.get('UTILIZATION_CLOSE_HOUR', 21) * SLOTS_PER_HOUR
+    weekdays = config.get('UTILIZATION_WEEKDAYS', (0, 1, 2, 3, 4, 5))
+    day = [opening <= slot < closing for slot in range(SLOTS_PER_DAY)]
+    closed = [False] * SLOTS_PER_DAY
+    days = n_slots // SLOTS_PER_DAY
+    return [flag for d in range(days) for flag in (day if (first_weekday + d) % 7 in weekdays else closed)]
+
+
+#-------- Barrido --------#
+
+def _sweep_numpy(prof, starts, ends, n_prof, is_open, first_weekday):
+    n_slots = len(is_open)
+    diff = np.zeros((n_prof, n_slots + 1), dtype=np.int32)
+    np.add.at(diff, (prof, starts), 1)
+    np.add.at(diff, (prof, ends), -1)
+    booked = np.cumsum(diff, axis=1)[:, :-1] > 0  # (peluquera, franja)
+
+    slots = np.arange(n_slots)
+    cell = ((first_weekday + slots // SLOTS_PER_DAY) % 7) * 24 + (slots % SLOTS_PER_DAY) // SLOTS_PER_HOUR
+    grid = np.bincount(cell, weights=booked.sum(axis=0), minlength=7 * 24).astype(np.int64)
+    open_ = np.asarray(is_open, dtype=bool)
+    return (booked.sum(axis=1).tolist(), (booked & open_).sum(axis=1).tolist(),
+            grid.reshape(7, 24).tolist())
+
+
+def _sweep_python(prof, starts, ends, n_prof, is_open, first_weekday):
+    n_slots = len(is_open)
+    diffs = [[0] * (n_slots + 1) for _ in range(n_prof)]
+    for p, s, e in zip(prof, starts, ends):
+        diffs[p][s] += 1
+        diffs[p][e] -= 1
+
+    per_slot = [0] * n_slots
+    booked, booked_open = [0] * n_prof, [0] * n_prof
+    for p, diff in enumerate(diffs):
+        for slot, running in enumerate(accumulate(diff[:-1])):
+            if running > 0:
+                per_slot[slot] += 1
+                booked[p] += 1
+                booked_open[p] += is_open[slot]
+
+    grid = [[0] * 24 for _ in range(7)]
+    for slot, count in enumerate(per_slot):
+        if count:
+            grid[(first_weekday + slot // SLOTS_PER_DAY) % 7][(slot % SLOTS_PER_DAY) // SLOTS_PER_HOUR] += count
+    return booked, booked_open, grid
+
+
+sweep = _sweep_numpy if np is not None else _sweep_python
+
+
+#-------- Reporte --------#
+
+def utilization(start, end):
+    """
+    Ocupación de [start, end) (fechas a medianoche).
+
+    Devuelve las filas por peluquera (horas ocupadas, capacidad, ociosas,
+    ocupación), el mapa día de semana x hora y los totales.
+    """
+    days = (end - start).days
+    n_slots = days * SLOTS_PER_DAY
+    rows = _intervals(start, end)
+
+    booked_ids = {row[0] for row in rows}
+    with read_replica():
+        professionals = Professional.query.filter(
+            (Professional.is_active == True) | Professional.id.in_(booked_ids)
+        ).order_by(Professional.name).all()
+    index = {p.id: i for i, p in enumerate(professionals)}
+
+    prof = [index[row[0]] for row in rows]
+    starts = [min(max(row[1], 0), n_slots) for row in rows]
+    ends = [min(max(row[2], 0), n_slots) for row in rows]
+    is_open = _open_mask(n_slots, start.weekday())
+    booked, booked_open, grid = sweep(prof, starts, ends, len(professionals), is_open, start.weekday())
+
+    # Capacidad por celda (día de semana, hora) de una peluquera
+    capacity = [[0] * 24 for _ in range(7)]
+    for slot, flag in enumerate(is_open):
+        if flag:
+            capacity[(start.weekday() + slot // SLOTS_PER_DAY) % 7][(slot % SLOTS_PER_DAY) // SLOTS_PER_HOUR] += 1
+    capacity_slots = sum(is_open)
+
+    people = [_summary(p.name, booked[i], booked_open[i], capacity_slots) for i, p in enumerate(professionals)]
+
+    n_prof = len(professionals)
+    hours = [h for h in range(24) if any(capacity[d][h] or grid[d][h] for d in range(7))]
+    heatmap = [{
+        'weekday': WEEKDAYS[d],
+        'cells': [{
+            'hour': h,
+            'booked_hours': grid[d][h] / SLOTS_PER_HOUR,
+            'capacity_hours': capacity[d][h] * n_prof / SLOTS_PER_HOUR,
+            'utilization': grid[d][h] / (capacity[d][h] * n_prof) if capacity[d][h] and n_prof else None,
+        } for h in hours],
+    } for d in range(7) if any(capacity[d][h] or grid[d][h] for h in hours)]
+
+    totals = _summary('Total', sum(booked), sum(booked_open), capacity_slots * n_prof)
+    return {'professionals': people, 'heatmap': heatmap, 'hours': hours, 'totals': totals}
+
+
+def _summary(name, booked, booked_open, capacity):
+    return {
+        'name': name,
+        'booked_hours': booked / SLOTS_PER_HOUR,
+        'capacity_hours': capacity / SLOTS_PER_HOUR,
+        'idle_hours': (capacity - booked_open) / SLOTS_PER_HOUR,
+        'utilization': booked_open / capacity if capacity else 0.0,
+    }
@@ -1,21 +1,190 @@
 
 import os
 import csv
+from flask import current_app
 from extensions import db
-from models import Appointment
+from metrics import timed_job
+from models import Appointment, Dog, DogStats, Owner, Payment, Professional
 from datetime import datetime
+from sqlalchemy import select, update, delete, insert, case, func, literal, bindparam, exists, DateTime
+from sqlalchemy.orm import aliased
 
 
+def parse_fields(spec, fields_param):
+    """
+    Resuelve el parámetro `fields=id,name` (sparse fieldset) de las APIs JSON.
+    Sin parámetro devuelve todos los campos del spec; lanza ValueError si se
+    pide un campo desconocido o ninguno (`fields=,`).
+    """
+    if not fields_param:
+        return list(spec)
+    names = [f.strip() for f in fields_param.split(',') if f.strip()]
+    if not names:
+        raise ValueError("No se pidió ningún campo")
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+    return names
+
+
+def projection_columns(spec, names):
+    """Columnas (sin repetir) que hacen falta para armar los campos pedidos"""
+    columns = {}
+    for name in names:
+        for column in spec[name][0]:
+            columns.setdefault(column.key, column)
+    return list(columns.values())
+
+
+def project_rows(spec, names, rows):
+    """Convierte tuplas de la consulta en dicts con sólo los campos pedidos"""
+    formatters = [(name, spec[name][1]) for name in names]
+    return [{name: fmt(row) for name, fmt in formatters} for row in rows]
+
+
+def recalcular_estado_pago(appointment_id):
+    """
+    Recalcula total pagado, estado y comisión de un turno en una sola sentencia
+    UPDATE ... FROM (SELECT SUM(...)), dentro de la transacción actual.
+
+    Como la suma se hace en la base al momento de escribir, dos cajas cobrando
+    el mismo turno no pueden dejar un saldo o estado desactualizado.
+    """
+    paid = select(
+        literal(appointment_id).label('appointment_id'),
+        func.coalesce(func.sum(Payment.amount), 0).label('total'),
+    ).where(Payment.appointment_id == appointment_id).subquery()
+
+    commission_pct = select(Professional.commission_percentage).where(
+        Professional.id == Appointment.professional_id
+    ).scalar_subquery()
+
+    cobrado = paid.c.total >= Appointment.final_price
+
+    stmt = update(Appointment).where(
+        Appointment.id == paid.c.appointment_id,
+    ).values(
+        amount_paid=paid.c.total,
+        status=case(
+            (paid.c.total <= 0, 'Pendiente'),
+            (cobrado, 'Cobrado'),
+            else_='Señado',
+        ),
+        commission_amount=case(
+            (paid.c.total <= 0, 0.0),
+            (cobrado, Appointment.final_price * func.coalesce(commission_pct, 0) / 100),
+            else_=0.0,
+        ),
+        version_id=Appointment.version_id + 1,
+    ).returning(Appointment.dog_id)
+    dog_id = db.session.execute(stmt).scalar()
+    if dog_id is not None:
+        recalcular_estadisticas_perro(dog_id)
+
+
+def recalcular_estadisticas_perro(*dog_ids):
+    """
+    Rearma DogStats de los perros indicados con un único INSERT ... SELECT
+    agrupado (usa el índice del historial del perro). Se llama al escribir
+    turnos o pagos, dentro de la transacción actual; la ficha sólo lee.
+    """
+    dog_ids = {d for d in dog_ids if d is not None}
+    if not dog_ids:
+        return
+
+    cobrado = Appointment.status == 'Cobrado'
+    other = aliased(Appointment)
+    usual_service = select(other.service_id).where(
+        other.dog_id == Appointment.dog_id,
+        other.is_deleted == False,
+        other.status == 'Cobrado',
+        other.service_id.isnot(None),
+    ).group_by(other.service_id).order_by(
+        func.count().desc(), func.max(other.start_time).desc()
+    ).limit(1).scalar_subquery()
+
+    stats = select(
+        Appointment.dog_id,
+        func.sum(case((cobrado, 1), else_=0)),
+        func.max(case((cobrado, Appointment.start_time))),
+        func.coalesce(func.sum(Appointment.amount_paid), 0),
+        func.sum(case((Appointment.status == 'Señado', Appointment.final_price - Appointment.amount_paid), else_=0)),
+        usual_service,
+    ).where(
+        Appointment.dog_id.in_(dog_ids),
+        Appointment.is_deleted == False,
+    ).group_by(Appointment.dog_id)
+
+    db.session.execute(delete(DogStats).where(DogStats.dog_id.in_(dog_ids)))
+    db.session.execute(insert(DogStats).from_select(
+        ['dog_id', 'visit_count', 'last_visit', 'lifetime_spend', 'outstanding_balance', 'usual_service_id'],
+        stats,
+    ))
+
+
+MIN_RECALL_DAYS = 7  # Piso del intervalo: dos turnos el mismo día no dan intervalo 0
+
+
+def perros_para_recordar(now, default_weeks=6):
+    """
+    Perros atrasados para volver a la peluquería, sin turno futuro.
+
+    Una sola consulta agrupada por perro sobre sus turnos pasados: última
+    visita y intervalo típico. El promedio de los intervalos entre visitas
+    consecutivas es (última - primera) / (visitas - 1), así que no hace falta
+    recorrer los turnos uno por uno. Con una sola visita se usa `default_weeks`.
+    """
+    now_param = bindparam('now', now, type_=DateTime)
+    visits = func.count(Appointment.id)
+    first_visit = func.min(Appointment.start_time)
+    last_visit = func.max(Appointment.start_time)
+
+    typical_days = func.max(case(
+        (visits >= 2, (func.julianday(last_visit) - func.julianday(first_visit)) / (visits - 1)),
+        else_=default_weeks * 7,
+    ), MIN_RECALL_DAYS)
+    days_since = func.julianday(now_param) - func.julianday(last_visit)
+
+    history = select(
+        Appointment.dog_id,
+        visits.label('visits'),
+        last_visit.label('last_visit'),
+        typical_days.label('typical_days'),
+        (days_since - typical_days).label('days_overdue'),
+    ).where(
+        Appointment.is_deleted == False,
+        Appointment.start_time < now_param,
+    ).group_by(Appointment.dog_id).having(days_since > typical_days).subquery()
+
+    future = aliased(Appointment)
+    has_future = exists().where(
+        future.dog_id == history.c.dog_id,
+        future.is_deleted == False,
+        future.start_time >= now_param,
+    )
 
+    return db.session.execute(
+        select(
+            Dog.id.label('dog_id'), Dog.name.label('dog_name'),
+            Owner.name.label('owner_name'), Owner.phone,
+            history.c.visits, history.c.last_visit,
+            history.c.typical_days, history.c.days_overdue,
+        ).select_from(history)
+        .join(Dog, Dog.id == history.c.dog_id)
+        .join(Owner, Owner.id == Dog.owner_id)
+        .where(Dog.is_deleted == False, ~has_future)
+        .order_by(history.c.days_overdue.desc())
+    ).all()
 
 
+@timed_job('guardar_backup_turnos')
 def guardarBackUpTurnos():
     """
     Exporta una lista de los turnos activos a un archivo CSV.
-    Crea la carpeta 'export' si no existe.
+    Crea la carpeta EXPORT_FOLDER (por defecto 'export') si no existe.
     """
     # Define la ruta de la carpeta de exportación y crea si es necesario
-    export_folder = 'export'
+    export_folder = current_app.config.get('EXPORT_FOLDER', 'export')
     if not os.path.exists(export_folder):
         os.makedirs(export_folder)
 